@@ -1,42 +1,39 @@
 import uuid
-import re
-import requests
+import tempfile
 import streamlit as st
 import pandas as pd
+import numpy as np
 import datetime as dt
-from zoneinfo import ZoneInfo
 import gspread
-from google.oauth2.service_account import Credentials
 
-# =========================================================
-# CONFIG
-# =========================================================
-STGO = ZoneInfo("America/Santiago")
-
-SPREADSHEET_KEY = "1-McBRqr5mdiw3Wd0Cw9lOebvp1C7AOj1JmTz4wpyPoA"
-HOJA = "finanzas"
-
-USER_A = "🐳Javiera"
-USER_B = "🪈Francis"
-USUARIOS = [USER_A, USER_B]
-
-MEDIOS = ["Efectivo", "Tarjeta de crédito", "Débito", "Transferencia", "Cuenta de ahorro", "Otro"]
+from finanzas.config import (
+    CUOTA_ESCRITURAS_MIN, CUOTA_LECTURAS_MIN, MEDIOS, PROPORCION_COL,
+    STGO, USER_A, USER_B, USUARIOS,
+)
+from finanzas.calculos import (
+    _buscar, _construir_cubo, _construir_indice_texto, _cortar_periodo, _cubo, _cubo_mensual, _indice_fechas,
+    _indice_ids, _ledger_normalizado, _por_version, _rollups, _serie_tendencia, _submuestrear,
+    calcular_saldos, calcular_totales_personales, liquidar,
+)
+from finanzas.cierres import CIERRE_MONTOS, _cerrar_periodo, _leer_archivo, _leer_cierres
+from finanzas.conciliacion import (
+    VENTANA_CONCILIACION_DIAS, _construir_indice_duplicados, posibles_duplicados,
+)
+from finanzas.exportar import FORMATOS_EXPORT, exportar_periodo
+from finanzas.fx import FORMATOS_COLUMNA, _procesar_monto, formatear_monto, formatear_montos
+from finanzas.importar import _conciliar_cartola, _huella, _preparar_importacion, _sugerir_mapeo, leer_cartola
+from finanzas.metricas import _fin_rerun, _inicio_rerun, _medir, _metricas_proceso
+from finanzas.modelo import _formatear_reparto, _vector_reparto
+from finanzas.sheets import (
+    ConflictoEdicion, _append_records, _encolar_alta, _encolar_edicion, _invalidar_ledger, _journal,
+    _journal_pendientes, _journal_quitar, _load_ledger, _revalorizar_usd,
+)
 
-EXPECTED_HEADERS = [
-    "ID","Tipo","Detalle","Categoría","Fecha","Persona",
-    "Persona_Origen","Persona_Destino","Monto",
-    "Monto_original","Moneda",
-    "Medio","Compartido","Proporcion_Javiera","Proporcion_Francis",
-    "Created_At","Created_By","Last_Modified_At","Last_Modified_By","Anulado"
-]
-
-FLASH_KEY = "flash_notice"
 
 # =========================================================
 # UI CONFIG
 # =========================================================
-st.set_page_config(page_title="Finanzas APP", page_icon="💰", layout="wide")
-st.title("💰 Finanzas Javiera & Francis")
+FLASH_KEY = "flash_notice"
 
 def _show_flash():
     if FLASH_KEY in st.session_state:
@@ -48,102 +45,72 @@ def _show_flash():
         st.session_state["just_saved"] = False
 
 # =========================================================
-# GOOGLE SHEETS
+# MÉTRICAS
 # =========================================================
-def _a1_range_row(row: int, ncols: int) -> str:
-    last_cell = gspread.utils.rowcol_to_a1(row, ncols)
-    last_col = re.sub(r"\d+", "", last_cell)
-    return f"A{row}:{last_col}{row}"
-
-def _open_ws(sheet_name=HOJA):
-    creds = Credentials.from_service_account_info(
-        st.secrets["gspread"],
-        scopes=[
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/drive"
-        ],
-    )
-    client = gspread.authorize(creds)
-    sh = client.open_by_key(SPREADSHEET_KEY)
-    return sh.worksheet(sheet_name)
-
-def _ensure_headers(ws):
-    headers_raw = ws.row_values(1)
-    headers = [h.strip() for h in headers_raw]
-    missing = [h for h in EXPECTED_HEADERS if h not in headers]
-    if missing:
-        new_headers = headers + missing
-        ws.update(_a1_range_row(1, len(new_headers)), [new_headers])
-        return new_headers
-    return headers
-
-@st.cache_data(ttl=120)
-def _load_df() -> pd.DataFrame:
-    ws = _open_ws(HOJA)
-    headers = _ensure_headers(ws)
-    values = ws.get_all_values()
-    if not values:
-        return pd.DataFrame(columns=EXPECTED_HEADERS + ["_row"])
-    rows = values[1:]
-    norm_rows = [r[:len(headers)] + [""] * max(0, len(headers)-len(r)) for r in rows]
-    df = pd.DataFrame(norm_rows, columns=headers)
-    df["_row"] = range(2, 2+len(df))
-    return df
-
-def _normalize_df(df_raw: pd.DataFrame) -> pd.DataFrame:
-    if df_raw.empty:
-        return pd.DataFrame(columns=EXPECTED_HEADERS + ["_row"])
-    df = df_raw.copy()
-    df["Fecha_dt"] = pd.to_datetime(df["Fecha"], errors="coerce")
-    df["Monto_int"] = pd.to_numeric(df["Monto"], errors="coerce").fillna(0).astype(int)
-    df["Monto_original"] = pd.to_numeric(df["Monto_original"], errors="coerce").fillna(0)
-    df["Anulado_bool"] = df["Anulado"].str.lower().isin(["true","1","si","sí","yes","y"])
-    df["Compartido_bool"] = df["Compartido"].str.lower().isin(["true","1","si","sí","yes","y"])
-    return df
-
-def _append_record(record: dict):
-    ws = _open_ws(HOJA)
-    headers = _ensure_headers(ws)
-    row_out = [record.get(h,"") for h in headers]
-    ws.append_row(row_out, value_input_option="USER_ENTERED")
-
-def _update_row(row: int, record: dict):
-    ws = _open_ws(HOJA)
-    headers = _ensure_headers(ws)
-    vals = [record.get(h,"") for h in headers]
-    ws.update(_a1_range_row(row, len(headers)), [vals])
+
+def _panel_debug(resumen: dict):
+    with st.sidebar:
+        st.subheader("🛠️ Depuración")
+        st.metric("Rerun", f"{resumen['total_s'] * 1000:.0f} ms")
+        cuota = resumen["cuota_ultimo_minuto"]
+        st.write("**Cuota Sheets (último minuto, proceso)**")
+        st.progress(min(1.0, cuota["lectura"] / CUOTA_LECTURAS_MIN),
+                    text=f"Lecturas {cuota['lectura']}/{CUOTA_LECTURAS_MIN}")
+        st.progress(min(1.0, cuota["escritura"] / CUOTA_ESCRITURAS_MIN),
+                    text=f"Escrituras {cuota['escritura']}/{CUOTA_ESCRITURAS_MIN}")
+        st.write("**Etapas de este rerun**")
+        st.dataframe(pd.DataFrame(
+            sorted(resumen["etapas_s"].items(), key=lambda kv: -kv[1]), columns=["Etapa", "Segundos"]
+        ), hide_index=True)
+        st.write("**Llamadas a la API en este rerun**")
+        st.json(resumen["api"])
+        m = _metricas_proceso()
+        with m["lock"]:
+            cache = dict(m["cache"])
+        nombres = sorted({n for n, _ in cache})
+        st.write("**Caché (proceso)**")
+        st.dataframe(pd.DataFrame([
+            {"Caché": n, "Hits": cache.get((n, "hit"), 0), "Misses": cache.get((n, "miss"), 0),
+             "Tasa": cache.get((n, "hit"), 0) / max(1, cache.get((n, "hit"), 0) + cache.get((n, "miss"), 0))}
+            for n in nombres
+        ]), hide_index=True)
 
 # =========================================================
-# MONEDA
+# SINCRONIZACIÓN
 # =========================================================
-def _get_usd_value(date: dt.date) -> float:
-    try:
-        resp = requests.get("https://mindicador.cl/api/dolar")
-        data = resp.json()
-        for d in data["serie"]:
-            if d["fecha"].startswith(date.strftime("%Y-%m-%d")):
-                return d["valor"]
-        return data["serie"][0]["valor"]  # último valor
-    except:
-        return 900  # fallback
-
-def _procesar_monto(monto: float, moneda: str, fecha: dt.date):
-    if moneda == "USD":
-        valor = _get_usd_value(fecha)
-        return monto * valor, monto
-    return monto, monto
-
-def formatear_monto(valor, moneda="CLP"):
-    try:
-        valor = float(valor)
-    except:
-        return valor
-    if moneda == "CLP":
-        return f"${valor:,.0f}"       # CLP sin decimales
-    elif moneda == "USD":
-        return f"US${valor:,.2f}"     # USD con 2 decimales
-    return str(valor)
+def _panel_pendientes():
+    store = _journal()
+    pendientes = _journal_pendientes(store)
+    conflictos = _journal_pendientes(store, con_error=True)
+    if not pendientes and not conflictos:
+        return
+    with st.sidebar:
+        if pendientes:
+            st.caption(f"⏳ {len(pendientes)} cambios por sincronizar con la hoja")
+        for c in conflictos:
+            st.warning(f"⚠️ No se aplicó un cambio: {c['error']}")
+            if st.button("Descartar", key=f"descartar_{c['seq']}"):
+                _journal_quitar(store, [c["seq"]])
+                st.rerun()
 
+# =========================================================
+# MONEDA
+# =========================================================
+def _tabla_montos(df: pd.DataFrame, columnas: dict[str, str]) -> dict:
+    """Argumentos de `st.dataframe` con los montos formateados, sin un Styler que recorra cada celda.
+
+    `columnas` mapea columna -> código de moneda, o -> nombre de la columna
+    que trae la moneda de cada fila. Las de moneda fija siguen numéricas y
+    ordenables y las formatea el navegador; las de moneda por fila se pasan
+    a texto con `formatear_montos`, una moneda a la vez.
+    """
+    config, texto = {}, {}
+    for col, moneda in columnas.items():
+        if moneda in df.columns:
+            texto[col] = formatear_montos(df[col], df[moneda])
+        else:
+            config[col] = st.column_config.NumberColumn(format=FORMATOS_COLUMNA[moneda])
+    return {"data": df.assign(**texto) if texto else df, "column_config": config}
 
 
 # =========================================================
@@ -157,11 +124,23 @@ def _tipo_registro_ui():
     st.radio("Selecciona el tipo:", opciones, key="tipo_registro")
 
     if st.session_state["tipo_registro"] == "Gasto compartido":
-        if "prop_j" not in st.session_state:
-            st.session_state["prop_j"] = 50
-        st.slider("Proporción Javiera", 0, 100,
-                  st.session_state["prop_j"], step=5, key="prop_j")
-        st.caption(f"Francis: {100 - st.session_state['prop_j']}%")
+        if len(USUARIOS) == 2:
+            if "prop_j" not in st.session_state:
+                st.session_state["prop_j"] = 50
+            st.slider("Proporción Javiera", 0, 100,
+                      st.session_state["prop_j"], step=5, key="prop_j")
+            st.caption(f"Francis: {100 - st.session_state['prop_j']}%")
+        else:
+            cols = st.columns(len(USUARIOS))
+            for i, (col, persona) in enumerate(zip(cols, USUARIOS)):
+                with col:
+                    st.number_input(f"Peso {persona}", min_value=0.0, value=1.0, step=0.5, key=f"peso_{i}")
+
+def _pesos_ui() -> dict[str, float]:
+    if len(USUARIOS) == 2:
+        pj = st.session_state.get("prop_j", 50)
+        return {USER_A: pj, USER_B: 100 - pj}
+    return {p: st.session_state.get(f"peso_{i}", 1.0) for i, p in enumerate(USUARIOS)}
 
 def _categoria_ui(cats_existentes: list[str]):
     st.subheader("2️⃣ Categoría")
@@ -185,7 +164,44 @@ def _categoria_ui(cats_existentes: list[str]):
 # =========================================================
 # FORMULARIOS
 # =========================================================
-def _form_ingreso_gasto(cats_existentes: list[str]):
+DUPLICADO_KEY = "alta_duplicada"
+PARECIDOS_COLS = ["ID","Fecha","Tipo","Detalle","Categoría","Monto_int","Created_By","Created_At"]
+
+def _registrar_alta(record: dict, msg: str, df: pd.DataFrame, version: int):
+    """Encola el alta, salvo que se parezca a un registro cercano: entonces pide confirmación."""
+    indice = _por_version("indice_duplicados", version, lambda: _construir_indice_duplicados(df))
+    persona = record["Persona"] or record["Persona_Origen"]
+    pos = posibles_duplicados(indice, persona, record["Monto"], record["Fecha"])
+    if len(pos):
+        st.session_state[DUPLICADO_KEY] = {"record": record, "msg": msg, "parecidos": df.iloc[pos][PARECIDOS_COLS]}
+        return
+    _encolar_alta(record)
+    st.session_state[FLASH_KEY] = {"msg": msg, "record": record}
+    st.session_state["just_saved"] = True
+
+def _confirmar_duplicado():
+    pendiente = st.session_state.get(DUPLICADO_KEY)
+    if not pendiente:
+        return
+    record, parecidos = pendiente["record"], pendiente["parecidos"]
+    persona = record["Persona"] or record["Persona_Origen"]
+    st.warning(f"⚠️ Ya hay {len(parecidos)} registro(s) de {persona} por {formatear_monto(record['Monto'])} "
+               f"cerca del {record['Fecha']}. ¿Es el mismo movimiento?")
+    st.dataframe(**_tabla_montos(parecidos, {"Monto_int": "CLP"}), hide_index=True)
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("💾 Registrar de todas formas", key="dup_registrar"):
+            _encolar_alta(record)
+            st.session_state[FLASH_KEY] = {"msg": pendiente["msg"], "record": record}
+            st.session_state["just_saved"] = True
+            del st.session_state[DUPLICADO_KEY]
+            st.rerun()
+    with col2:
+        if st.button("Descartar", key="dup_descartar"):
+            del st.session_state[DUPLICADO_KEY]
+            st.rerun()
+
+def _form_ingreso_gasto(cats_existentes: list[str], df: pd.DataFrame, version: int):
    
     _tipo_registro_ui()
     if st.session_state["tipo_registro"] == "--- Selecciona ---":
@@ -205,8 +221,8 @@ def _form_ingreso_gasto(cats_existentes: list[str]):
         if st.form_submit_button("💾 Registrar"):
             tipo_sel = "Ingreso" if st.session_state["tipo_registro"] == "Ingreso" else "Gasto"
             compartido = (st.session_state["tipo_registro"] == "Gasto compartido")
-            pj = st.session_state.get("prop_j", 50) if compartido else ""
-            pf = (100 - pj) if compartido else ""
+            reparto = _formatear_reparto(_pesos_ui()) if compartido else ""
+            pesos = dict(zip(USUARIOS, _vector_reparto(reparto)))
 
             monto_clp, monto_original = _procesar_monto(monto_in, moneda, fecha)
 
@@ -224,24 +240,23 @@ def _form_ingreso_gasto(cats_existentes: list[str]):
                 "Persona": persona,
                 "Persona_Origen": "",
                 "Persona_Destino": "",
-                "Monto": int(monto_clp),
+                "Monto": monto_clp,
                 "Monto_original": monto_original,
                 "Moneda": moneda,
                 "Medio": medio,
                 "Compartido": "TRUE" if compartido else "",
-                "Proporcion_Javiera": pj if compartido else "",
-                "Proporcion_Francis": pf if compartido else "",
+                **{col: round(100 * pesos.get(p, 0)) if compartido else "" for p, col in PROPORCION_COL.items()},
                 "Created_At": now.strftime("%Y-%m-%d %H:%M:%S"),
                 "Created_By": persona,
                 "Last_Modified_At": "",
                 "Last_Modified_By": "",
-                "Anulado": ""
+                "Anulado": "",
+                "Reparto": reparto
             }
-            _append_record(record)
-            st.session_state[FLASH_KEY] = {"msg":f"{tipo_sel} registrado ✅","record":record}
-            st.session_state["just_saved"] = True
+            _registrar_alta(record, f"{tipo_sel} registrado ✅", df, version)
+    _confirmar_duplicado()
 
-def _form_traspaso():
+def _form_traspaso(df: pd.DataFrame, version: int):
     st.subheader("➕ Registrar Traspaso")
     with st.form("form_traspaso", clear_on_submit=True):
         fecha = st.date_input("Fecha", value=dt.date.today())
@@ -266,7 +281,7 @@ def _form_traspaso():
                 "Persona": "",
                 "Persona_Origen": origen,
                 "Persona_Destino": destino,
-                "Monto": int(monto_clp),
+                "Monto": monto_clp,
                 "Monto_original": monto_original,
                 "Moneda": moneda,
                 "Medio": "",
@@ -277,142 +292,283 @@ def _form_traspaso():
                 "Created_By": origen,
                 "Last_Modified_At": "",
                 "Last_Modified_By": "",
-                "Anulado": ""
+                "Anulado": "",
+                "Reparto": ""
             }
-            _append_record(record)
-            st.session_state[FLASH_KEY] = {"msg":"Traspaso registrado ✅","record":record}
-            st.session_state["just_saved"] = True
+            _registrar_alta(record, "Traspaso registrado ✅", df, version)
+    _confirmar_duplicado()
 
 # =========================================================
-# HISTORIAL
+# IMPORTACIÓN
 # =========================================================
-def _historial(df: pd.DataFrame):
-    st.subheader("📜 Historial de registros")
-    show_anulados = st.checkbox("Mostrar registros anulados", value=False)
-
-    df_show = df.copy()
-    if not show_anulados:
-        df_show = df_show[~df_show["Anulado_bool"]]
-
-    st.dataframe(df_show.sort_values("Fecha_dt", ascending=False).head(50))
-
-    edit_id = st.text_input("ID a editar/anular")
-    accion = st.radio("Acción", ["","Editar","Anular"])
+def _conciliacion_ui(registros: pd.DataFrame, df: pd.DataFrame, version: int, medio: str) -> pd.DataFrame:
+    st.caption("Cada movimiento de la cartola se calza con a lo más un registro del ledger de la misma "
+               "persona, por el mismo monto y con fechas cercanas.")
+    col1, col2 = st.columns(2)
+    with col1:
+        ventana = st.number_input("Días de desfase aceptados", min_value=0, max_value=30,
+                                  value=VENTANA_CONCILIACION_DIAS, key="conc_ventana")
+    with col2:
+        solo_medio = st.checkbox(f"Sólo registros con medio «{medio}»", value=bool(medio), disabled=not medio)
+    cartola, libro, res = _conciliar_cartola(registros, df, int(ventana), medio if solo_medio else "",
+                                             _indice_fechas(df, "df", version))
+
+    pares = res["calces"]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Calzados", len(pares))
+    col2.metric("Sólo en la cartola", len(res["solo_cartola"]))
+    col3.metric("Sólo en el ledger", len(res["solo_libro"]))
+
+    tab_calces, tab_cartola, tab_libro = st.tabs(["✅ Calzados", "🏦 Sólo en la cartola", "📒 Sólo en el ledger"])
+    with tab_calces:
+        en_cartola = cartola.iloc[pares["pos_cartola"]]
+        en_libro = libro.iloc[pares["pos_libro"]]
+        st.dataframe(**_tabla_montos(pd.DataFrame({
+            "Fecha cartola": en_cartola["Fecha"].to_numpy(),
+            "Detalle cartola": en_cartola["Detalle"].to_numpy(),
+            "Monto": en_cartola["Monto_int"].to_numpy(),
+            "Fecha ledger": en_libro["Fecha"].to_numpy(),
+            "Detalle ledger": en_libro["Detalle"].to_numpy(),
+            "ID": en_libro["ID"].to_numpy(),
+            "Días": pares["Dias"].to_numpy(),
+        }), {"Monto": "CLP"}), hide_index=True)
+    with tab_cartola:
+        st.dataframe(**_tabla_montos(res["solo_cartola"][["Fecha","Tipo","Detalle","Monto_int"]], {"Monto_int": "CLP"}),
+                     hide_index=True)
+    with tab_libro:
+        st.dataframe(**_tabla_montos(res["solo_libro"][HISTORIAL_COLS], {"Monto_int": "CLP", "Monto_original": "Moneda"}),
+                     hide_index=True)
+    # Lo que sólo está en la cartola es lo que falta registrar.
+    return registros.loc[res["solo_cartola"].index]
+
+def _importar(cats_existentes: list[str], df: pd.DataFrame, version: int):
+    st.subheader("📥 Importar CSV / cartola bancaria")
+    archivo = st.file_uploader("Archivo CSV", type=["csv", "txt"])
+    if archivo is None:
+        return
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        decimal = st.selectbox("Separador decimal", [",", "."])
+    with col2:
+        dayfirst = st.checkbox("Fechas día/mes/año", value=True)
+    with col3:
+        encoding = st.selectbox("Codificación", ["utf-8", "latin-1"])
+    try:
+        archivo.seek(0)
+        raw = leer_cartola(archivo, encoding)
+    except (UnicodeDecodeError, pd.errors.ParserError) as e:
+        st.error(f"No se pudo leer el archivo: {e}")
+        return
 
-    if accion=="Anular" and edit_id:
-        row = df[df["ID"]==edit_id]
-        if not row.empty:
-            rec = row.iloc[0].to_dict()
-            rec["Anulado"] = "TRUE"
-            _update_row(int(row["_row"].values[0]), rec)
-            st.success("Registro anulado")
-            st.cache_data.clear()
-            
-
-    if accion=="Editar" and edit_id:
-        row = df[df["ID"]==edit_id]
-        if not row.empty:
-            rec = row.iloc[0].to_dict()
-            st.subheader(f"✏️ Editando registro {edit_id}")
-            with st.form("edit_form"):
-                detalle = st.text_input("Detalle", rec["Detalle"])
-                monto_in = st.number_input("Monto", value=float(rec["Monto_original"]))
-                moneda = st.selectbox("Moneda", ["CLP","USD"], index=0 if rec["Moneda"]=="CLP" else 1)
-                if st.form_submit_button("Guardar cambios"):
-                    monto_clp, monto_original = _procesar_monto(monto_in, moneda, pd.to_datetime(rec["Fecha"]))
-                    rec["Detalle"] = detalle
-                    rec["Monto_original"] = monto_original
-                    rec["Moneda"] = moneda
-                    rec["Monto"] = int(monto_clp)
-                    rec["Last_Modified_At"] = pd.Timestamp.now(tz=STGO).strftime("%Y-%m-%d %H:%M:%S")
-                    rec["Last_Modified_By"] = "Edición manual"
-                    _update_row(int(row["_row"].values[0]), rec)
-                    st.session_state[FLASH_KEY] = {"msg":"Registro actualizado ✅","record":rec}
-                    st.session_state["just_saved"] = True
-                    # Resetear triggers
-                    st.session_state["accion"] = ""
-                    st.session_state["edit_id"] = ""
-                    st.cache_data.clear()
-                    st.rerun()
+    st.write("**Columnas del archivo → campos de la app**")
+    sugeridas = _sugerir_mapeo(raw.columns)
+    mapeo = {}
+    campos = st.columns(4)
+    for i, (campo, sugerida) in enumerate(sugeridas.items()):
+        opciones = [""] + list(raw.columns)
+        with campos[i % 4]:
+            mapeo[campo] = st.selectbox(campo, opciones, index=opciones.index(sugerida), key=f"imp_{campo}")
+    if not mapeo["Fecha"] or not mapeo["Monto"]:
+        st.info("👉 Indica al menos las columnas de Fecha y Monto.")
+        return
 
+    st.write("**Valores por defecto para columnas no mapeadas**")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        persona = st.selectbox("Persona", USUARIOS, key="imp_def_persona")
+    with col2:
+        moneda = st.selectbox("Moneda", ["CLP", "USD"], key="imp_def_moneda")
+    with col3:
+        medio = st.selectbox("Medio de pago", [""] + MEDIOS, key="imp_def_medio")
+    with col4:
+        categoria = st.selectbox("Categoría", [""] + cats_existentes, key="imp_def_cat")
+    signo_tipo = st.checkbox("Montos negativos son gastos y positivos ingresos", value=True,
+                             disabled=bool(mapeo["Tipo"]))
+    tipo = st.selectbox("Tipo", ["Gasto", "Ingreso"], key="imp_def_tipo",
+                        disabled=bool(mapeo["Tipo"]) or signo_tipo)
+
+    defaults = {"Persona": persona, "Moneda": moneda, "Medio": medio, "Categoría": categoria, "Tipo": tipo}
+    origen = _huella(archivo.getvalue())
+    registros, descartadas = _preparar_importacion(raw, mapeo, defaults, decimal, dayfirst, signo_tipo, origen)
+    if descartadas:
+        st.warning(f"{descartadas} filas sin fecha o monto válidos se omitirán.")
+    st.dataframe(registros.head(20))
+
+    if not registros.empty and st.checkbox("🔎 Conciliar con el ledger antes de importar", key="imp_conciliar"):
+        registros = _conciliacion_ui(registros, df, version, medio)
+
+    if st.button(f"📥 Importar {len(registros)} registros", disabled=registros.empty):
+        barra = st.progress(0.0)
+        try:
+            n = _append_records(registros, progreso=barra.progress)
+        except gspread.exceptions.APIError as e:
+            st.error(f"La importación se detuvo por un error de Google Sheets: {e}")
+            _invalidar_ledger()
+            return
+        _invalidar_ledger()
+        st.success(f"{n} registros importados ✅")
 
 # =========================================================
-# CÁLCULOS DE GASTOS
+# HISTORIAL
 # =========================================================
+HISTORIAL_COLS = [
+    "ID","Fecha","Tipo","Persona","Categoría","Detalle","Monto_int","Monto_original","Moneda",
+    "Medio","Compartido_bool","Persona_Origen","Persona_Destino","Anulado_bool"
+]
 
-def calcular_gastos_personales(df: pd.DataFrame, persona: str) -> dict:
-    df_activos = df[~df["Anulado_bool"]]
-
-    # Gastos individuales
-    indiv = df_activos[
-        (df_activos["Tipo"]=="Gasto") &
-        (~df_activos["Compartido_bool"]) &
-        (df_activos["Persona"]==persona)
-    ]["Monto_int"].sum()
-
-    # Gastos compartidos pagados por esta persona
-    df_comp_pagos = df_activos[
-        (df_activos["Tipo"]=="Gasto") &
-        (df_activos["Compartido_bool"]) &
-        (df_activos["Persona"]==persona)
-    ]
-    if persona == USER_A:
-        comp_pagados = (df_comp_pagos["Monto_int"] * df_comp_pagos["Proporcion_Javiera"].astype(float)/100).sum()
-    else:
-        comp_pagados = (df_comp_pagos["Monto_int"] * df_comp_pagos["Proporcion_Francis"].astype(float)/100).sum()
-
-    # Gastos compartidos pagados por la otra persona
-    df_comp_otro = df_activos[
-        (df_activos["Tipo"]=="Gasto") &
-        (df_activos["Compartido_bool"]) &
-        (df_activos["Persona"]!=persona)
-    ]
-    if persona == USER_A:
-        comp_recibidos = (df_comp_otro["Monto_int"] * df_comp_otro["Proporcion_Javiera"].astype(float)/100).sum()
-    else:
-        comp_recibidos = (df_comp_otro["Monto_int"] * df_comp_otro["Proporcion_Francis"].astype(float)/100).sum()
-
-    total = indiv + comp_pagados + comp_recibidos
 
-    return {
-        "Persona": persona,
-        "Gastos_individuales": indiv,
-        "Aporte_compartidos_pagados": comp_pagados,
-        "Beneficio_compartidos_recibidos": comp_recibidos,
-        "Total_considerado": total
-    }
+def _historial(df: pd.DataFrame, df_raw: pd.DataFrame, version: int):
+    st.subheader("📜 Historial de registros")
 
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        consulta = st.text_input("🔎 Buscar en detalle y categoría")
+        personas = st.multiselect("Persona", USUARIOS)
+    with col2:
+        rango = st.date_input("Rango de fechas", [])
+        tipos = st.multiselect("Tipo", ["Ingreso", "Gasto", "Traspaso"])
+    with col3:
+        medios = st.multiselect("Medio de pago", MEDIOS)
+        show_anulados = st.checkbox("Mostrar registros anulados", value=False)
+
+    # Candidatos: tramo de fechas por búsqueda binaria ∩ resultados del índice de texto.
+    idx_fechas = _indice_fechas(df, "df", version)
+    if rango and len(rango) == 2:
+        ini = int(np.searchsorted(idx_fechas["fechas"], np.datetime64(pd.Timestamp(rango[0]), "ns"), "left"))
+        fin = int(np.searchsorted(idx_fechas["fechas"], np.datetime64(pd.Timestamp(rango[1]), "ns"), "right"))
+    else:
+        ini, fin = 0, len(df)
+    pos = np.arange(ini, fin)
+    hits = _buscar(_por_version("indice_texto", version, lambda: _construir_indice_texto(df)), consulta)
+    if hits is not None:
+        pos = hits[(hits >= ini) & (hits < fin)]
 
-def calcular_saldos(df: pd.DataFrame) -> dict:
-    df_activos = df[~df["Anulado_bool"] & df["Compartido_bool"]]
+    # El resto de los filtros se evalúa sólo sobre los candidatos y las columnas necesarias.
+    def _en(col, valores):
+        return df[col].iloc[pos].isin(valores).to_numpy()
 
-    # Lo que Javiera pagó por Francis
-    pagado_por_j = (df_activos[df_activos["Persona"]==USER_A]["Monto_int"] *
-                    df_activos[df_activos["Persona"]==USER_A]["Proporcion_Francis"].astype(float)/100).sum()
-    # Lo que Francis pagó por Javiera
-    pagado_por_f = (df_activos[df_activos["Persona"]==USER_B]["Monto_int"] *
-                    df_activos[df_activos["Persona"]==USER_B]["Proporcion_Javiera"].astype(float)/100).sum()
+    mask = np.ones(len(pos), dtype=bool)
+    if not show_anulados:
+        mask &= ~df["Anulado_bool"].to_numpy()[pos]
+    if personas:
+        mask &= _en("Persona", personas) | _en("Persona_Origen", personas)
+    if tipos:
+        mask &= _en("Tipo", tipos)
+    if medios:
+        mask &= _en("Medio", medios)
+    pos = pos[mask]
+
+    # df ya está en orden cronológico: lo más reciente primero es recorrerlo al
+    # revés, dejando al final los registros sin fecha. No hace falta ordenar.
+    n_fechadas = len(idx_fechas["fechas"])
+    orden = np.concatenate([pos[pos < n_fechadas][::-1], pos[pos >= n_fechadas]])
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        por_pagina = st.selectbox("Por página", [25, 50, 100], index=1)
+    n_paginas = max(1, -(-len(orden) // por_pagina))
+    if st.session_state.get("hist_pagina", 1) > n_paginas:
+        st.session_state["hist_pagina"] = 1
+    with col2:
+        pagina = st.number_input("Página", min_value=1, max_value=n_paginas, step=1, key="hist_pagina")
+    desde = (int(pagina) - 1) * por_pagina
+    visibles = df.iloc[orden[desde:desde + por_pagina]][HISTORIAL_COLS]
+    st.caption(f"Mostrando {desde + 1 if len(orden) else 0}–{desde + len(visibles)} de {len(orden)} registros")
+    st.dataframe(**_tabla_montos(visibles, {"Monto_int": "CLP", "Monto_original": "Moneda"}))
+
+    with st.expander("💱 Revalorizar registros en USD"):
+        st.caption("Recalcula el monto en CLP de cada registro en USD con el dólar observado de su fecha.")
+        if st.button("Revalorizar"):
+            n = _revalorizar_usd(df, df_raw)
+            st.success(f"{n} registros actualizados")
+
+    edit_id = st.text_input("ID a editar/anular").strip()
+    accion = st.radio("Acción", ["","Editar","Anular"])
 
-    saldo_j = pagado_por_f - pagado_por_j
-    saldo_f = pagado_por_j - pagado_por_f
+    pos = _indice_ids(df_raw, version).get(edit_id) if edit_id else None
+    if accion and edit_id and pos is None:
+        st.warning("No se encontró un registro con ese ID.")
+        return
+    if pos is None:
+        return
+    raw = df_raw.iloc[pos]
+    typed = df.loc[df_raw.index[pos]]
+
+    if accion=="Anular":
+        if typed["Anulado_bool"]:
+            st.info("Registro anulado")
+            return
+        cambios = {
+            "Anulado": "TRUE",
+            "Last_Modified_At": pd.Timestamp.now(tz=STGO).strftime("%Y-%m-%d %H:%M:%S"),
+            "Last_Modified_By": "Anulación",
+        }
+        _encolar_edicion(edit_id, raw, cambios)
+        st.success("Registro anulado")
+
+    if accion=="Editar":
+        st.subheader(f"✏️ Editando registro {edit_id}")
+        with st.form("edit_form"):
+            detalle = st.text_input("Detalle", raw["Detalle"])
+            monto_in = st.number_input("Monto", value=float(typed["Monto_original"]))
+            moneda = st.selectbox("Moneda", ["CLP","USD"], index=0 if raw["Moneda"]=="CLP" else 1)
+            if st.form_submit_button("Guardar cambios"):
+                monto_clp, monto_original = _procesar_monto(monto_in, moneda, pd.to_datetime(raw["Fecha"]))
+                cambios = {
+                    "Detalle": detalle,
+                    "Monto_original": monto_original,
+                    "Moneda": moneda,
+                    "Monto": monto_clp,
+                    "Last_Modified_At": pd.Timestamp.now(tz=STGO).strftime("%Y-%m-%d %H:%M:%S"),
+                    "Last_Modified_By": "Edición manual",
+                }
+                escritas = _encolar_edicion(edit_id, raw, cambios)
+                msg = "Registro actualizado ✅" if escritas else "Sin cambios que guardar"
+                st.session_state[FLASH_KEY] = {"msg":msg,"record":{"ID":edit_id, **{h: cambios[h] for h in escritas}}}
+                st.session_state["just_saved"] = True
+                # Resetear triggers
+                st.session_state["accion"] = ""
+                st.session_state["edit_id"] = ""
+                st.rerun()
 
-    return {
-        USER_A: saldo_j,
-        USER_B: saldo_f
-    }
 
 # =========================================================
 # RESUMEN
 # =========================================================
-def _resumen(df: pd.DataFrame):
+def _tendencias(rollups: dict):
+    import plotly.express as px
+
+    col1, col2 = st.columns(2)
+    with col1:
+        granularidad = st.radio("Granularidad", ["Mensual", "Diaria"], horizontal=True, key="tend_gran")
+    with col2:
+        por = st.radio("Ver por", ["Categoría", "Persona", "Tipo de gasto"], horizontal=True, key="tend_por")
+
+    gastos = _serie_tendencia(rollups, granularidad, por)
+    if gastos.empty:
+        st.info("No hay gastos para graficar.")
+    else:
+        st.write(f"**Gasto {granularidad.lower()} por {por.lower()} (CLP)**")
+        fig = px.bar(gastos, x=gastos.index, y=list(gastos.columns), labels={"x": "", "value": "CLP", "variable": por})
+        st.plotly_chart(fig, use_container_width=True)
+
+    saldo = _submuestrear(rollups["saldo"], "last")
+    if not saldo.empty:
+        st.write("**Saldo acumulado de gastos compartidos, neto de traspasos (CLP, positivo = debe)**")
+        fig = px.line(saldo, x=saldo.index, y=list(saldo.columns), labels={"x": "", "value": "CLP", "variable": "Persona"})
+        st.plotly_chart(fig, use_container_width=True)
+
+def _resumen(df: pd.DataFrame, version: int):
     st.subheader("📊 Resumen general")
 
    
     # -----------------------
     # Selector de período
     # -----------------------
-    meses = sorted(df["Fecha_dt"].dt.to_period("M").dropna().unique())
-    opciones_meses = [str(m) for m in meses]
+    cubo = _cubo(df, version)
+    cubo_mes = _cubo_mensual(cubo, version)
+    idx_df = _indice_fechas(df, "df", version)
+    opciones_meses = idx_df["meses"]
 
     mes_sel = None
     if opciones_meses:
@@ -424,112 +580,208 @@ def _resumen(df: pd.DataFrame):
 
     rango_fechas = st.date_input("O selecciona un rango de fechas", [])
 
-    if mes_sel:
-        periodo = pd.Period(mes_sel)
-        df_periodo = df[df["Fecha_dt"].dt.to_period("M") == periodo]
-    elif rango_fechas and len(rango_fechas) == 2:
-        df_periodo = df[
-            (df["Fecha_dt"] >= pd.to_datetime(rango_fechas[0])) &
-            (df["Fecha_dt"] <= pd.to_datetime(rango_fechas[1]))
-        ]
+    rango = tuple(rango_fechas) if rango_fechas and len(rango_fechas) == 2 else None
+    df_periodo = _cortar_periodo(df, idx_df, mes_sel, rango)
+    # Un mes (o toda la historia) sale del cubo mensual; sólo un rango necesita el diario.
+    if mes_sel or not rango:
+        cubo_periodo = _cortar_periodo(cubo_mes, _indice_fechas(cubo_mes, "cubo_mensual", version), mes_sel)
     else:
-        df_periodo = df
-        
+        cubo_periodo = _cortar_periodo(cubo, _indice_fechas(cubo, "cubo", version), rango=rango)
+
     df_activos = df_periodo[~df_periodo["Anulado_bool"]]
 
     # -----------------------
     # Sub-tabs
     # -----------------------
     subtab = st.radio("Secciones del resumen",
-                      ["🌍 Totales globales","👤 Totales por persona","🤝 Gastos compartidos","🔁 Traspasos","📋 Todos los registros"],
+                      ["🌍 Totales globales","👤 Totales por persona","🤝 Gastos compartidos","🔁 Traspasos","📋 Todos los registros","📈 Tendencias","📤 Exportar"],
                       horizontal=True)
 
-    # 🌍 Totales globales
-    if subtab=="🌍 Totales globales":
-        total_clp = df_activos[df_activos["Moneda"]=="CLP"]["Monto_int"].sum()
-        total_usd = df_activos[df_activos["Moneda"]=="USD"]["Monto_original"].sum()
-
-        st.write("**Totales**")
-        st.dataframe(pd.DataFrame({
-            "Total CLP":[formatear_monto(total_clp,"CLP")],
-            "Total USD originales":[formatear_monto(total_usd,"USD")]
-        }))
-
-        totales_tipo = df_activos.groupby("Tipo")["Monto_int"].sum().reset_index()
-        totales_tipo["Monto_fmt"] = totales_tipo.apply(lambda r: formatear_monto(r["Monto_int"],"CLP"), axis=1)
-        st.write("**Totales por tipo de movimiento (CLP)**")
-        st.dataframe(totales_tipo[["Tipo","Monto_fmt"]])
-
-    # 👤 Totales por persona
-    elif subtab=="👤 Totales por persona":
-        res_j = calcular_gastos_personales(df_periodo, USER_A)
-        res_f = calcular_gastos_personales(df_periodo, USER_B)
-
-        st.write("**Totales personales (CLP)**")
-        st.dataframe(pd.DataFrame([res_j,res_f]))
-
-        st.write("**Gastos por categoría (CLP)**")
-        cat_persona = df_activos[df_activos["Tipo"]=="Gasto"].groupby(["Persona","Categoría"])["Monto_int"].sum().reset_index()
-        cat_persona = cat_persona.sort_values(["Persona","Monto_int"], ascending=[True,False])
-        cat_persona["Monto_fmt"] = cat_persona.apply(lambda r: formatear_monto(r["Monto_int"],"CLP"), axis=1)
-        st.dataframe(cat_persona[["Persona","Categoría","Monto_fmt"]])
-
-    # 🤝 Gastos compartidos
-    elif subtab=="🤝 Gastos compartidos":
-        gastos_compartidos = df_activos[df_activos["Compartido_bool"]].copy()
-        if gastos_compartidos.empty:
-            st.info("No hay gastos compartidos en este período.")
-        else:
-            gastos_compartidos["Monto_fmt"] = gastos_compartidos.apply(
-                lambda r: formatear_monto(r["Monto_int"], "CLP"), axis=1
-            )
-            st.write("**Detalle de gastos compartidos**")
-            st.dataframe(gastos_compartidos[[
-                "Fecha","Detalle","Categoría","Persona","Monto_fmt","Proporcion_Javiera","Proporcion_Francis"
-            ]])
-
-            saldos = calcular_saldos(df_periodo)
-            st.write("**Totales de gastos compartidos**")
-            st.dataframe(pd.DataFrame([
-                {"Persona":USER_A, "Saldo pendiente": formatear_monto(saldos[USER_A],"CLP")},
-                {"Persona":USER_B, "Saldo pendiente": formatear_monto(saldos[USER_B],"CLP")}
-            ]))
-
-    # 🔁 Traspasos
-    elif subtab=="🔁 Traspasos":
-        trasp = df_activos[df_activos["Tipo"]=="Traspaso"].copy()
-        if trasp.empty:
-            st.info("No hay traspasos en este período.")
-        else:
-            trasp["Monto_fmt"] = trasp.apply(lambda r: formatear_monto(r["Monto_original"], r["Moneda"]), axis=1)
-            st.write("**Detalle de traspasos**")
-            st.dataframe(trasp[["Fecha","Persona_Origen","Persona_Destino","Monto_fmt","Moneda"]])
+    with _medir(f"resumen.{subtab}"):
+        # 🌍 Totales globales
+        if subtab=="🌍 Totales globales":
+            total_clp = cubo_periodo.loc[cubo_periodo["Moneda"]=="CLP", "Monto_int"].sum()
+            total_usd = cubo_periodo.loc[cubo_periodo["Moneda"]=="USD", "Monto_original"].sum()
+
+            st.write("**Totales**")
+            st.dataframe(pd.DataFrame({
+                "Total CLP":[formatear_monto(total_clp,"CLP")],
+                "Total USD originales":[formatear_monto(total_usd,"USD")]
+            }))
+
+            totales_tipo = cubo_periodo.groupby("Tipo", observed=True)["Monto_int"].sum().reset_index()
+            st.write("**Totales por tipo de movimiento (CLP)**")
+            st.dataframe(**_tabla_montos(totales_tipo, {"Monto_int": "CLP"}))
+
+        # 👤 Totales por persona
+        elif subtab=="👤 Totales por persona":
+            st.write("**Totales personales (CLP)**")
+            st.dataframe(calcular_totales_personales(cubo_periodo))
+
+            st.write("**Gastos por categoría (CLP)**")
+            cat_persona = cubo_periodo[cubo_periodo["Tipo"]=="Gasto"].groupby(["Persona","Categoría"], observed=True)["Monto_int"].sum().reset_index()
+            cat_persona = cat_persona.sort_values(["Persona","Monto_int"], ascending=[True,False])
+            st.dataframe(**_tabla_montos(cat_persona[["Persona","Categoría","Monto_int"]], {"Monto_int": "CLP"}))
+
+        # 🤝 Gastos compartidos
+        elif subtab=="🤝 Gastos compartidos":
+            gastos_compartidos = df_activos[df_activos["Compartido_bool"]]
+            if gastos_compartidos.empty:
+                st.info("No hay gastos compartidos en este período.")
+            else:
+                st.write("**Detalle de gastos compartidos**")
+                st.dataframe(**_tabla_montos(gastos_compartidos[[
+                    "Fecha","Detalle","Categoría","Persona","Monto_int","Reparto",*PROPORCION_COL.values()
+                ]], {"Monto_int": "CLP"}))
+
+                saldos = calcular_saldos(cubo_periodo)
+                st.write("**Totales de gastos compartidos**")
+                st.dataframe(pd.DataFrame([
+                    {"Persona": p, "Saldo pendiente": formatear_monto(saldos[p], "CLP")} for p in USUARIOS
+                ]))
+
+            transferencias = liquidar(cubo_periodo)
+            st.write("**Para quedar a mano (descontando traspasos)**")
+            if transferencias:
+                st.dataframe(**_tabla_montos(pd.DataFrame(transferencias), {"Monto": "CLP"}), hide_index=True)
+            else:
+                st.caption("Nadie le debe a nadie en este período.")
+
+        # 🔁 Traspasos
+        elif subtab=="🔁 Traspasos":
+            trasp = df_activos[df_activos["Tipo"]=="Traspaso"]
+            if trasp.empty:
+                st.info("No hay traspasos en este período.")
+            else:
+                st.write("**Detalle de traspasos**")
+                st.dataframe(**_tabla_montos(
+                    trasp[["Fecha","Persona_Origen","Persona_Destino","Monto_original","Moneda"]],
+                    {"Monto_original": "Moneda"}
+                ))
+
+                resumen_trasp = (cubo_periodo[cubo_periodo["Tipo"]=="Traspaso"]
+                                 .groupby("Persona_Origen", observed=True)["Monto_int"].sum().reset_index())
+                st.write("**Resumen neto de traspasos (CLP)**")
+                st.dataframe(**_tabla_montos(resumen_trasp, {"Monto_int": "CLP"}))
+
+        # 📋 Todos los registros
+        elif subtab=="📋 Todos los registros":
+            with st.expander("Ver registros completos del período"):
+                # Formato resuelto en el navegador: sin columnas de texto extra en el servidor.
+                st.dataframe(df_periodo, column_config={
+                    "Monto_int": st.column_config.NumberColumn("Monto CLP", format="$%d"),
+                    "Monto_original": st.column_config.NumberColumn("Monto original", format="%.2f"),
+                })
+
+        # 📈 Tendencias (toda la historia, desde los rollups)
+        elif subtab=="📈 Tendencias":
+            _tendencias(_rollups(cubo, version))
+
+        # 📤 Exportar
+        elif subtab=="📤 Exportar":
+            formato = st.selectbox("Formato", list(FORMATOS_EXPORT))
+            st.caption(f"{len(df_periodo)} registros del período, con los totales por persona y la liquidación.")
+            if st.button("Preparar archivo"):
+                ext, mime = FORMATOS_EXPORT[formato]
+                periodo = mes_sel or ("_".join(str(d) for d in rango) if rango else "todo")
+                try:
+                    with tempfile.TemporaryFile() as f:
+                        exportar_periodo(df_periodo, cubo_periodo, ext, f)
+                        f.seek(0)
+                        datos = f.read()
+                except ImportError as e:
+                    st.error(f"Falta el paquete {e.name} para exportar en este formato.")
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    sufijo = "xlsx" if ext == "xlsx" else f"{ext}.zip"
+                    st.download_button("⬇️ Descargar", datos, file_name=f"finanzas_{periodo}.{sufijo}", mime=mime)
 
-            resumen_trasp = trasp.groupby("Persona_Origen")["Monto_int"].sum().reset_index()
-            resumen_trasp["Monto_fmt"] = resumen_trasp.apply(lambda r: formatear_monto(r["Monto_int"],"CLP"), axis=1)
-            st.write("**Resumen neto de traspasos (CLP)**")
-            st.dataframe(resumen_trasp[["Persona_Origen","Monto_fmt"]])
-
-    # 📋 Todos los registros
-    elif subtab=="📋 Todos los registros":
-        with st.expander("Ver registros completos del período"):
-            df_periodo["Monto_fmt"] = df_periodo.apply(
-                lambda r: formatear_monto(r["Monto_original"], r["Moneda"]), axis=1
-            )
-            st.dataframe(df_periodo)
 
+# =========================================================
+# CIERRES
+# =========================================================
+@st.cache_data(ttl=600)
+def _load_cierres() -> pd.DataFrame:
+    return _leer_cierres()
+
+@st.cache_data(persist="disk", show_spinner="Cargando período cerrado…")
+def _load_archivo(anio: int) -> pd.DataFrame:
+    return _leer_archivo(anio)
+
+def _cierres(df: pd.DataFrame, version: int):
+    st.subheader("🗄️ Períodos cerrados")
+    cierres = _load_cierres()
+    if cierres.empty:
+        st.info("Aún no hay períodos cerrados.")
+    else:
+        st.dataframe(**_tabla_montos(cierres, {c: "CLP" for c in CIERRE_MONTOS}), hide_index=True)
+
+        saldos_abiertos = calcular_saldos(_cubo_mensual(_cubo(df, version), version))
+        cerrados = cierres.groupby("Persona")["Saldo"].sum()
+        st.write("**Saldo de gastos compartidos acumulado (cerrados + abiertos)**")
+        st.dataframe(pd.DataFrame([
+            {"Persona": p, "Saldo pendiente": formatear_monto(cerrados.get(p, 0) + saldos_abiertos[p], "CLP")}
+            for p in USUARIOS
+        ]), hide_index=True)
+
+        periodos = sorted(cierres["Periodo"].unique(), reverse=True)
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            periodo = st.selectbox("Detalle del período", periodos)
+            if st.button("📂 Cargar detalle"):
+                st.session_state["cierre_detalle"] = periodo
+        if st.session_state.get("cierre_detalle") == periodo:
+            df_arch = _load_archivo(int(periodo))
+            with col2:
+                st.write(f"**Gastos por categoría {periodo} (CLP)**")
+                cubo_arch = _construir_cubo(df_arch)
+                cat = (cubo_arch[cubo_arch["Tipo"] == "Gasto"]
+                       .groupby(["Persona", "Categoría"], observed=True)["Monto_int"].sum().reset_index()
+                       .sort_values(["Persona", "Monto_int"], ascending=[True, False]))
+                st.dataframe(**_tabla_montos(cat, {"Monto_int": "CLP"}), hide_index=True)
+            with st.expander(f"Registros de {periodo} ({len(df_arch)})"):
+                st.dataframe(df_arch, column_config={
+                    "Monto_int": st.column_config.NumberColumn("Monto CLP", format="$%d"),
+                    "Monto_original": st.column_config.NumberColumn("Monto original", format="%.2f"),
+                })
+
+    anio_actual = dt.date.today().year
+    anios = sorted({int(a) for a in df["Fecha_dt"].dt.year.dropna().unique() if a < anio_actual})
+    with st.expander("🔒 Cerrar un período"):
+        if not anios:
+            st.caption("No hay años anteriores abiertos para cerrar.")
+            return
+        anio = st.selectbox("Año a cerrar", anios)
+        st.caption("Sus registros pasan a su propia hoja y dejan de cargarse por defecto; "
+                   "sus totales y saldos quedan congelados aquí.")
+        confirmar = st.checkbox(f"Confirmo que {anio} está completo")
+        if st.button(f"Cerrar {anio}", disabled=not confirmar):
+            try:
+                n = _cerrar_periodo(anio)
+            except ConflictoEdicion as e:
+                st.error(str(e))
+                return
+            finally:
+                _load_cierres.clear()
+                _load_archivo.clear()
+            st.success(f"{anio} cerrado: {n} registros archivados ✅")
 
 # =========================================================
 # MAIN
 # =========================================================
 def render():
-    df_raw = _load_df()
-    df = _normalize_df(df_raw)
+    st.set_page_config(page_title="Finanzas APP", page_icon="💰", layout="wide")
+    st.title("💰 Finanzas Javiera & Francis")
+    rerun = _inicio_rerun()
+    with _medir("carga"):
+        df_raw, version = _load_ledger()
+    df = _ledger_normalizado(df_raw, version)
     cats = sorted(df["Categoría"].dropna().unique().tolist())
 
     tab = st.radio(
         "Navegación",
-        ["📊 Resumen","➕ Ingreso/Gasto","🔁 Traspaso","📜 Historial"],
+        ["📊 Resumen","➕ Ingreso/Gasto","🔁 Traspaso","📥 Importar","📜 Historial","🗄️ Cierres"],
         horizontal=True,
         key="active_tab"
     )
@@ -538,12 +790,25 @@ def render():
         _show_flash()
 
     if tab == "📊 Resumen":
-        _resumen(df)
+        _resumen(df, version)
     elif tab == "➕ Ingreso/Gasto":
-        _form_ingreso_gasto(cats)
+        _form_ingreso_gasto(cats, df, version)
     elif tab == "🔁 Traspaso":
-        _form_traspaso()
+        _form_traspaso(df, version)
+    elif tab == "📥 Importar":
+        _importar(cats, df, version)
     elif tab == "📜 Historial":
-        _historial(df)
-
-render()
+        with _medir("historial"):
+            _historial(df, df_raw, version)
+    elif tab == "🗄️ Cierres":
+        _cierres(df, version)
+
+    _panel_pendientes()
+    resumen = _fin_rerun(rerun)
+    if st.sidebar.checkbox("🛠️ Depuración", value=st.query_params.get("debug") == "1", key="debug"):
+        _panel_debug(resumen)
+
+# Streamlit ejecuta este archivo como __main__; importarlo (p.ej. desde
+# benchmarks/) no dibuja la app.
+if __name__ == "__main__":
+    render()
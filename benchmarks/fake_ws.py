@@ -0,0 +1,142 @@
+"""Hoja y planilla de gspread en memoria para benchmarks y pruebas sin red.
+
+Implementan sólo las llamadas que usan `finanzas.sheets` y `finanzas.cierres` y
+cuentan cuántas veces se hace cada una, como si fueran llamadas a la API de Google Sheets.
+"""
+import re
+from collections import Counter
+from types import SimpleNamespace
+
+_A1 = re.compile(r"^([A-Z]*)(\d*)$")
+
+
+def _col_num(letras: str) -> int:
+    n = 0
+    for ch in letras:
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+def _parse_a1(a1: str) -> tuple[int, int, int | None, int | None]:
+    """"A2:T" -> (2, 1, None, 20). Fila o columna final None = hasta el final."""
+    ini, _, fin = a1.partition(":")
+    fin = fin or ini
+    c1, r1 = _A1.match(ini).groups()
+    c2, r2 = _A1.match(fin).groups()
+    return (int(r1 or 1), _col_num(c1 or "A"),
+            int(r2) if r2 else None, _col_num(c2) if c2 else None)
+
+
+class FakeWorksheet:
+    def __init__(self, values: list[list[str]], title: str = "finanzas", id: int = 0):
+        self.title = title
+        self.id = id
+        self._values = [list(r) for r in values]
+        self.llamadas = Counter()
+
+    # -- lecturas -------------------------------------------------------
+    def _rango(self, a1: str) -> list[list[str]]:
+        r1, c1, r2, c2 = _parse_a1(a1)
+        filas = self._values[r1 - 1:r2]
+        out = []
+        for fila in filas:
+            celdas = fila[c1 - 1:c2]
+            while celdas and celdas[-1] == "":
+                celdas.pop()
+            out.append(celdas)
+        # Como la API real: sin filas vacías al final del rango.
+        while out and not out[-1]:
+            out.pop()
+        return out
+
+    def get_all_values(self) -> list[list[str]]:
+        self.llamadas["get_all_values"] += 1
+        filas = list(self._values)
+        while filas and not any(filas[-1]):
+            filas.pop()
+        ancho = max((len(r) for r in filas), default=0)
+        return [r + [""] * (ancho - len(r)) for r in filas]
+
+    def row_values(self, row: int) -> list[str]:
+        self.llamadas["row_values"] += 1
+        fila = self._rango(f"A{row}:{row}")
+        return fila[0] if fila else []
+
+    def get(self, a1: str) -> list[list[str]]:
+        self.llamadas["get"] += 1
+        return self._rango(a1)
+
+    def batch_get(self, ranges: list[str]) -> list[list[list[str]]]:
+        self.llamadas["batch_get"] += 1
+        return [self._rango(r) for r in ranges]
+
+    def find(self, query: str, in_column: int | None = None):
+        self.llamadas["find"] += 1
+        for i, fila in enumerate(self._values, start=1):
+            cols = [in_column - 1] if in_column else range(len(fila))
+            for c in cols:
+                if c < len(fila) and fila[c] == query:
+                    return SimpleNamespace(row=i, col=c + 1, value=query)
+        return None
+
+    # -- escrituras -----------------------------------------------------
+    def _escribir(self, a1: str, values: list[list]):
+        r1, c1, _, _ = _parse_a1(a1)
+        for dr, fila in enumerate(values):
+            r = r1 - 1 + dr
+            while len(self._values) <= r:
+                self._values.append([])
+            destino = self._values[r]
+            fin = c1 - 1 + len(fila)
+            destino.extend([""] * (fin - len(destino)))
+            destino[c1 - 1:fin] = ["" if v is None else str(v) for v in fila]
+
+    def update(self, a1: str, values: list[list], **kwargs):
+        self.llamadas["update"] += 1
+        self._escribir(a1, values)
+
+    def batch_update(self, data: list[dict], **kwargs):
+        self.llamadas["batch_update"] += 1
+        for d in data:
+            self._escribir(d["range"], d["values"])
+
+    def batch_clear(self, ranges: list[str]):
+        self.llamadas["batch_clear"] += 1
+        for a1 in ranges:
+            r1, c1, r2, c2 = _parse_a1(a1)
+            for fila in self._values[r1 - 1:r2]:
+                fin = len(fila) if c2 is None else min(c2, len(fila))
+                fila[c1 - 1:fin] = [""] * max(0, fin - c1 + 1)
+
+    def append_row(self, row: list, **kwargs):
+        self.llamadas["append_row"] += 1
+        self._values.append(["" if v is None else str(v) for v in row])
+
+    def append_rows(self, rows: list[list], **kwargs):
+        self.llamadas["append_rows"] += 1
+        for row in rows:
+            self._values.append(["" if v is None else str(v) for v in row])
+
+
+class FakeSpreadsheet:
+    """Planilla con varias FakeWorksheet, por título; su batch_update sólo borra filas."""
+
+    def __init__(self, hojas: list[FakeWorksheet]):
+        self.hojas = {ws.title: ws for ws in hojas}
+        self.llamadas = Counter()
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.llamadas["worksheet"] += 1
+        return self.hojas[title]
+
+    def add_worksheet(self, title: str, rows: int, cols: int) -> FakeWorksheet:
+        self.llamadas["add_worksheet"] += 1
+        self.hojas[title] = FakeWorksheet([], title, id=max((ws.id for ws in self.hojas.values()), default=-1) + 1)
+        return self.hojas[title]
+
+    def batch_update(self, body: dict):
+        self.llamadas["batch_update"] += 1
+        por_id = {ws.id: ws for ws in self.hojas.values()}
+        for req in body["requests"]:
+            r = req["deleteDimension"]["range"]
+            del por_id[r["sheetId"]]._values[r["startIndex"]:r["endIndex"]]
@@ -0,0 +1,171 @@
+"""Benchmarks de las etapas calientes del núcleo `finanzas` sobre ledgers sintéticos.
+
+Uso (desde la raíz del repo):
+
+    python -m benchmarks.run                         # 1k, 10k y 100k filas
+    python -m benchmarks.run --tamanos 1000000       # hasta 1M
+    python -m benchmarks.run --verificar             # falla si se superan los umbrales
+    python -m benchmarks.run --actualizar-umbrales   # recalibra umbrales.json en esta máquina
+
+Por etapa se informa el mejor tiempo de N repeticiones y el pico de memoria
+(tracemalloc) de una corrida aparte, para que la medición de memoria no
+distorsione los tiempos.
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from finanzas import calculos, conciliacion, config, modelo, sheets
+from benchmarks.fake_ws import FakeWorksheet
+from benchmarks.sintetico import generar_ledger
+
+UMBRALES_PATH = Path(__file__).with_name("umbrales.json")
+MARGEN_UMBRAL = 1.5  # holgura al recalibrar: umbral = tiempo medido × margen
+
+
+def _medir(correr, preparar=None, repeticiones=3) -> tuple[float, int]:
+    tiempos = []
+    for _ in range(repeticiones):
+        arg = preparar() if preparar else None
+        t0 = time.perf_counter()
+        correr(arg)
+        tiempos.append(time.perf_counter() - t0)
+    arg = preparar() if preparar else None
+    tracemalloc.start()
+    correr(arg)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(tiempos), pico
+
+
+def _resumen_headless(df, cubo_mes, idx_df, idx_mes):
+    """Lo que calcula `_resumen` para el último mes, sin Streamlit."""
+    mes = idx_df["meses"][-1]
+    df_periodo = calculos._cortar_periodo(df, idx_df, mes)
+    cubo_periodo = calculos._cortar_periodo(cubo_mes, idx_mes, mes)
+    cubo_periodo.groupby("Tipo", observed=True)["Monto_int"].sum()
+    (cubo_periodo[cubo_periodo["Tipo"] == "Gasto"]
+     .groupby(["Persona", "Categoría"], observed=True)["Monto_int"].sum())
+    calculos.calcular_totales_personales(cubo_periodo)
+    calculos.calcular_saldos(cubo_periodo)
+    calculos.liquidar(cubo_periodo)
+    df_periodo[~df_periodo["Anulado_bool"] & df_periodo["Compartido_bool"]]
+
+
+def correr_tamano(n: int, repeticiones: int) -> dict[str, dict]:
+    valores = generar_ledger(n)
+    tmp = Path(tempfile.mkdtemp(prefix="bench_finanzas_"))
+    snap = tmp / "ledger.sqlite"
+    res = {}
+
+    def _etapa(nombre, correr, preparar=None):
+        seg, pico = _medir(correr, preparar, repeticiones)
+        res[nombre] = {"segundos": seg, "pico_mb": pico / 2**20}
+        print(f"  {nombre:<20} {seg*1000:10.1f} ms {pico / 2**20:10.1f} MB", flush=True)
+
+    # -- carga desde la hoja ------------------------------------------------
+    def _carga(_):
+        snap.unlink(missing_ok=True)
+        sheets._sync_ledger(FakeWorksheet(valores), sheets._nuevo_ledger_state(), snap)
+    _etapa("carga_completa", _carga)
+
+    base = sheets._nuevo_ledger_state()
+    sheets._sync_ledger(FakeWorksheet(valores), base, snap)
+
+    def _preparar_delta():
+        # 1% de filas nuevas y 10 filas editadas desde la última sincronización.
+        ws = FakeWorksheet(valores)
+        nuevas = generar_ledger(max(1, n // 100), seed=1)[1:]
+        ws._values.extend(nuevas)
+        lm = config.EXPECTED_HEADERS.index("Last_Modified_At")
+        for fila in ws._values[1:11]:
+            fila[lm] = "2099-01-01 00:00:00"
+        shutil.copy(snap, tmp / "delta.sqlite")
+        return ws, {**base}
+
+    _etapa("sync_delta", lambda a: sheets._sync_ledger(a[0], a[1], tmp / "delta.sqlite"), _preparar_delta)
+    _etapa("snapshot_carga", lambda _: sheets._snapshot_load(sheets._nuevo_ledger_state(), snap))
+
+    # -- normalización y agregados -----------------------------------------
+    df_raw = base["df"]
+    _etapa("normalizar", lambda _: modelo._normalize_df(df_raw))
+    df = modelo._normalize_df(df_raw)
+    _etapa("cubo", lambda _: calculos._construir_cubo(df))
+    cubo = calculos._construir_cubo(df)
+    _etapa("cubo_mensual", lambda _: calculos._construir_cubo_mensual(cubo))
+    cubo_mes = calculos._construir_cubo_mensual(cubo)
+    _etapa("gastos_personales", lambda _: calculos.calcular_totales_personales(cubo_mes))
+    _etapa("saldos", lambda _: calculos.calcular_saldos(cubo_mes))
+    _etapa("liquidacion", lambda _: calculos.liquidar(cubo_mes))
+
+    # -- duplicados y conciliación ----------------------------------------
+    _etapa("indice_duplicados", lambda _: conciliacion._construir_indice_duplicados(df))
+    # Cartola: 20% de los registros con 0 a 3 días de desfase; la mitad con un monto que no calza.
+    muestra = df.sample(frac=0.2, random_state=0)
+    desfase = pd.to_timedelta(np.random.default_rng(0).integers(0, 4, len(muestra)), unit="D")
+    cartola = muestra.assign(Fecha_dt=muestra["Fecha_dt"] + desfase,
+                             Monto_int=np.where(np.arange(len(muestra)) % 2, muestra["Monto_int"] + 1, muestra["Monto_int"]))
+    _etapa("conciliacion", lambda _: conciliacion.conciliar(df, cartola))
+    _etapa("indice_fechas", lambda _: (calculos._construir_indice_fechas(df), calculos._construir_indice_fechas(cubo_mes)))
+    idx_df, idx_mes = calculos._construir_indice_fechas(df), calculos._construir_indice_fechas(cubo_mes)
+    _etapa("resumen", lambda _: _resumen_headless(df, cubo_mes, idx_df, idx_mes))
+
+    # -- historial ------------------------------------------------------------
+    _etapa("indice_texto", lambda _: calculos._construir_indice_texto(df))
+    indice = calculos._construir_indice_texto(df)
+    _etapa("busqueda", lambda _: calculos._buscar(indice, "cena uber"))
+    return res
+
+
+def verificar(resultados: dict, umbrales: dict) -> list[str]:
+    fallas = []
+    for n, etapas in resultados.items():
+        for etapa, r in etapas.items():
+            limite = umbrales.get(str(n), {}).get(etapa)
+            if limite is not None and r["segundos"] > limite:
+                fallas.append(f"{n} filas / {etapa}: {r['segundos']:.3f}s > umbral {limite:.3f}s")
+    return fallas
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--json", type=Path, help="guardar resultados en este archivo")
+    parser.add_argument("--verificar", action="store_true", help="salir con error si se superan los umbrales")
+    parser.add_argument("--actualizar-umbrales", action="store_true")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for n in args.tamanos:
+        print(f"{n:,} filas")
+        resultados[n] = correr_tamano(n, args.repeticiones)
+
+    if args.json:
+        args.json.write_text(json.dumps(resultados, indent=2))
+
+    umbrales = json.loads(UMBRALES_PATH.read_text()) if UMBRALES_PATH.exists() else {}
+    if args.actualizar_umbrales:
+        for n, etapas in resultados.items():
+            umbrales[str(n)] = {e: round(r["segundos"] * MARGEN_UMBRAL, 4) for e, r in etapas.items()}
+        UMBRALES_PATH.write_text(json.dumps(umbrales, indent=2, sort_keys=True) + "\n")
+        print(f"Umbrales guardados en {UMBRALES_PATH}")
+
+    if args.verificar:
+        fallas = verificar(resultados, umbrales)
+        for f in fallas:
+            print(f"REGRESIÓN {f}", file=sys.stderr)
+        return 1 if fallas else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
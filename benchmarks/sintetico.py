@@ -0,0 +1,95 @@
+"""Generador de ledgers sintéticos con la forma de la hoja `finanzas`.
+
+Produce filas de texto (como las devuelve `get_all_values`) con la mezcla
+que tiene el ledger real: ingresos, gastos individuales y compartidos,
+traspasos, registros en USD, anulaciones y ediciones.
+"""
+import numpy as np
+import pandas as pd
+
+from finanzas import config
+
+CATEGORIAS = [
+    "Supermercado", "Arriendo", "Luz", "Agua", "Gas", "Internet", "Transporte",
+    "Bencina", "Restaurant", "Farmacia", "Salud", "Mascotas", "Ropa", "Viajes",
+    "Regalos", "Educación", "Suscripciones", "Hogar", "Sueldo", "Otros",
+]
+PALABRAS = [
+    "compra", "pago", "cuota", "mensual", "líder", "jumbo", "uber", "copec",
+    "netflix", "spotify", "cena", "almuerzo", "vet", "regalo", "pasajes",
+    "hotel", "arriendo", "cuenta", "boleta", "feria", "pan", "café", "metro",
+]
+
+
+def generar_ledger(n: int, seed: int = 0, inicio: str = "2019-01-01") -> list[list[str]]:
+    """Devuelve encabezados + `n` filas de texto con columnas EXPECTED_HEADERS."""
+    rng = np.random.default_rng(seed)
+    personas = np.array(config.USUARIOS)
+
+    # ~15 movimientos por día, repartidos desde `inicio` en orden de registro.
+    dias = max(1, n // 15)
+    fechas = pd.Timestamp(inicio) + pd.to_timedelta(np.sort(rng.integers(0, dias, n)), unit="D")
+
+    u = rng.random(n)
+    tipo = np.where(u < 0.05, "Traspaso", np.where(u < 0.15, "Ingreso", "Gasto"))
+    es_gasto = tipo == "Gasto"
+    es_trasp = tipo == "Traspaso"
+    compartido = es_gasto & (rng.random(n) < 0.35)
+    usd = ~es_trasp & (rng.random(n) < 0.08)
+    anulado = rng.random(n) < 0.03
+    editado = rng.random(n) < 0.05
+
+    pagador = rng.integers(0, len(personas), n)
+    persona = np.where(es_trasp, "", personas[pagador])
+    origen = np.where(es_trasp, personas[pagador], "")
+    destino = np.where(es_trasp, personas[1 - pagador], "")
+
+    original = np.where(usd, np.round(rng.lognormal(3.5, 1.0, n), 2),
+                        np.round(rng.lognormal(9.5, 1.2, n), -1))
+    tasa = 800 + 200 * rng.random(n)
+    monto = np.where(usd, original * tasa, original).round().astype(np.int64)
+
+    prop_a = rng.integers(0, 21, n) * 5
+    # La mitad de los compartidos trae el reparto normalizado; el resto sólo las columnas heredadas.
+    con_reparto = compartido & (rng.random(n) < 0.5)
+    reparto = (f"{personas[0]}=" + pd.Series(prop_a / 100).astype(str)
+               + f";{personas[1]}=" + pd.Series(1 - prop_a / 100).round(2).astype(str)).to_numpy()
+
+    # np.char.add y no `+`: sumar arreglos de texto sólo funciona desde numpy 2.
+    palabras = np.array(PALABRAS)
+    detalle = np.char.add(np.char.add(palabras[rng.integers(0, len(PALABRAS), n)], " "),
+                          palabras[rng.integers(0, len(PALABRAS), n)])
+    categoria = np.where(tipo == "Ingreso", "Sueldo",
+                         np.array(CATEGORIAS)[rng.integers(0, len(CATEGORIAS) - 2, n)])
+    categoria = np.where(es_trasp, "", categoria)
+
+    creado = fechas + pd.to_timedelta(rng.integers(8 * 3600, 23 * 3600, n), unit="s")
+    modificado = creado + pd.to_timedelta(rng.integers(3600, 30 * 86400, n), unit="s")
+    fmt = "%Y-%m-%d %H:%M:%S"
+    modificado_txt = np.where(editado | anulado, modificado.strftime(fmt), "")
+
+    cols = {
+        "ID": [f"{seed:04x}{i:012x}-sint" for i in range(n)],
+        "Tipo": tipo,
+        "Detalle": detalle,
+        "Categoría": categoria,
+        "Fecha": fechas.strftime("%Y-%m-%d"),
+        "Persona": persona,
+        "Persona_Origen": origen,
+        "Persona_Destino": destino,
+        "Monto": monto.astype(str),
+        "Monto_original": original.astype(str),
+        "Moneda": np.where(usd, "USD", "CLP"),
+        "Medio": np.where(es_trasp, "", np.array(config.MEDIOS)[rng.integers(0, len(config.MEDIOS), n)]),
+        "Compartido": np.where(compartido, "TRUE", ""),
+        "Proporcion_Javiera": np.where(compartido, prop_a.astype(str), ""),
+        "Proporcion_Francis": np.where(compartido, (100 - prop_a).astype(str), ""),
+        "Created_At": creado.strftime(fmt),
+        "Created_By": np.where(es_trasp, origen, persona),
+        "Last_Modified_At": modificado_txt,
+        "Last_Modified_By": np.where(anulado, "Anulación", np.where(editado, "Edición manual", "")),
+        "Anulado": np.where(anulado, "TRUE", ""),
+        "Reparto": np.where(con_reparto, reparto, ""),
+    }
+    df = pd.DataFrame(cols)[config.EXPECTED_HEADERS]
+    return [list(config.EXPECTED_HEADERS)] + df.to_numpy().tolist()
@@ -0,0 +1,15 @@
+"""Núcleo de Finanzas Hogar, sin interfaz: modelo del ledger, lectura y escritura
+de la hoja o de archivos locales, cálculos, cierres y exportación.
+
+Importar el paquete no carga nada pesado; cada submódulo se importa al
+usarlo (`finanzas.calculos`, `finanzas.sheets`, ...), y gspread, google-auth,
+requests y Streamlit sólo cuando una función los necesita.
+"""
+import importlib
+
+SUBMODULOS = {"calculos", "cierres", "conciliacion", "config", "exportar", "fx", "importar", "local", "metricas", "modelo", "recursos", "sheets"}
+
+def __getattr__(nombre: str):
+    if nombre in SUBMODULOS:
+        return importlib.import_module(f"{__name__}.{nombre}")
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -0,0 +1,147 @@
+"""Línea de comandos del núcleo: resúmenes, liquidación, exportación, respaldo y conciliación sin interfaz.
+
+Uso (desde la raíz del repo):
+
+    python -m finanzas resumen --mes 2024-05                 # lee la hoja (credenciales en FINANZAS_CREDENCIALES)
+    python -m finanzas liquidar --archivo ledger.csv --json  # offline, desde un CSV o un snapshot .sqlite
+    python -m finanzas exportar xlsx mayo.xlsx --mes 2024-05
+    python -m finanzas respaldar respaldo.sqlite
+    python -m finanzas conciliar cartola.csv --persona "🐳Javiera" --json
+
+Sin --archivo se lee la hoja completa directamente, sin pasar por la caché
+de la app.
+"""
+import argparse
+import io
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from finanzas.calculos import (
+    _construir_cubo, _construir_cubo_mensual, _construir_indice_fechas, _cortar_periodo,
+    calcular_saldos, calcular_totales_personales, liquidar,
+)
+from finanzas.conciliacion import VENTANA_CONCILIACION_DIAS
+from finanzas.config import USUARIOS
+from finanzas.exportar import FORMATOS_EXPORT, exportar_periodo
+from finanzas.importar import _conciliar_cartola, _huella, _preparar_importacion, _sugerir_mapeo, leer_cartola
+from finanzas.modelo import _normalize_df
+
+def _ledger_crudo(args):
+    if args.archivo:
+        from finanzas.local import cargar_ledger
+        return cargar_ledger(args.archivo)
+    from finanzas.sheets import _leer_hoja
+    return _leer_hoja()
+
+def _periodo(args):
+    """Registros normalizados y cubo del período pedido (todo el ledger si no se pide uno)."""
+    df = _normalize_df(_ledger_crudo(args))
+    cubo = _construir_cubo(df)
+    rango = (args.desde or "1900-01-01", args.hasta or "2999-12-31") if args.desde or args.hasta else None
+    df = _cortar_periodo(df, _construir_indice_fechas(df), args.mes, rango)
+    if args.mes or not rango:
+        cubo = _construir_cubo_mensual(cubo)
+    cubo = _cortar_periodo(cubo, _construir_indice_fechas(cubo), args.mes, rango)
+    return df, cubo
+
+def _resumen(args) -> dict:
+    _, cubo = _periodo(args)
+    por_tipo = cubo.groupby("Tipo", observed=True)["Monto_int"].sum()
+    return {
+        "totales": {str(t): int(v) for t, v in por_tipo.items()},
+        "personales": calcular_totales_personales(cubo).to_dict("records"),
+        "saldos": calcular_saldos(cubo),
+    }
+
+def _liquidar(args) -> list[dict]:
+    _, cubo = _periodo(args)
+    return liquidar(cubo)
+
+def _exportar(args) -> dict:
+    df, cubo = _periodo(args)
+    exportar_periodo(df, cubo, args.formato, args.destino)
+    return {"destino": args.destino, "registros": len(df)}
+
+def _respaldar(args) -> dict:
+    from finanzas.local import guardar_ledger
+    df_raw = _ledger_crudo(args)
+    guardar_ledger(df_raw, args.destino)
+    return {"destino": args.destino, "registros": len(df_raw)}
+
+def _conciliar(args) -> dict:
+    datos = Path(args.cartola).read_bytes()
+    raw = leer_cartola(io.BytesIO(datos), args.encoding)
+    mapeo = _sugerir_mapeo(raw.columns)
+    if not mapeo["Fecha"] or not mapeo["Monto"]:
+        raise SystemExit(f"{args.cartola}: no se reconocen las columnas de Fecha y Monto")
+    defaults = {"Persona": args.persona, "Moneda": "CLP", "Medio": args.medio, "Categoría": "", "Tipo": "Gasto"}
+    registros, descartadas = _preparar_importacion(raw, mapeo, defaults, args.decimal, not args.mes_primero,
+                                                   origen=_huella(datos))
+    salida = {"calzados": 0, "solo_cartola": len(registros), "solo_ledger": 0, "descartadas": descartadas}
+    if registros.empty:
+        return salida
+    _, _, res = _conciliar_cartola(registros, _normalize_df(_ledger_crudo(args)), args.ventana, args.medio)
+    salida.update(calzados=len(res["calces"]), solo_cartola=len(res["solo_cartola"]), solo_ledger=len(res["solo_libro"]))
+    if args.json:
+        salida["faltan_en_ledger"] = res["solo_cartola"][["Fecha", "Detalle", "Monto_int"]].to_dict("records")
+        salida["faltan_en_cartola"] = res["solo_libro"][["ID", "Fecha", "Detalle", "Monto_int"]].to_dict("records")
+    return salida
+
+def _nativo(valor):
+    """Escalares de numpy a tipos de Python, para imprimir y serializar limpio."""
+    if isinstance(valor, dict):
+        return {k: _nativo(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_nativo(v) for v in valor]
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+def _imprimir(resultado, como_json: bool):
+    resultado = _nativo(resultado)
+    if como_json:
+        print(json.dumps(resultado, ensure_ascii=False, indent=2))
+        return
+    filas = resultado if isinstance(resultado, list) else [resultado]
+    for fila in filas:
+        for clave, valor in fila.items():
+            print(f"{clave}: {valor}")
+        if len(filas) > 1:
+            print()
+
+def main(argv=None) -> int:
+    fuente = argparse.ArgumentParser(add_help=False)
+    fuente.add_argument("--archivo", help="CSV o snapshot .sqlite local en vez de la hoja")
+    fuente.add_argument("--json", action="store_true", help="salida en JSON")
+    comun = argparse.ArgumentParser(add_help=False, parents=[fuente])
+    comun.add_argument("--mes", help="período YYYY-MM")
+    comun.add_argument("--desde", help="fecha inicial YYYY-MM-DD (inclusive)")
+    comun.add_argument("--hasta", help="fecha final YYYY-MM-DD (inclusive)")
+
+    parser = argparse.ArgumentParser(prog="python -m finanzas", description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("resumen", parents=[comun], help="totales, gastos por persona y saldos")
+    sub.add_parser("liquidar", parents=[comun], help="transferencias para quedar a mano")
+    p = sub.add_parser("exportar", parents=[comun], help="exporta el período a CSV, Parquet o Excel")
+    p.add_argument("formato", choices=[ext for ext, _ in FORMATOS_EXPORT.values()])
+    p.add_argument("destino")
+    p = sub.add_parser("respaldar", parents=[fuente], help="guarda el ledger crudo como CSV o .sqlite")
+    p.add_argument("destino")
+    p = sub.add_parser("conciliar", parents=[fuente], help="calza una cartola CSV con el ledger")
+    p.add_argument("cartola")
+    p.add_argument("--persona", choices=USUARIOS, default=USUARIOS[0], help="titular de la cuenta")
+    p.add_argument("--medio", default="", help="sólo registros con este medio de pago")
+    p.add_argument("--ventana", type=int, default=VENTANA_CONCILIACION_DIAS, help="días de desfase aceptados")
+    p.add_argument("--decimal", choices=[",", "."], default=",")
+    p.add_argument("--mes-primero", action="store_true", help="fechas mes/día/año")
+    p.add_argument("--encoding", default="utf-8")
+    args = parser.parse_args(argv)
+
+    comandos = {"resumen": _resumen, "liquidar": _liquidar, "exportar": _exportar, "respaldar": _respaldar,
+                "conciliar": _conciliar}
+    _imprimir(comandos[args.comando](args), args.json)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""Cálculos sobre el ledger normalizado: cubo de agregados, totales, deudas y liquidación.
+
+Los derivados caros se memoizan por versión de datos con `_por_version`.
+"""
+import bisect
+
+import pandas as pd
+import numpy as np
+
+from finanzas.config import USUARIOS
+from finanzas.metricas import _contar_cache, _medir
+from finanzas.modelo import _normalize_df, _pesos_reparto
+from finanzas.recursos import recurso
+
+@recurso
+def _memo_store() -> dict:
+    return {}
+
+def _por_version(nombre: str, version: int, builder):
+    """Memoiza `builder()` para una versión de datos; sólo se guarda la última versión."""
+    memo = _memo_store()
+    hit = memo.get(nombre)
+    _contar_cache(nombre, hit is not None and hit[0] == version)
+    if hit is not None and hit[0] == version:
+        return hit[1]
+    with _medir(nombre):
+        valor = builder()
+    memo[nombre] = (version, valor)
+    return valor
+
+def _ledger_normalizado(df_raw: pd.DataFrame, version: int) -> pd.DataFrame:
+    return _por_version("normalizado", version, lambda: _normalize_df(df_raw))
+
+# Todos los cálculos leen de un "cubo": los registros no anulados
+# agregados por día × persona × categoría × tipo × compartido (más moneda y
+# origen/destino de traspasos), con la parte de cada persona en los gastos
+# compartidos ya resuelta. Con ~15 movimientos al día el cubo diario queda
+# casi del tamaño del ledger, así que los meses y la historia completa se
+# responden desde el cubo mensual; el diario queda para rangos arbitrarios
+# y tendencias.
+CUBO_DIMS = ["Fecha_dt","Persona","Categoría","Tipo","Compartido_bool","Moneda","Persona_Origen","Persona_Destino"]
+
+def _parte_col(persona: str) -> str:
+    return f"Parte_{persona}"
+
+def _construir_cubo(df: pd.DataFrame) -> pd.DataFrame:
+    medidas = ["Monto_int","Monto_original","Registros"] + [_parte_col(p) for p in USUARIOS]
+    if df.empty:
+        return pd.DataFrame(columns=CUBO_DIMS + medidas + ["Mes"])
+    act = df[~df["Anulado_bool"]]
+    # Monto de cada fila compartida que corresponde a cada miembro.
+    partes = _pesos_reparto(act) * (act["Monto_int"] * act["Compartido_bool"]).to_numpy()[:, None]
+    base = act[CUBO_DIMS + ["Monto_int","Monto_original"]].assign(
+        Registros=1, **{_parte_col(p): partes[:, j] for j, p in enumerate(USUARIOS)}
+    )
+    cubo = base.groupby(CUBO_DIMS, dropna=False, observed=True, sort=False).sum().reset_index()
+    cubo["Mes"] = cubo["Fecha_dt"].dt.to_period("M")
+    return cubo.sort_values("Fecha_dt", kind="stable", na_position="last", ignore_index=True)
+
+def _cubo(df: pd.DataFrame, version: int) -> pd.DataFrame:
+    return _por_version("cubo", version, lambda: _construir_cubo(df))
+
+def _construir_cubo_mensual(cubo: pd.DataFrame) -> pd.DataFrame:
+    """El cubo diario sumado por mes, con Fecha_dt en el primer día de cada mes.
+
+    Conserva columnas y orden del diario, así que `_cortar_periodo` y los
+    cálculos lo usan igual; sólo un rango de fechas necesita el grano diario.
+    """
+    if cubo.empty:
+        return cubo.copy()
+    dims = [d for d in CUBO_DIMS if d != "Fecha_dt"] + ["Mes"]
+    mensual = (cubo.drop(columns="Fecha_dt")
+               .groupby(dims, dropna=False, observed=True, sort=False).sum().reset_index())
+    mensual["Fecha_dt"] = mensual["Mes"].dt.to_timestamp()
+    mensual = mensual[cubo.columns]
+    return mensual.sort_values("Fecha_dt", kind="stable", na_position="last", ignore_index=True)
+
+def _cubo_mensual(cubo: pd.DataFrame, version: int) -> pd.DataFrame:
+    return _por_version("cubo_mensual", version, lambda: _construir_cubo_mensual(cubo))
+
+def _construir_indice_fechas(frame: pd.DataFrame) -> dict:
+    """Particiona por mes un frame ordenado por Fecha_dt (NaT al final).
+
+    Devuelve las fechas válidas como arreglo ordenado y, por mes ("YYYY-MM"),
+    el tramo [inicio, fin) de posiciones que le corresponde.
+    """
+    n = int(frame["Fecha_dt"].notna().sum())
+    fechas = frame["Fecha_dt"].to_numpy()[:n]
+    meses, inicios = np.unique(fechas.astype("datetime64[M]"), return_index=True)
+    fines = np.append(inicios[1:], n)
+    return {
+        "fechas": fechas,
+        "meses": [str(m) for m in meses],
+        "particion": {str(m): (int(i), int(f)) for m, i, f in zip(meses, inicios, fines)},
+    }
+
+def _indice_fechas(frame: pd.DataFrame, nombre: str, version: int) -> dict:
+    return _por_version(f"indice_{nombre}", version, lambda: _construir_indice_fechas(frame))
+
+def _cortar_periodo(frame: pd.DataFrame, indice: dict, mes: str | None = None, rango=None) -> pd.DataFrame:
+    """Corta un mes o un rango de fechas (inclusivo) con búsqueda binaria sobre el índice."""
+    if mes:
+        ini, fin = indice["particion"].get(mes, (0, 0))
+    elif rango:
+        desde, hasta = (np.datetime64(pd.Timestamp(d), "ns") for d in rango)
+        ini = int(np.searchsorted(indice["fechas"], desde, side="left"))
+        fin = int(np.searchsorted(indice["fechas"], hasta, side="right"))
+    else:
+        return frame
+    return frame.iloc[ini:fin]
+
+def _como_cubo(df: pd.DataFrame) -> pd.DataFrame:
+    # Acepta tanto un (trozo de) cubo como registros normalizados.
+    return df if "Registros" in df.columns else _construir_cubo(df)
+
+def _pagado_por(cubo: pd.DataFrame) -> np.ndarray:
+    """Matriz pagador × beneficiario de los gastos compartidos (CLP)."""
+    partes = [_parte_col(p) for p in USUARIOS]
+    comp = cubo[cubo["Compartido_bool"].astype(bool)]
+    pagado = comp.groupby("Persona", observed=True)[partes].sum()
+    pagado.index = pagado.index.astype(str)
+    return pagado.reindex(USUARIOS, fill_value=0).to_numpy(dtype="float64")
+
+def calcular_totales_personales(df: pd.DataFrame) -> pd.DataFrame:
+    """Gastos considerados de cada miembro, todos en una pasada."""
+    cubo = _como_cubo(df)
+    gastos = cubo[cubo["Tipo"]=="Gasto"]
+    # Gastos individuales
+    indiv = gastos[~gastos["Compartido_bool"].astype(bool)].groupby("Persona", observed=True)["Monto_int"].sum()
+    indiv.index = indiv.index.astype(str)
+    indiv = indiv.reindex(USUARIOS, fill_value=0).to_numpy()
+    pagado = _pagado_por(gastos)
+    # Parte propia de los compartidos pagados por uno mismo y por los demás
+    comp_pagados = np.diag(pagado)
+    comp_recibidos = pagado.sum(axis=0) - comp_pagados
+
+    return pd.DataFrame({
+        "Persona": USUARIOS,
+        "Gastos_individuales": indiv,
+        "Aporte_compartidos_pagados": comp_pagados,
+        "Beneficio_compartidos_recibidos": comp_recibidos,
+        "Total_considerado": indiv + comp_pagados + comp_recibidos,
+    })
+
+def calcular_gastos_personales(df: pd.DataFrame, persona: str) -> dict:
+    totales = calcular_totales_personales(df)
+    return totales.iloc[USUARIOS.index(persona)].to_dict()
+
+def calcular_deudas(df: pd.DataFrame, netear_traspasos: bool = True) -> pd.DataFrame:
+    """Matriz miembro × miembro: cuánto le debe la fila a la columna.
+
+    Sale de los gastos compartidos (cada beneficiario le debe su parte al
+    pagador) y, con `netear_traspasos`, de los traspasos ya registrados:
+    un traspaso de A a B cuenta como un pago de A a cuenta de lo que le debe a B.
+    """
+    cubo = _como_cubo(df)
+    deudas = _pagado_por(cubo).T.copy()
+    if netear_traspasos:
+        trasp = cubo[cubo["Tipo"]=="Traspaso"]
+        enviado = trasp.groupby([trasp["Persona_Origen"].astype(str), trasp["Persona_Destino"].astype(str)],
+                                observed=True)["Monto_int"].sum()
+        deudas += enviado.unstack(fill_value=0).reindex(index=USUARIOS, columns=USUARIOS, fill_value=0).to_numpy().T
+    np.fill_diagonal(deudas, 0)
+    return pd.DataFrame(deudas, index=USUARIOS, columns=USUARIOS)
+
+def calcular_saldos(df: pd.DataFrame, netear_traspasos: bool = False) -> dict:
+    """Saldo neto de cada miembro: positivo si debe, negativo si le deben."""
+    deudas = calcular_deudas(df, netear_traspasos).to_numpy()
+    return dict(zip(USUARIOS, deudas.sum(axis=1) - deudas.sum(axis=0)))
+
+def liquidar(df: pd.DataFrame) -> list[dict]:
+    """Transferencias que dejan a todos a mano, netas de los traspasos registrados.
+
+    Empareja siempre al mayor deudor con el mayor acreedor: a lo más N-1
+    transferencias para N miembros.
+    """
+    saldos = calcular_saldos(df, netear_traspasos=True)
+    deudores = [[round(v), p] for p, v in saldos.items() if round(v) > 0]
+    acreedores = [[-round(v), p] for p, v in saldos.items() if round(v) < 0]
+    transferencias = []
+    while deudores and acreedores:
+        deudores.sort(reverse=True)
+        acreedores.sort(reverse=True)
+        monto = min(deudores[0][0], acreedores[0][0])
+        transferencias.append({"Desde": deudores[0][1], "Hacia": acreedores[0][1], "Monto": monto})
+        for lado in (deudores, acreedores):
+            lado[0][0] -= monto
+            if not lado[0][0]:
+                lado.pop(0)
+    return transferencias
+
+# ---------------------------------------------------------
+# Rollups para tendencias
+# ---------------------------------------------------------
+# Los gráficos salen de agregados diarios y mensuales del cubo (por persona,
+# categoría y compartido/individual), calculados una vez por versión de
+# datos. Al navegador sólo llegan puntos agregados, a lo más
+# TENDENCIA_MAX_PUNTOS por serie y TENDENCIA_MAX_SERIES series.
+TENDENCIA_MAX_PUNTOS = 400
+TENDENCIA_MAX_SERIES = 8
+
+def _saldo_diario(cubo: pd.DataFrame) -> pd.DataFrame:
+    """Saldo acumulado de cada miembro por día (positivo si debe), neto de traspasos."""
+    partes = cubo[[_parte_col(p) for p in USUARIOS]].to_numpy(dtype="float64")
+    total = partes.sum(axis=1)
+    monto = cubo["Monto_int"].to_numpy(dtype="float64")
+    es_trasp = (cubo["Tipo"] == "Traspaso").to_numpy()
+    pagador = cubo["Persona"].astype(str).to_numpy()
+    origen = cubo["Persona_Origen"].astype(str).to_numpy()
+    destino = cubo["Persona_Destino"].astype(str).to_numpy()
+    # Cada fila suma a cada miembro su parte y le resta lo que pagó por todos;
+    # un traspaso de A a B baja el saldo de A y sube el de B.
+    delta = partes.copy()
+    for j, p in enumerate(USUARIOS):
+        delta[:, j] += (np.where(pagador == p, -total, 0)
+                        + np.where(es_trasp & (destino == p), monto, 0)
+                        - np.where(es_trasp & (origen == p), monto, 0))
+    diario = pd.DataFrame(delta, columns=USUARIOS).groupby(cubo["Fecha_dt"].to_numpy()).sum()
+    return diario.cumsum()
+
+def _construir_rollups(cubo: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    gastos = cubo[cubo["Tipo"] == "Gasto"]
+    dims = ["Persona", "Categoría", "Compartido_bool"]
+    return {
+        "diario": gastos.groupby(["Fecha_dt"] + dims, observed=True)["Monto_int"].sum().reset_index(),
+        "mensual": gastos.groupby(["Mes"] + dims, observed=True)["Monto_int"].sum().reset_index(),
+        "saldo": _saldo_diario(cubo),
+    }
+
+def _rollups(cubo: pd.DataFrame, version: int) -> dict[str, pd.DataFrame]:
+    return _por_version("rollups", version, lambda: _construir_rollups(cubo))
+
+def _serie_tendencia(rollups: dict, granularidad: str, por: str) -> pd.DataFrame:
+    """Tabla tiempo × serie lista para graficar, acotada en puntos y series."""
+    if rollups["diario"].empty:
+        return pd.DataFrame()
+    if granularidad == "Mensual":
+        base = rollups["mensual"].assign(Periodo=lambda d: d["Mes"].dt.to_timestamp())
+    else:
+        base = rollups["diario"].rename(columns={"Fecha_dt": "Periodo"})
+    if por == "Tipo de gasto":
+        serie = np.where(base["Compartido_bool"], "Compartido", "Individual")
+    else:
+        serie = base[por].astype(str).to_numpy()
+    tabla = base.groupby(["Periodo", serie])["Monto_int"].sum().unstack(fill_value=0)
+    # Sólo las series más grandes; el resto se junta en "Otras".
+    orden = tabla.sum().sort_values(ascending=False).index
+    if len(orden) > TENDENCIA_MAX_SERIES:
+        resto = orden[TENDENCIA_MAX_SERIES - 1:]
+        tabla = tabla.drop(columns=resto).assign(Otras=tabla[resto].sum(axis=1))
+    return _submuestrear(tabla, "sum")
+
+def _submuestrear(tabla: pd.DataFrame, como: str) -> pd.DataFrame:
+    """Agrupa en semanas y luego en meses hasta quedar en TENDENCIA_MAX_PUNTOS puntos o menos."""
+    for regla in ("W", "MS"):
+        if len(tabla) <= TENDENCIA_MAX_PUNTOS:
+            break
+        tabla = getattr(tabla.resample(regla), como)()
+    return tabla
+
+# ---------------------------------------------------------
+# Búsqueda en el historial
+# ---------------------------------------------------------
+def _tokens_texto(textos: pd.Series) -> pd.Series:
+    """Minúsculas, sin tildes, separado en palabras."""
+    return (textos.str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+            .str.lower().str.findall(r"\w+"))
+
+def _construir_indice_texto(df: pd.DataFrame) -> dict:
+    """Índice invertido palabra -> posiciones (ordenadas) sobre Detalle y Categoría."""
+    textos = df["Detalle"].astype(str) + " " + df["Categoría"].astype(str)
+    toks = _tokens_texto(textos.reset_index(drop=True)).explode().dropna()
+    pares = pd.DataFrame({"tok": toks.to_numpy(), "pos": toks.index.to_numpy()}).drop_duplicates()
+    postings = {tok: g.to_numpy() for tok, g in pares.groupby("tok", sort=True)["pos"]}
+    return {"postings": postings, "vocab": list(postings)}
+
+def _buscar(indice: dict, consulta: str) -> np.ndarray | None:
+    """Posiciones que contienen todas las palabras de la consulta (como prefijo). None = sin consulta."""
+    palabras = _tokens_texto(pd.Series([consulta]))[0]
+    if not palabras:
+        return None
+    vocab, postings = indice["vocab"], indice["postings"]
+    resultado = None
+    for palabra in palabras:
+        ini = bisect.bisect_left(vocab, palabra)
+        fin = bisect.bisect_left(vocab, palabra + "\uffff")
+        hits = [postings[t] for t in vocab[ini:fin]]
+        pos = np.unique(np.concatenate(hits)) if hits else np.array([], dtype=int)
+        resultado = pos if resultado is None else np.intersect1d(resultado, pos, assume_unique=True)
+    return resultado
+
+def _indice_ids(df_raw: pd.DataFrame, version: int) -> dict:
+    """ID -> posición en el ledger crudo, reconstruido con cada versión de datos."""
+    return _por_version("indice_ids", version, lambda: dict(zip(df_raw["ID"], range(len(df_raw)))))
@@ -0,0 +1,167 @@
+"""Cierre de períodos: archivo anual de filas y totales congelados en la hoja de cierres."""
+import pandas as pd
+
+from finanzas.calculos import _construir_cubo, calcular_saldos, calcular_totales_personales
+from finanzas.config import EXPECTED_HEADERS, HOJA, HOJA_ARCHIVO, HOJA_CIERRES, STGO, USUARIOS
+from finanzas.metricas import _contar_api
+from finanzas.modelo import _a1_range_row, _col_letra, _normalize_df, _rows_to_df
+from finanzas.sheets import (
+    ConflictoEdicion, _ensure_headers, _get_spreadsheet, _gspread, _journal, _load_ledger, _open_ws,
+    _sheets_write, _vaciar_journal,
+)
+
+# Cerrar un año mueve sus filas de HOJA a su propia hoja HOJA_ARCHIVO y
+# guarda en HOJA_CIERRES los totales por persona y el saldo de gastos
+# compartidos. La carga normal lee sólo HOJA (períodos abiertos) y los
+# totales congelados; las filas de un año cerrado se leen al pedir su detalle.
+CIERRE_HEADERS = [
+    "Periodo","Persona","Gastos_individuales","Aporte_compartidos_pagados",
+    "Beneficio_compartidos_recibidos","Total_considerado","Saldo",
+    "Ingresos","Gastos","Traspasos_enviados","Registros","Cerrado_At"
+]
+
+CIERRE_MONTOS = CIERRE_HEADERS[2:10]
+
+def _abrir_o_crear_ws(nombre: str, headers: list[str], filas: int):
+    try:
+        return _open_ws(nombre)
+    except _gspread().exceptions.WorksheetNotFound:
+        _contar_api("add_worksheet")
+        ws = _get_spreadsheet().add_worksheet(title=nombre, rows=max(filas, 2), cols=len(headers))
+        ws.update(_a1_range_row(1, len(headers)), [headers])
+        return _open_ws(nombre)
+
+def _totales_cierre(df: pd.DataFrame, periodo: str) -> list[dict]:
+    """Totales congelados por persona de un período, a partir de sus filas normalizadas."""
+    cubo = _construir_cubo(df)
+    saldos = calcular_saldos(cubo)
+    totales = calcular_totales_personales(cubo).to_dict("records")
+    ahora = pd.Timestamp.now(tz=STGO).strftime("%Y-%m-%d %H:%M:%S")
+    filas = []
+    for persona, res in zip(USUARIOS, totales):
+        propio = cubo[cubo["Persona"] == persona]
+        res.update({
+            "Periodo": periodo,
+            "Saldo": saldos[persona],
+            "Ingresos": propio.loc[propio["Tipo"] == "Ingreso", "Monto_int"].sum(),
+            "Gastos": propio.loc[propio["Tipo"] == "Gasto", "Monto_int"].sum(),
+            "Traspasos_enviados": cubo.loc[(cubo["Tipo"] == "Traspaso") & (cubo["Persona_Origen"] == persona),
+                                           "Monto_int"].sum(),
+            "Registros": propio["Registros"].sum(),
+            "Cerrado_At": ahora,
+        })
+        filas.append({h: (int(round(res[h])) if h in CIERRE_MONTOS + ["Registros"] else res[h])
+                      for h in CIERRE_HEADERS})
+    return filas
+
+def _cerrar_periodo(anio: int) -> int:
+    """Congela un año: archiva sus filas, guarda sus totales y las quita de la hoja abierta.
+
+    Cada paso es idempotente (las filas ya archivadas se reconocen por ID y
+    se actualizan si cambiaron, y los totales del período se reemplazan), así
+    que un cierre interrumpido se completa volviendo a ejecutarlo. Devuelve
+    cuántas filas se movieron.
+    """
+    # Lo que aún está en el diario local tiene que llegar a la hoja antes de
+    # leerla: si no, esas altas y ediciones caerían después del archivo.
+    _vaciar_journal(_journal())
+    ws = _open_ws(HOJA)
+    values = ws.get_all_values()
+    headers = _ensure_headers(ws, values[0] if values else [])
+    raw = _rows_to_df(values[1:], headers, 2)
+    filas_anio = raw[pd.to_datetime(raw["Fecha"], errors="coerce").dt.year == anio]
+    if filas_anio.empty:
+        return 0
+
+    # 1) Archivo del año: se agrega lo que aún no está ahí y se reescribe lo
+    #    que cambió desde un intento anterior.
+    nombre = HOJA_ARCHIVO.format(anio=anio)
+    last_col = _col_letra(len(headers))
+    arch = _abrir_o_crear_ws(nombre, headers, len(filas_anio) + 1)
+    arch_vals = arch.get_all_values()
+    archivadas = _rows_to_df(arch_vals[1:], headers, 2) if len(arch_vals) > 1 else raw.iloc[:0]
+    en_archivo = dict(zip(archivadas["ID"], archivadas.index))
+    ya = filas_anio[filas_anio["ID"].isin(en_archivo)]
+    previas_arch = archivadas.loc[[en_archivo[i] for i in ya["ID"]]]
+    cambiadas = (ya[headers].to_numpy() != previas_arch[headers].to_numpy()).any(axis=1)
+    if cambiadas.any():
+        _sheets_write(lambda w: w.batch_update([
+            {"range": f"A{f}:{last_col}{f}", "values": [fila]}
+            for f, fila in zip(previas_arch["_row"][cambiadas], ya[headers][cambiadas].to_numpy().tolist())
+        ], value_input_option="RAW"), nombre)
+    nuevas = filas_anio[~filas_anio["ID"].isin(en_archivo)]
+    if len(nuevas):
+        _sheets_write(lambda w: w.append_rows(nuevas[headers].to_numpy().tolist(), value_input_option="RAW"), nombre)
+
+    # 2) Totales congelados, calculados sobre el año completo.
+    completo = pd.concat([archivadas[~archivadas["ID"].isin(set(filas_anio["ID"]))], filas_anio], ignore_index=True)
+    filas_cierre = _totales_cierre(_normalize_df(completo), str(anio))
+    ws_c = _abrir_o_crear_ws(HOJA_CIERRES, CIERRE_HEADERS, 100)
+    previas = [r for r in ws_c.get_all_values()[1:] if r and r[0] != str(anio)]
+    tabla = [CIERRE_HEADERS] + previas + [[f[h] for h in CIERRE_HEADERS] for f in filas_cierre]
+    def _escribir_cierres(w):
+        # Primero se escribe y después se limpia sólo lo que sobra al final:
+        # si algo falla entremedio, los totales congelados siguen en la hoja.
+        w.update("A1", tabla, value_input_option="RAW")
+        w.batch_clear([f"A{len(tabla) + 1}:{_col_letra(len(CIERRE_HEADERS))}"])
+    _sheets_write(_escribir_cierres, HOJA_CIERRES)
+
+    # 3) Quitar las filas de la hoja abierta: un solo batch_update con los
+    #    tramos contiguos, de abajo hacia arriba para no correr los índices.
+    tramos = []
+    for f in sorted(filas_anio["_row"].tolist(), reverse=True):
+        if tramos and tramos[-1][0] == f + 1:
+            tramos[-1][0] = f
+        else:
+            tramos.append([f, f])
+    esperados = dict(zip(filas_anio["_row"], zip(filas_anio["ID"], filas_anio["Last_Modified_At"])))
+    id_col = _col_letra(headers.index("ID") + 1)
+    lm_col = _col_letra(headers.index("Last_Modified_At") + 1)
+
+    def _borrar(w):
+        # Las posiciones se leyeron varias llamadas atrás: si alguna fila se
+        # movió (orden o borrado a mano, otro cierre) o se editó (el archivo
+        # tiene la versión anterior) se aborta en vez de borrar otros
+        # registros o perder la edición. Volver a cerrar relee todo.
+        ids_vr, lms_vr = w.batch_get([f"{id_col}2:{id_col}", f"{lm_col}2:{lm_col}"])
+        ids = [r[0] if r else "" for r in ids_vr]
+        lms = [r[0] if r else "" for r in lms_vr]
+        lms += [""] * (len(ids) - len(lms))
+        actuales = list(zip(ids, lms))
+        cambiadas = [f for f, esperado in esperados.items() if f - 2 >= len(actuales) or actuales[f - 2] != esperado]
+        if cambiadas:
+            raise ConflictoEdicion(
+                f"La hoja cambió durante el cierre de {anio} ({len(cambiadas)} filas se movieron o editaron); "
+                "no se borró nada. Vuelve a cerrar el período."
+            )
+        _contar_api("batch_update")
+        _get_spreadsheet().batch_update({"requests": [
+            {"deleteDimension": {"range": {"sheetId": w.id, "dimension": "ROWS",
+                                           "startIndex": ini - 1, "endIndex": fin}}}
+            for ini, fin in tramos
+        ]})
+    _sheets_write(_borrar)
+
+    # Las filas restantes cambiaron de posición: se resincroniza ya en vez
+    # de seguir sirviendo la copia vieja mientras se refresca.
+    _load_ledger(force=True)
+    return len(filas_anio)
+
+def _leer_cierres() -> pd.DataFrame:
+    try:
+        ws = _open_ws(HOJA_CIERRES)
+    except _gspread().exceptions.WorksheetNotFound:
+        return pd.DataFrame(columns=CIERRE_HEADERS)
+    values = ws.get_all_values()
+    if len(values) < 2:
+        return pd.DataFrame(columns=CIERRE_HEADERS)
+    df = _rows_to_df(values[1:], [h.strip() for h in values[0]], 2).drop(columns="_row")
+    df[CIERRE_MONTOS] = df[CIERRE_MONTOS].apply(pd.to_numeric, errors="coerce").fillna(0)
+    return df
+
+def _leer_archivo(anio: int) -> pd.DataFrame:
+    """Filas normalizadas de un año cerrado; se leen sólo cuando se pide su detalle."""
+    values = _open_ws(HOJA_ARCHIVO.format(anio=anio)).get_all_values()
+    if not values:
+        return _normalize_df(pd.DataFrame(columns=EXPECTED_HEADERS + ["_row"]))
+    return _normalize_df(_rows_to_df(values[1:], [h.strip() for h in values[0]], 2))
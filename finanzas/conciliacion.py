@@ -0,0 +1,99 @@
+"""Detección de duplicados y conciliación con cartolas bancarias.
+
+Los registros se agrupan en bloques por persona y monto (CLP); un duplicado
+o un calce sólo se busca dentro del mismo bloque y de una ventana de días,
+con búsqueda binaria o `merge_asof` sobre fechas ordenadas en vez de
+comparar todos contra todos.
+"""
+import numpy as np
+import pandas as pd
+
+from finanzas.metricas import _medir
+
+VENTANA_DUPLICADOS_DIAS = 3    # mismo monto y persona a esta distancia: probable doble registro
+VENTANA_CONCILIACION_DIAS = 4  # desfase aceptado entre la fecha del ledger y la de la cartola
+
+def _persona_bloque(df: pd.DataFrame) -> np.ndarray:
+    """Persona de cada registro; en los traspasos, quien envía."""
+    persona = df["Persona"].astype(str).to_numpy()
+    return np.where(persona == "", df["Persona_Origen"].astype(str).to_numpy(), persona)
+
+def _construir_indice_duplicados(df: pd.DataFrame) -> dict:
+    """Bloques (persona, monto) -> posiciones de los registros activos, en orden cronológico.
+
+    `df` es el ledger normalizado, que ya viene ordenado por Fecha_dt.
+    """
+    activos = np.flatnonzero(~df["Anulado_bool"].to_numpy() & df["Fecha_dt"].notna().to_numpy())
+    claves = pd.DataFrame({
+        "Persona": _persona_bloque(df)[activos],
+        "Monto": df["Monto_int"].to_numpy()[activos],
+    })
+    bloques = claves.groupby(["Persona", "Monto"], sort=False).indices
+    return {
+        "bloques": {(p, int(m)): activos[v] for (p, m), v in bloques.items()},
+        "fechas": df["Fecha_dt"].to_numpy(),
+    }
+
+def posibles_duplicados(indice: dict, persona: str, monto: int, fecha,
+                        ventana_dias: int = VENTANA_DUPLICADOS_DIAS) -> np.ndarray:
+    """Posiciones de registros activos de `persona` por `monto` a lo más `ventana_dias` de `fecha`."""
+    pos = indice["bloques"].get((persona, int(monto)))
+    if pos is None:
+        return np.empty(0, dtype=np.intp)
+    fechas = indice["fechas"][pos]
+    t = np.datetime64(pd.Timestamp(fecha), "ns")
+    ventana = np.timedelta64(ventana_dias, "D")
+    ini = int(np.searchsorted(fechas, t - ventana, side="left"))
+    fin = int(np.searchsorted(fechas, t + ventana, side="right"))
+    return pos[ini:fin]
+
+def _claves_calce(df: pd.DataFrame, nombre: str) -> pd.DataFrame:
+    validas = np.flatnonzero(df["Fecha_dt"].notna().to_numpy())
+    return pd.DataFrame({
+        nombre: validas,
+        "Monto": np.abs(df["Monto_int"].to_numpy()[validas]),
+        "Fecha": df["Fecha_dt"].to_numpy()[validas],
+    })
+
+@_medir("conciliacion")
+def conciliar(libro: pd.DataFrame, cartola: pd.DataFrame,
+              ventana_dias: int = VENTANA_CONCILIACION_DIAS) -> dict[str, pd.DataFrame]:
+    """Calza uno a uno los movimientos de una cartola con registros del ledger.
+
+    Ambos frames vienen normalizados (Fecha_dt, Monto_int). Un calce exige el
+    mismo monto absoluto y fechas a lo más `ventana_dias` de distancia; ante
+    varios candidatos gana el de fecha más cercana. Devuelve los calces y lo
+    que quedó sin calzar en cada lado.
+    """
+    izq = _claves_calce(cartola, "pos_cartola")
+    der = _claves_calce(libro, "pos_libro")
+
+    # Mismo monto y mismo día: se emparejan por orden de aparición, sin ventana.
+    for lado in (izq, der):
+        lado["n"] = lado.groupby(["Monto", "Fecha"], sort=False).cumcount()
+    exactos = izq.merge(der, on=["Monto", "Fecha", "n"])[["pos_cartola", "pos_libro"]]
+    exactos["Dias"] = 0
+    pares = [exactos]
+    izq = izq[~izq["pos_cartola"].isin(exactos["pos_cartola"])].drop(columns="n").sort_values("Fecha")
+    der = der[~der["pos_libro"].isin(exactos["pos_libro"])].drop(columns="n").sort_values("Fecha")
+
+    # El resto, por rondas de vecino más cercano dentro de la ventana. Si dos
+    # movimientos eligen el mismo registro se queda el más cercano y el otro
+    # vuelve a buscar en la ronda siguiente, ya sin ese registro.
+    tolerancia = pd.Timedelta(days=ventana_dias)
+    while len(izq) and len(der):
+        m = pd.merge_asof(izq, der.assign(Fecha_libro=der["Fecha"]), on="Fecha", by="Monto",
+                          tolerance=tolerancia, direction="nearest").dropna(subset=["pos_libro"])
+        if m.empty:
+            break
+        m["Dias"] = (m["Fecha_libro"] - m["Fecha"]).abs().dt.days
+        ronda = m.sort_values("Dias", kind="stable").drop_duplicates("pos_libro")
+        ronda = ronda.astype({"pos_libro": "int64"})[["pos_cartola", "pos_libro", "Dias"]]
+        pares.append(ronda)
+        izq = izq[~izq["pos_cartola"].isin(ronda["pos_cartola"])]
+        der = der[~der["pos_libro"].isin(ronda["pos_libro"])]
+
+    pares = pd.concat(pares, ignore_index=True)
+    solo_cartola = np.setdiff1d(np.arange(len(cartola)), pares["pos_cartola"].to_numpy())
+    solo_libro = np.setdiff1d(np.arange(len(libro)), pares["pos_libro"].to_numpy())
+    return {"calces": pares, "solo_cartola": cartola.iloc[solo_cartola], "solo_libro": libro.iloc[solo_libro]}
@@ -0,0 +1,50 @@
+"""Configuración compartida por la app y el núcleo: hoja, miembros, esquema y cachés locales."""
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+STGO = ZoneInfo("America/Santiago")
+
+SPREADSHEET_KEY = "1-McBRqr5mdiw3Wd0Cw9lOebvp1C7AOj1JmTz4wpyPoA"
+HOJA = "finanzas"                  # períodos abiertos
+HOJA_ARCHIVO = "finanzas_{anio}"   # filas congeladas de un año cerrado
+HOJA_CIERRES = "cierres"           # totales y saldos de cada año cerrado
+
+USER_A = "🐳Javiera"
+USER_B = "🪈Francis"
+USUARIOS = [USER_A, USER_B]   # miembros del hogar; el reparto admite cualquier cantidad
+# Columnas heredadas del reparto entre dos; `Reparto` las reemplaza cuando viene.
+PROPORCION_COL = {USER_A: "Proporcion_Javiera", USER_B: "Proporcion_Francis"}
+
+MEDIOS = ["Efectivo", "Tarjeta de crédito", "Débito", "Transferencia", "Cuenta de ahorro", "Otro"]
+
+EXPECTED_HEADERS = [
+    "ID","Tipo","Detalle","Categoría","Fecha","Persona",
+    "Persona_Origen","Persona_Destino","Monto",
+    "Monto_original","Moneda",
+    "Medio","Compartido","Proporcion_Javiera","Proporcion_Francis",
+    "Created_At","Created_By","Last_Modified_At","Last_Modified_By","Anulado",
+    "Reparto"
+]
+
+SYNC_TTL = 120          # segundos entre sincronizaciones con la hoja
+DELTA_MAX_FILAS = 200   # sobre esto, una recarga completa es más barata
+RECARGA_COMPLETA = 3600 # segundos entre recargas completas: recogen ediciones hechas a mano en la hoja
+SHEETS_REINTENTOS = 5   # intentos ante 429/5xx, con backoff exponencial
+IMPORT_CHUNK = 500      # filas por llamada a append_rows
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / ".finanzas_cache"
+SNAPSHOT_PATH = CACHE_DIR / "ledger.sqlite"
+JOURNAL_PATH = CACHE_DIR / "journal.sqlite"
+FLUSH_INTERVALO = 5     # segundos entre vaciados del diario local hacia la hoja
+FLUSH_ESPERA_MAX = 300  # tope del backoff cuando la hoja no acepta escrituras
+
+FX_URL = "https://mindicador.cl/api/dolar/{anio}"
+FX_TIMEOUT = (3.05, 5)  # (conexión, lectura) en segundos
+FX_PATH = CACHE_DIR / "usd_clp.json"
+FX_REFRESH = 3600       # el año en curso se vuelve a pedir como máximo cada hora
+FX_REINTENTO = 60       # espera tras un fallo del proveedor antes de reintentar
+USD_FALLBACK = 900
+
+# Cuota por defecto de la API de Sheets: 60 lecturas y 60 escrituras por minuto y usuario.
+CUOTA_LECTURAS_MIN = 60
+CUOTA_ESCRITURAS_MIN = 60
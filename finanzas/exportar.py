@@ -0,0 +1,98 @@
+"""Exportación de un período a CSV, Parquet o Excel, escrita por trozos.
+
+pyarrow y openpyxl se importan sólo al exportar en su formato.
+"""
+import io
+import tempfile
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+
+from finanzas.calculos import calcular_saldos, calcular_totales_personales, liquidar
+from finanzas.metricas import _medir
+
+# Los registros del período se escriben por trozos de EXPORT_CHUNK filas
+# directo al archivo de salida, sin armar una copia formateada del período
+# en memoria. pyarrow y openpyxl se importan sólo al exportar.
+EXPORT_CHUNK = 10_000
+EXCEL_MAX_FILAS = 1_048_575  # filas de datos por hoja (más el encabezado)
+EXPORT_COLS = {
+    "ID": "ID", "Fecha": "Fecha", "Tipo": "Tipo", "Detalle": "Detalle", "Categoría": "Categoría",
+    "Persona": "Persona", "Persona_Origen": "Persona_Origen", "Persona_Destino": "Persona_Destino",
+    "Monto_int": "Monto_CLP", "Monto_original": "Monto_original", "Moneda": "Moneda", "Medio": "Medio",
+    "Compartido_bool": "Compartido", "Reparto": "Reparto", "Anulado_bool": "Anulado",
+}
+FORMATOS_EXPORT = {
+    "CSV (zip)": ("csv", "application/zip"),
+    "Parquet (zip)": ("parquet", "application/zip"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+def _trozos(df: pd.DataFrame):
+    """Trozos de EXPORT_CHUNK filas con las columnas de exportación (al menos uno, aunque vacío)."""
+    cols = [c for c in EXPORT_COLS if c in df.columns]
+    for ini in range(0, max(len(df), 1), EXPORT_CHUNK):
+        yield df.iloc[ini:ini + EXPORT_CHUNK][cols].rename(columns=EXPORT_COLS)
+
+def _tablas_resumen(cubo: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    totales = calcular_totales_personales(cubo)
+    totales["Saldo_compartidos"] = totales["Persona"].map(calcular_saldos(cubo))
+    liquidacion = pd.DataFrame(liquidar(cubo), columns=["Desde", "Hacia", "Monto"])
+    return {"totales_por_persona": totales, "liquidacion": liquidacion}
+
+def _exportar_csv(df: pd.DataFrame, tablas: dict, destino):
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zf:
+        with zf.open("registros.csv", "w") as f, io.TextIOWrapper(f, encoding="utf-8-sig", newline="") as txt:
+            for i, trozo in enumerate(_trozos(df)):
+                trozo.to_csv(txt, index=False, header=i == 0)
+        for nombre, tabla in tablas.items():
+            zf.writestr(f"{nombre}.csv", tabla.to_csv(index=False).encode("utf-8-sig"))
+
+def _exportar_parquet(df: pd.DataFrame, tablas: dict, destino):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Parquet ya viene comprimido: el zip sólo agrupa los archivos.
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_STORED) as zf, tempfile.TemporaryDirectory() as tmp:
+        ruta = Path(tmp) / "registros.parquet"
+        escritor = None
+        for trozo in _trozos(df):
+            tabla = pa.Table.from_pandas(trozo, schema=escritor.schema if escritor else None, preserve_index=False)
+            escritor = escritor or pq.ParquetWriter(ruta, tabla.schema)
+            escritor.write_table(tabla)
+        escritor.close()
+        zf.write(ruta, "registros.parquet")
+        for nombre, tabla in tablas.items():
+            with zf.open(f"{nombre}.parquet", "w") as f:
+                f.write(tabla.to_parquet(index=False))
+
+def _exportar_xlsx(df: pd.DataFrame, tablas: dict, destino):
+    if len(df) > EXCEL_MAX_FILAS:
+        raise ValueError(f"Excel admite hasta {EXCEL_MAX_FILAS:,} filas; exporta este período como CSV o Parquet.")
+    from openpyxl import Workbook
+
+    # write_only: cada fila se serializa al agregarla y no queda en memoria.
+    wb = Workbook(write_only=True)
+    hoja = wb.create_sheet("Registros")
+    for i, trozo in enumerate(_trozos(df)):
+        if i == 0:
+            hoja.append(list(trozo.columns))
+        for fila in trozo.itertuples(index=False, name=None):
+            hoja.append(list(fila))
+    for nombre, tabla in tablas.items():
+        hoja = wb.create_sheet(nombre)
+        hoja.append(list(tabla.columns))
+        for fila in tabla.itertuples(index=False, name=None):
+            hoja.append(list(fila))
+    wb.save(destino)
+
+def exportar_periodo(df: pd.DataFrame, cubo: pd.DataFrame, formato: str, destino):
+    """Escribe en `destino` (ruta o archivo binario) los registros del período y sus totales.
+
+    `formato` es "csv" o "parquet" (un zip con registros, totales por persona
+    y liquidación) o "xlsx" (un libro con una hoja por tabla).
+    """
+    exportadores = {"csv": _exportar_csv, "parquet": _exportar_parquet, "xlsx": _exportar_xlsx}
+    with _medir(f"exportar.{formato}"):
+        exportadores[formato](df, _tablas_resumen(cubo), destino)
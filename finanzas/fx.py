@@ -0,0 +1,183 @@
+"""Tipo de cambio USD/CLP (dólar observado de mindicador.cl) y formato de montos.
+
+La serie se guarda por año en FX_PATH; `requests` se importa recién al descargar.
+"""
+import bisect
+import datetime as dt
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from finanzas.config import FX_PATH, FX_REFRESH, FX_REINTENTO, FX_TIMEOUT, FX_URL, STGO, USD_FALLBACK
+from finanzas.metricas import _contar_cache, _medir
+from finanzas.recursos import recurso
+
+logger = logging.getLogger(__name__)
+
+def _mindicador_provider(anio: int) -> dict[str, float]:
+    """Serie anual del dólar observado: {"YYYY-MM-DD": valor}."""
+    import requests
+
+    with _medir("mindicador"):
+        resp = requests.get(FX_URL.format(anio=anio), timeout=FX_TIMEOUT)
+    resp.raise_for_status()
+    return {d["fecha"][:10]: float(d["valor"]) for d in resp.json()["serie"]}
+
+def _nuevo_fx_store(provider=_mindicador_provider, path: Path | None = FX_PATH) -> dict:
+    """Crea un almacén de tipos de cambio. `provider(anio)` puede ser un stub local."""
+    store = {
+        "lock": threading.Lock(),
+        "provider": provider,
+        "path": path,
+        "valores": {},     # "YYYY-MM-DD" -> valor
+        "fechas": [],      # claves de `valores`, ordenadas
+        "pedido_at": {},   # año -> última descarga exitosa
+        "fallo_at": {},    # año -> último intento fallido
+        "descargas": 0,
+    }
+    if path is not None and path.exists():
+        try:
+            data = json.loads(path.read_text())
+            store["valores"] = {k: float(v) for k, v in data["valores"].items()}
+            store["pedido_at"] = {int(k): v for k, v in data["pedido_at"].items()}
+            store["fechas"] = sorted(store["valores"])
+        except (ValueError, KeyError):
+            logger.warning("Caché de tipos de cambio ilegible, se ignora: %s", path)
+    return store
+
+@recurso
+def _fx_store() -> dict:
+    return _nuevo_fx_store()
+
+def _fx_guardar(store: dict):
+    if store["path"] is None:
+        return
+    try:
+        store["path"].parent.mkdir(exist_ok=True)
+        store["path"].write_text(json.dumps({"valores": store["valores"], "pedido_at": store["pedido_at"]}))
+    except OSError:
+        logger.exception("No se pudo guardar %s", store["path"])
+
+def _fx_pedir(store: dict, anio: int, iso: str):
+    with store["lock"]:
+        pedido = store["pedido_at"].get(anio)
+        if pedido is not None:
+            if pedido >= dt.datetime(anio + 1, 1, 1, tzinfo=STGO).timestamp():
+                return  # se pidió con el año ya cerrado: la serie no cambia
+            cubierto = store["fechas"] and store["fechas"][-1] >= iso
+            if cubierto or time.time() - pedido < FX_REFRESH:
+                return
+        if time.time() - store["fallo_at"].get(anio, 0) < FX_REINTENTO:
+            return
+        store["descargas"] += 1
+        try:
+            serie = store["provider"](anio)
+        except (OSError, KeyError, ValueError):  # requests.RequestException hereda de OSError
+            logger.warning("No se pudo obtener el dólar de %s", anio, exc_info=True)
+            store["fallo_at"][anio] = time.time()
+            return
+        store["pedido_at"][anio] = time.time()
+        store["valores"].update(serie)
+        store["fechas"] = sorted(store["valores"])
+        _fx_guardar(store)
+
+def _fx_asegurar(store: dict, fecha: dt.date):
+    """Garantiza que la serie cubra `fecha`, pidiendo años completos sólo cuando faltan."""
+    iso = fecha.strftime("%Y-%m-%d")
+    _fx_pedir(store, fecha.year, iso)
+    # A inicio de año el día hábil anterior puede caer en el año previo.
+    i = bisect.bisect_right(store["fechas"], iso)
+    if i == 0 or store["fechas"][i - 1][:4] != iso[:4]:
+        _fx_pedir(store, fecha.year - 1, iso)
+
+def _get_usd_value(date: dt.date, store: dict | None = None) -> float:
+    """Dólar observado de `date` o del día hábil publicado más cercano anterior."""
+    store = store or _fx_store()
+    if pd.isna(date):
+        date = dt.date.today()
+    descargas = store["descargas"]
+    _fx_asegurar(store, date)
+    _contar_cache("fx", store["descargas"] == descargas)
+    iso = date.strftime("%Y-%m-%d")
+    if iso in store["valores"]:
+        return store["valores"][iso]
+    i = bisect.bisect_right(store["fechas"], iso)
+    if i == 0:
+        logger.warning("Sin dólar para %s, se usa el valor de respaldo %s", iso, USD_FALLBACK)
+        return USD_FALLBACK
+    return store["valores"][store["fechas"][i - 1]]
+
+def _usd_values(fechas: pd.Series, store: dict | None = None) -> pd.Series:
+    """Versión vectorizada de `_get_usd_value` para una columna de fechas."""
+    store = store or _fx_store()
+    fechas = pd.to_datetime(fechas, errors="coerce")
+    validas = fechas.dropna()
+    for _, grupo in validas.groupby(validas.dt.year):
+        _fx_asegurar(store, grupo.max().date())
+        _fx_asegurar(store, grupo.min().date())
+    out = pd.Series(float(USD_FALLBACK), index=fechas.index)
+    if validas.empty or not store["fechas"]:
+        return out
+    serie = pd.DataFrame({
+        "f": pd.to_datetime(store["fechas"]),
+        "v": [store["valores"][f] for f in store["fechas"]],
+    })
+    q = pd.DataFrame({"f": validas.to_numpy(), "idx": validas.index}).sort_values("f")
+    m = pd.merge_asof(q, serie, on="f", direction="backward")
+    out.loc[m["idx"]] = m["v"].fillna(USD_FALLBACK).to_numpy()
+    return out
+
+def _monto_clp(monto, tasa=1.0):
+    """Pesos enteros de `monto` a `tasa`, para escalares o columnas.
+
+    Formularios, importación y revalorización convierten con esta misma
+    regla: con las tasas intactas, revalorizar no cambia ningún monto.
+    """
+    clp = np.rint(np.multiply(monto, tasa))
+    return int(clp) if np.ndim(clp) == 0 else clp.astype("int64")
+
+def _procesar_monto(monto: float, moneda: str, fecha: dt.date):
+    if moneda == "USD":
+        return _monto_clp(monto, _get_usd_value(fecha)), monto
+    return _monto_clp(monto), monto
+
+def formatear_monto(valor, moneda="CLP"):
+    try:
+        valor = float(valor)
+    except:
+        return valor
+    if moneda == "CLP":
+        return f"${valor:,.0f}"       # CLP sin decimales
+    elif moneda == "USD":
+        return f"US${valor:,.2f}"     # USD con 2 decimales
+    return str(valor)
+
+FORMATOS_MONEDA = {"CLP": "${:,.0f}", "USD": "US${:,.2f}"}
+# Los mismos formatos en printf, para st.column_config.NumberColumn (los aplica el navegador).
+FORMATOS_COLUMNA = {"CLP": "$%d", "USD": "US$%.2f"}
+
+def formatear_montos(valores: pd.Series, monedas="CLP") -> pd.Series:
+    """Como `formatear_monto`, pero para columnas completas.
+
+    `monedas` es un código fijo o una Serie alineada con `valores` (p.ej. la
+    columna Moneda); cada moneda se formatea de una vez sobre su subconjunto.
+    """
+    nums = pd.to_numeric(valores, errors="coerce").to_numpy()
+    if isinstance(monedas, str):
+        monedas = pd.Series(monedas, index=valores.index)
+    out = np.empty(len(nums), dtype=object)
+    validos = ~np.isnan(nums)
+    hechos = np.zeros(len(nums), dtype=bool)
+    for moneda, fmt in FORMATOS_MONEDA.items():
+        mask = (monedas == moneda).to_numpy() & validos
+        if mask.any():
+            out[mask] = list(map(fmt.format, nums[mask]))
+            hechos |= mask
+    # Sin número o con otra moneda: el valor tal cual.
+    out[~hechos] = valores[~hechos].astype(str).to_numpy()
+    return pd.Series(out, index=valores.index)
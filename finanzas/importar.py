@@ -0,0 +1,134 @@
+"""Lectura de cartolas bancarias: mapeo de columnas, montos, registros listos para la hoja y conciliación.
+
+No depende de Streamlit: la pestaña Importar y `python -m finanzas conciliar` usan lo mismo.
+"""
+import hashlib
+import re
+import unicodedata
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from finanzas.calculos import _construir_indice_fechas, _cortar_periodo
+from finanzas.conciliacion import VENTANA_CONCILIACION_DIAS, conciliar
+from finanzas.config import EXPECTED_HEADERS, STGO
+from finanzas.fx import _monto_clp, _usd_values
+from finanzas.modelo import _normalize_df
+
+IMPORT_CAMPOS = {
+    # campo destino -> nombres de columna que se reconocen automáticamente
+    "Fecha": ["fecha", "date", "fecha operacion", "fecha transaccion"],
+    "Detalle": ["detalle", "descripcion", "description", "glosa", "concepto"],
+    "Monto": ["monto", "amount", "importe", "valor", "cargo"],
+    "Moneda": ["moneda", "currency", "divisa"],
+    "Categoría": ["categoria", "category"],
+    "Medio": ["medio", "medio de pago"],
+    "Persona": ["persona", "titular"],
+    "Tipo": ["tipo", "type"],
+}
+
+def _norm_col(nombre: str) -> str:
+    nombre = unicodedata.normalize("NFKD", str(nombre)).encode("ascii", "ignore").decode()
+    return re.sub(r"\s+", " ", nombre).strip().lower()
+
+def _sugerir_mapeo(columnas) -> dict[str, str]:
+    """Campo -> columna del archivo que lo trae según IMPORT_CAMPOS ("" si ninguna)."""
+    cols_norm = {_norm_col(c): c for c in columnas}
+    return {campo: next((cols_norm[a] for a in alias if a in cols_norm), "") for campo, alias in IMPORT_CAMPOS.items()}
+
+def leer_cartola(archivo, encoding: str = "utf-8") -> pd.DataFrame:
+    """Cartola CSV como texto, detectando el separador."""
+    return pd.read_csv(archivo, sep=None, engine="python", dtype=str, encoding=encoding)
+
+def _huella(datos: bytes) -> str:
+    return hashlib.sha256(datos).hexdigest()
+
+def _parse_montos(col: pd.Series, decimal: str) -> pd.Series:
+    """Convierte montos como "$-1.234,50" o "(1,234.50)" a float, vectorizado."""
+    s = col.astype(str).str.strip()
+    negativo = s.str.startswith("(") & s.str.endswith(")")
+    miles = "." if decimal == "," else ","
+    s = s.str.replace(r"[^\d,.\-]", "", regex=True).str.replace(miles, "", regex=False)
+    s = s.str.replace(decimal, ".", regex=False)
+    valores = pd.to_numeric(s, errors="coerce")
+    return valores.where(~negativo, -valores.abs())
+
+def _preparar_importacion(raw: pd.DataFrame, mapeo: dict, defaults: dict,
+                          decimal: str = ",", dayfirst: bool = True,
+                          signo_tipo: bool = True, origen: str = "") -> tuple[pd.DataFrame, int]:
+    """Lleva un extracto al formato de EXPECTED_HEADERS en una sola pasada vectorizada.
+
+    Con `origen` (huella del archivo) el ID de cada fila sale de la huella y
+    su posición: es el mismo en cada rerun y al volver a subir el archivo, y
+    así reintentar una importación no duplica lo que ya llegó a la hoja.
+    Devuelve (registros listos para `_append_records`, filas descartadas).
+    """
+    def _col(campo):
+        return raw[mapeo[campo]] if mapeo.get(campo) else None
+
+    fechas = pd.to_datetime(_col("Fecha"), dayfirst=dayfirst, errors="coerce")
+    montos = _parse_montos(_col("Monto"), decimal)
+    validas = fechas.notna() & montos.notna() & (montos != 0)
+    fechas, montos = fechas[validas], montos[validas]
+    n = len(fechas)
+
+    def _texto(campo, default=""):
+        col = _col(campo)
+        if col is None:
+            return pd.Series(default, index=fechas.index)
+        return col[validas].fillna("").astype(str).str.strip().replace("", default)
+
+    if mapeo.get("Tipo"):
+        tipo = _texto("Tipo").str.capitalize()
+    elif signo_tipo:
+        tipo = pd.Series(np.where(montos < 0, "Gasto", "Ingreso"), index=fechas.index)
+    else:
+        tipo = pd.Series(defaults["Tipo"], index=fechas.index)
+
+    moneda = _texto("Moneda", defaults["Moneda"]).str.upper()
+    moneda = pd.Series(np.where(moneda.str.contains("USD|US\\$|DOLAR", regex=True), "USD", "CLP"),
+                       index=fechas.index)
+    originales = montos.abs()
+    tasas = pd.Series(1.0, index=fechas.index)
+    es_usd = moneda == "USD"
+    if es_usd.any():
+        tasas[es_usd] = _usd_values(fechas[es_usd])
+
+    persona = _texto("Persona", defaults["Persona"])
+    now = pd.Timestamp.now(tz=STGO).strftime("%Y-%m-%d %H:%M:%S")
+    out = pd.DataFrame({
+        "ID": ([str(uuid.uuid5(uuid.NAMESPACE_URL, f"{origen}:{i}")) for i in fechas.index] if origen
+               else [str(uuid.uuid4()) for _ in range(n)]),
+        "Tipo": tipo,
+        "Detalle": _texto("Detalle"),
+        "Categoría": _texto("Categoría", defaults["Categoría"]),
+        "Fecha": fechas.dt.strftime("%Y-%m-%d"),
+        "Persona": persona,
+        "Monto": _monto_clp(originales, tasas),
+        "Monto_original": originales.round(2),
+        "Moneda": moneda,
+        "Medio": _texto("Medio", defaults["Medio"]),
+        "Created_At": now,
+        "Created_By": persona,
+    }, index=fechas.index).reindex(columns=EXPECTED_HEADERS, fill_value="")
+    return out.reset_index(drop=True), int((~validas).sum())
+
+def _conciliar_cartola(registros: pd.DataFrame, df: pd.DataFrame, ventana: int = VENTANA_CONCILIACION_DIAS,
+                       medio: str = "", indice: dict | None = None) -> tuple[pd.DataFrame, pd.DataFrame, dict]:
+    """Concilia la cartola ya preparada con los registros activos de sus personas en sus fechas.
+
+    `df` es el ledger normalizado e `indice` su índice de fechas, si ya está
+    construido. Devuelve (cartola normalizada, registros candidatos, resultado de `conciliar`).
+    """
+    cartola = _normalize_df(registros)
+    margen = pd.Timedelta(days=ventana)
+    rango = (cartola["Fecha_dt"].min() - margen, cartola["Fecha_dt"].max() + margen)
+    libro = _cortar_periodo(df, indice or _construir_indice_fechas(df), rango=rango)
+    personas = registros["Persona"].unique()
+    mask = ~libro["Anulado_bool"] & (libro["Persona"].isin(personas) | libro["Persona_Origen"].isin(personas)
+                                     | libro["Persona_Destino"].isin(personas))
+    if medio:
+        mask &= libro["Medio"] == medio
+    libro = libro[mask]
+    return cartola, libro, conciliar(libro, cartola, ventana)
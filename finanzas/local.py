@@ -0,0 +1,39 @@
+"""Backend de archivo local: el ledger crudo en un CSV o en un snapshot SQLite.
+
+Devuelve lo mismo que la hoja (todo texto más `_row`), así los procesos
+batch y las pruebas trabajan sin red ni credenciales.
+"""
+from pathlib import Path
+
+import pandas as pd
+
+from finanzas.config import EXPECTED_HEADERS
+from finanzas.sheets import _nuevo_ledger_state, _set_ledger, _snapshot_load, _snapshot_save
+
+SUFIJOS_SNAPSHOT = (".sqlite", ".db")
+
+def cargar_ledger(path) -> pd.DataFrame:
+    """Ledger crudo desde un CSV exportado de la hoja o un snapshot `ledger.sqlite`."""
+    path = Path(path)
+    if path.suffix in SUFIJOS_SNAPSHOT:
+        state = _nuevo_ledger_state()
+        if not _snapshot_load(state, path):
+            raise ValueError(f"No se pudo leer el snapshot {path}")
+        return state["df"]
+    df = pd.read_csv(path, dtype=str, keep_default_na=False).drop(columns="_row", errors="ignore")
+    faltantes = [h for h in EXPECTED_HEADERS if h not in df.columns]
+    if faltantes:
+        df = df.assign(**{h: "" for h in faltantes})
+    df["_row"] = range(2, 2 + len(df))
+    return df
+
+def guardar_ledger(df_raw: pd.DataFrame, path):
+    """Escribe el ledger crudo como CSV o, según la extensión, como snapshot SQLite."""
+    path = Path(path)
+    if path.suffix in SUFIJOS_SNAPSHOT:
+        state = _nuevo_ledger_state()
+        _set_ledger(state, df_raw)
+        path.unlink(missing_ok=True)
+        _snapshot_save(None, state, path)
+        return
+    df_raw.drop(columns="_row", errors="ignore").to_csv(path, index=False)
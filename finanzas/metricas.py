@@ -0,0 +1,119 @@
+"""Métricas por rerun y por proceso: etapas, llamadas a la API de Sheets y cachés."""
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+import threading
+
+from finanzas.recursos import recurso
+
+# Cada rerun junta sus tiempos por etapa, llamadas a la API y aciertos de
+# caché en un dict propio (vía contextvar, así las sesiones concurrentes no se
+# mezclan). Las llamadas hechas por hilos en segundo plano no pertenecen a
+# ningún rerun, pero sí cuentan en la ventana de cuota del proceso.
+_RERUN = contextvars.ContextVar("finanzas_rerun", default=None)
+
+API_LECTURAS = {"get_all_values", "row_values", "get", "batch_get", "find", "open_by_key", "worksheet"}
+API_ESCRITURAS = {"append_row", "append_rows", "update", "batch_update", "batch_clear", "add_worksheet"}
+
+@recurso
+def _metricas_proceso() -> dict:
+    return {
+        "lock": threading.Lock(),
+        "ventana": deque(),      # (timestamp, "lectura" | "escritura") del último minuto
+        "api": Counter(),        # llamadas totales por método
+        "cache": Counter(),      # (nombre, "hit" | "miss") -> n
+    }
+
+def _inicio_rerun() -> dict:
+    rerun = {"inicio": time.perf_counter(), "etapas": defaultdict(float), "api": Counter(), "cache": Counter()}
+    _RERUN.set(rerun)
+    return rerun
+
+@contextmanager
+def _medir(etapa: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        rerun = _RERUN.get()
+        if rerun is not None:
+            rerun["etapas"][etapa] += time.perf_counter() - t0
+
+def _contar_api(metodo: str):
+    tipo = "lectura" if metodo in API_LECTURAS else "escritura"
+    m = _metricas_proceso()
+    with m["lock"]:
+        m["api"][metodo] += 1
+        m["ventana"].append((time.time(), tipo))
+    rerun = _RERUN.get()
+    if rerun is not None:
+        rerun["api"][metodo] += 1
+
+def _contar_cache(nombre: str, hit: bool):
+    clave = (nombre, "hit" if hit else "miss")
+    m = _metricas_proceso()
+    with m["lock"]:
+        m["cache"][clave] += 1
+    rerun = _RERUN.get()
+    if rerun is not None:
+        rerun["cache"][clave] += 1
+
+def _uso_cuota() -> dict:
+    """Llamadas del proceso en los últimos 60 s, por tipo."""
+    m = _metricas_proceso()
+    limite = time.time() - 60
+    with m["lock"]:
+        while m["ventana"] and m["ventana"][0][0] < limite:
+            m["ventana"].popleft()
+        uso = Counter(tipo for _, tipo in m["ventana"])
+    return {"lectura": uso["lectura"], "escritura": uso["escritura"]}
+
+class _WsMedido:
+    """Envuelve un Worksheet de gspread para contar y cronometrar cada llamada a la API."""
+
+    def __init__(self, ws):
+        self._ws = ws
+
+    def __getattr__(self, nombre):
+        attr = getattr(self._ws, nombre)
+        if nombre not in API_LECTURAS and nombre not in API_ESCRITURAS:
+            return attr
+
+        def _llamada(*args, **kwargs):
+            _contar_api(nombre)
+            with _medir(f"sheets.{nombre}"):
+                return attr(*args, **kwargs)
+        return _llamada
+
+@recurso
+def _logger_metricas() -> logging.Logger:
+    """Logger de las líneas JSON por rerun, con su propio handler.
+
+    Escribe en el archivo de FINANZAS_METRICAS_LOG o, sin esa variable, en
+    stderr; no depende de que alguien configure el logging raíz.
+    """
+    logger = logging.getLogger("finanzas.metricas")
+    ruta = os.environ.get("FINANZAS_METRICAS_LOG")
+    handler = logging.FileHandler(ruta, encoding="utf-8") if ruta else logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+def _fin_rerun(rerun: dict) -> dict:
+    """Cierra el rerun y emite sus métricas como una línea JSON (logger finanzas.metricas)."""
+    resumen = {
+        "total_s": round(time.perf_counter() - rerun["inicio"], 4),
+        "etapas_s": {k: round(v, 4) for k, v in rerun["etapas"].items()},
+        "api": dict(rerun["api"]),
+        "cache": {f"{n}.{r}": v for (n, r), v in rerun["cache"].items()},
+        "cuota_ultimo_minuto": _uso_cuota(),
+    }
+    _logger_metricas().info(json.dumps(resumen, ensure_ascii=False))
+    return resumen
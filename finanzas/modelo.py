@@ -0,0 +1,111 @@
+"""Modelo del ledger: filas crudas de la hoja, esquema tipado y reparto entre miembros.
+
+Sólo depende de pandas y numpy; no habla con la hoja ni con Streamlit.
+"""
+import pandas as pd
+import numpy as np
+
+from finanzas.config import PROPORCION_COL, USUARIOS
+
+
+def _col_letra(n: int) -> str:
+    letras = ""
+    while n:
+        n, r = divmod(n - 1, 26)
+        letras = chr(65 + r) + letras
+    return letras
+
+def _a1_range_row(row: int, ncols: int) -> str:
+    return f"A{row}:{_col_letra(ncols)}{row}"
+
+def _rows_to_df(rows: list[list[str]], headers: list[str], first_row: int) -> pd.DataFrame:
+    norm_rows = [r[:len(headers)] + [""] * max(0, len(headers)-len(r)) for r in rows]
+    df = pd.DataFrame(norm_rows, columns=headers)
+    df["_row"] = range(first_row, first_row+len(df))
+    return df
+
+# Esquema tipado del ledger normalizado. Las columnas crudas Monto, Anulado y
+# Compartido se reemplazan por Monto_int, Anulado_bool y Compartido_bool.
+# Las escrituras parten siempre de la fila cruda (texto) del ledger, así que
+# la conversión no necesita ser reversible.
+CATEGORICAS = ["Tipo","Persona","Persona_Origen","Persona_Destino","Moneda","Medio","Categoría","Created_By","Reparto"]
+FECHAS_HORA = ["Created_At","Last_Modified_At"]
+VERDADERO = ["true","1","si","sí","yes","y"]
+
+def _normalize_df(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """Convierte la hoja cruda (todo texto) al esquema tipado, sin copiar el frame completo."""
+    cols = {}
+    for col in df_raw.columns:
+        s = df_raw[col]
+        if col in CATEGORICAS:
+            cols[col] = s.astype("category")
+        elif col in PROPORCION_COL.values():
+            cols[col] = pd.to_numeric(s, errors="coerce").fillna(0).clip(0, 100).astype("int8")
+        elif col in FECHAS_HORA:
+            cols[col] = pd.to_datetime(s, errors="coerce")
+        elif col == "Monto":
+            cols["Monto_int"] = pd.to_numeric(s, errors="coerce").fillna(0).round().astype("int64")
+        elif col == "Monto_original":
+            cols[col] = pd.to_numeric(s, errors="coerce").fillna(0).astype("float64")
+        elif col in ("Anulado", "Compartido"):
+            cols[f"{col}_bool"] = s.str.lower().isin(VERDADERO)
+        elif col == "_row":
+            cols[col] = s.astype("int64")
+        else:
+            cols[col] = s
+    cols["Fecha_dt"] = pd.to_datetime(df_raw["Fecha"], errors="coerce")
+    # Orden cronológico (estable, sin fecha al final) para poder cortar
+    # períodos por búsqueda binaria; el índice conserva la posición cruda.
+    return pd.DataFrame(cols, index=df_raw.index).sort_values("Fecha_dt", kind="stable", na_position="last")
+
+def _mismo_valor(nuevo, actual: str) -> bool:
+    # La hoja devuelve valores formateados ("10" para 10.0): se comparan como números si se puede.
+    try:
+        return float(nuevo) == float(actual)
+    except (TypeError, ValueError):
+        return str(nuevo) == actual
+
+# ---------------------------------------------------------
+# Reparto entre N miembros
+# ---------------------------------------------------------
+# `Reparto` guarda el peso de cada miembro en forma normalizada (fracciones
+# que suman 1), p.ej. "🐳Javiera=0.6;🪈Francis=0.4". Los registros antiguos
+# sin `Reparto` se reparten según sus columnas Proporcion_*.
+def _formatear_reparto(pesos: dict[str, float]) -> str:
+    total = sum(w for w in pesos.values() if w > 0)
+    if not total:
+        return ""
+    return ";".join(f"{p}={w / total:.6g}" for p, w in pesos.items() if w > 0)
+
+def _vector_reparto(texto: str) -> list[float]:
+    """Fracciones de `texto` en el orden de USUARIOS (miembros desconocidos se ignoran)."""
+    pesos = dict.fromkeys(USUARIOS, 0.0)
+    for parte in str(texto).split(";"):
+        persona, _, peso = parte.rpartition("=")
+        if persona in pesos:
+            try:
+                pesos[persona] = max(float(peso), 0.0)
+            except ValueError:
+                pass
+    return list(pesos.values())
+
+def _pesos_reparto(df: pd.DataFrame) -> np.ndarray:
+    """Fracción de cada fila que corresponde a cada miembro (filas × USUARIOS; cada fila suma 1 o 0).
+
+    `Reparto` es categórico, así que cada texto distinto se interpreta una
+    sola vez y las filas toman su vector por código.
+    """
+    pesos = np.zeros((len(df), len(USUARIOS)))
+    for j, persona in enumerate(USUARIOS):
+        col = PROPORCION_COL.get(persona)
+        if col in df.columns:
+            pesos[:, j] = df[col].to_numpy(dtype="float64")
+    if "Reparto" in df.columns:
+        rep = df["Reparto"].astype("category")
+        tabla = np.array([_vector_reparto(c) for c in rep.cat.categories] or [[0.0] * len(USUARIOS)])
+        codigos = rep.cat.codes.to_numpy()
+        con = codigos >= 0
+        con[con] = tabla[codigos[con]].sum(axis=1) > 0
+        pesos[con] = tabla[codigos[con]]
+    suma = pesos.sum(axis=1, keepdims=True)
+    return np.divide(pesos, suma, out=np.zeros_like(pesos), where=suma > 0)
@@ -0,0 +1,27 @@
+"""Recursos compartidos por todo el proceso, creados a la primera petición.
+
+Cumple en el núcleo el papel de `st.cache_resource`: guarda el resultado por
+argumentos, no guarda excepciones y `.clear()` lo descarta.
+"""
+import functools
+import threading
+
+
+def recurso(fn):
+    cache = {}
+    lock = threading.RLock()
+
+    @functools.wraps(fn)
+    def envoltura(*args, **kwargs):
+        clave = (args, tuple(sorted(kwargs.items())))
+        try:
+            return cache[clave]
+        except KeyError:
+            pass
+        with lock:
+            if clave not in cache:
+                cache[clave] = fn(*args, **kwargs)
+            return cache[clave]
+
+    envoltura.clear = cache.clear
+    return envoltura
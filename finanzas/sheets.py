@@ -0,0 +1,722 @@
+"""Backend de Google Sheets: conexión, copia local sincronizada, escrituras y diario local.
+
+gspread y google-auth se importan recién al conectarse; todo lo que opera
+sobre el ledger ya cargado (snapshot, parches, diario) funciona sin ellos.
+"""
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import closing
+from pathlib import Path
+
+import pandas as pd
+import numpy as np
+
+from finanzas.config import (
+    DELTA_MAX_FILAS, EXPECTED_HEADERS, FLUSH_ESPERA_MAX, FLUSH_INTERVALO, HOJA, IMPORT_CHUNK,
+    JOURNAL_PATH, RECARGA_COMPLETA, SHEETS_REINTENTOS, SNAPSHOT_PATH, SPREADSHEET_KEY, STGO, SYNC_TTL,
+)
+from finanzas.fx import _monto_clp, _usd_values
+from finanzas.metricas import _WsMedido, _contar_api, _contar_cache, _medir
+from finanzas.modelo import _a1_range_row, _col_letra, _mismo_valor, _rows_to_df
+from finanzas.recursos import recurso
+
+logger = logging.getLogger(__name__)
+
+def _gspread():
+    # gspread (y con él google-auth) se carga recién al hablar con la hoja.
+    import gspread
+    return gspread
+
+def _credenciales_info() -> dict:
+    """Cuenta de servicio: el JSON de FINANZAS_CREDENCIALES o, dentro de la app, st.secrets."""
+    ruta = os.environ.get("FINANZAS_CREDENCIALES")
+    if ruta:
+        return json.loads(Path(ruta).read_text())
+    import streamlit as st
+    return dict(st.secrets["gspread"])
+
+@recurso
+def _get_client():
+    # Un solo cliente autorizado por proceso; google-auth renueva el token
+    # automáticamente sólo cuando expira.
+    from google.oauth2.service_account import Credentials
+
+    creds = Credentials.from_service_account_info(
+        _credenciales_info(),
+        scopes=[
+            "https://spreadsheets.google.com/feeds",
+            "https://www.googleapis.com/auth/drive"
+        ],
+    )
+    return _gspread().authorize(creds)
+
+@recurso
+def _get_spreadsheet():
+    _contar_api("open_by_key")
+    return _get_client().open_by_key(SPREADSHEET_KEY)
+
+@recurso
+def _open_ws(sheet_name=HOJA):
+    _contar_api("worksheet")
+    return _WsMedido(_get_spreadsheet().worksheet(sheet_name))
+
+@recurso
+def _headers_cache() -> dict:
+    # título de hoja -> fila de encabezados ya validada
+    return {}
+
+def _reset_conexion():
+    """Descarta cliente, hojas y encabezados cacheados (p.ej. tras un error de API)."""
+    _open_ws.clear()
+    _get_spreadsheet.clear()
+    _get_client.clear()
+    _headers_cache().clear()
+
+def _ensure_headers(ws, headers_raw=None):
+    cache = _headers_cache()
+    if headers_raw is None:
+        _contar_cache("encabezados", ws.title in cache)
+        if ws.title in cache:
+            return cache[ws.title]
+        headers_raw = ws.row_values(1)
+    headers = [h.strip() for h in headers_raw]
+    missing = [h for h in EXPECTED_HEADERS if h not in headers]
+    if missing:
+        headers = headers + missing
+        ws.update(_a1_range_row(1, len(headers)), [headers])
+    cache[ws.title] = headers
+    return headers
+
+def _nuevo_ledger_state() -> dict:
+    return {
+        "lock": threading.Lock(),       # protege la publicación de df/versión
+        "sync_lock": threading.Lock(),  # una sola sincronización a la vez
+        "refrescando": False,           # hay un refresco en segundo plano en curso
+        "df": None,          # valores crudos (str) + _row
+        "guardado": None,    # df tal como quedó en el snapshot; base del próximo guardado
+        "sucias": set(),     # posiciones parchadas localmente, a releer de la hoja
+        "n_rows": 0,         # filas con ID conocidas en la última sincronización
+        "watermark": "",     # mayor Last_Modified_At visto
+        "version": 0,        # aumenta cada vez que cambia df
+        "synced_at": 0.0,
+        "completa_at": 0.0,  # última recarga completa; 0 tras arrancar desde el snapshot
+    }
+
+@recurso
+def _ledger_state() -> dict:
+    # Copia en memoria de la hoja compartida por todas las sesiones del proceso.
+    return _nuevo_ledger_state()
+
+def _set_ledger(state: dict, df: pd.DataFrame):
+    ids = df["ID"].to_numpy() if "ID" in df else []
+    con_id = [i for i, v in enumerate(ids) if v != ""]
+    state["df"] = df
+    state["n_rows"] = con_id[-1] + 1 if con_id else 0
+    state["watermark"] = df["Last_Modified_At"].max() if len(df) else ""
+    state["version"] += 1
+
+def _full_sync(ws, state: dict):
+    state["completa_at"] = time.time()
+    values = ws.get_all_values()
+    # La primera fila ya trae los encabezados: se validan sin otra llamada.
+    headers = _ensure_headers(ws, values[0] if values else [])
+    if not values:
+        _set_ledger(state, pd.DataFrame(columns=EXPECTED_HEADERS + ["_row"]))
+        return
+    _set_ledger(state, _rows_to_df(values[1:], headers, 2))
+
+def _delta_sync(ws, state: dict) -> bool:
+    """Trae sólo la cola nueva y las filas cuyo Last_Modified_At cambió.
+
+    Devuelve False si la hoja cambió de forma que el delta no puede
+    aplicarse (filas borradas o reordenadas); entonces hay que recargar todo.
+    """
+    df = state["df"]
+    n = state["n_rows"]
+    headers = list(df.columns[:-1])
+
+    # Los encabezados viajan en la misma llamada que las columnas ID y
+    # Last_Modified_At: validarlos no cuesta otro viaje a la API.
+    id_col = _col_letra(headers.index("ID") + 1)
+    lm_col = _col_letra(headers.index("Last_Modified_At") + 1)
+    fila1, ids_vr, lms_vr = ws.batch_get(["1:1", f"{id_col}2:{id_col}", f"{lm_col}2:{lm_col}"])
+    if _ensure_headers(ws, fila1[0] if fila1 else []) != headers:
+        return False
+    ids = [r[0] if r else "" for r in ids_vr]
+    lms = [r[0] if r else "" for r in lms_vr]
+    lms += [""] * (len(ids) - len(lms))
+
+    if len(ids) < n or ids[:n] != df["ID"].iloc[:n].tolist():
+        return False
+
+    # La columna completa ya viene en la respuesta: se compara fila a fila en
+    # vez de contra el watermark, porque el diario sella Last_Modified_At al
+    # encolar y la hoja puede recibir el cambio después de que otro proceso
+    # ya sincronizó sellos más nuevos.
+    cached_lms = df["Last_Modified_At"].iloc[:n].tolist()
+    tocadas = [i for i in range(n) if lms[i] != cached_lms[i]]
+    tocadas = sorted(set(tocadas).union(i for i in state["sucias"] if i < n))
+    hay_cola = len(ids) > n
+    if not tocadas and not hay_cola:
+        return True
+    if len(tocadas) > DELTA_MAX_FILAS:
+        return False
+
+    last_col = _col_letra(len(headers))
+    ranges = [f"A{i+2}:{last_col}{i+2}" for i in tocadas]
+    if hay_cola:
+        ranges.append(f"A{n+2}:{last_col}{len(ids)+1}")
+    resp = ws.batch_get(ranges)
+
+    # Se parchea una copia y se publica de una vez: las sesiones que estén
+    # leyendo la versión anterior nunca ven un delta aplicado a medias.
+    new_df = df.iloc[:n].copy()
+    if tocadas:
+        filas = [vr[0] if vr else [] for vr in resp[:len(tocadas)]]
+        patch = _rows_to_df(filas, headers, 0)
+        new_df.iloc[tocadas, :len(headers)] = patch[headers].to_numpy()
+    if hay_cola:
+        cola = _rows_to_df(list(resp[-1]), headers, n + 2)
+        new_df = pd.concat([new_df, cola], ignore_index=True)
+    _set_ledger(state, new_df)
+    return True
+
+# ---------------------------------------------------------
+# Snapshot local (SQLite) para arrancar sin esperar a la red
+# ---------------------------------------------------------
+def _snapshot_load(state: dict, path: Path = SNAPSHOT_PATH) -> bool:
+    if not path.exists():
+        return False
+    try:
+        with closing(sqlite3.connect(path)) as con:
+            meta = dict(con.execute("SELECT key, value FROM meta"))
+            headers = json.loads(meta["headers"])
+            df = pd.read_sql_query("SELECT * FROM ledger ORDER BY _row", con)
+        df = df[headers + ["_row"]]
+    except Exception:
+        logger.warning("Snapshot ilegible, se ignora: %s", path)
+        return False
+    df[headers] = df[headers].fillna("")
+    state["df"] = df
+    state["guardado"] = df
+    state["n_rows"] = int(meta["n_rows"])
+    state["watermark"] = meta["watermark"]
+    state["version"] += 1
+    return True
+
+def _snapshot_save(prev: pd.DataFrame | None, nuevo: dict, path: Path = SNAPSHOT_PATH):
+    """Lleva el snapshot de `prev` a `nuevo["df"]` reescribiendo sólo las filas que cambiaron.
+
+    `prev` tiene que ser lo último que se guardó en `path`, no la copia en
+    memoria: ésa ya puede traer parches locales que el archivo no tiene.
+    Las filas se alinean por `_row` (contiguo desde 2) y una fila cambia si
+    cambió su ID o cualquiera de sus valores.
+    """
+    df = nuevo["df"]
+    headers = list(df.columns[:-1])
+    cols_sql = ", ".join(f'"{c}"' for c in df.columns)
+    insert = f"INSERT OR REPLACE INTO ledger ({cols_sql}) VALUES ({', '.join('?' * len(df.columns))})"
+    completo = prev is None or list(prev.columns) != list(df.columns) or not path.exists()
+    try:
+        path.parent.mkdir(exist_ok=True)
+        with closing(sqlite3.connect(path)) as con, con:
+            if completo:
+                con.execute("DROP TABLE IF EXISTS ledger")
+                con.execute("DROP TABLE IF EXISTS meta")
+                defs = ", ".join(f'"{c}" TEXT' for c in headers)
+                con.execute(f"CREATE TABLE ledger ({defs}, _row INTEGER PRIMARY KEY)")
+                con.execute('CREATE INDEX ledger_id ON ledger("ID")')
+                con.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+                filas = df
+            else:
+                m = min(len(prev), len(df))
+                a = prev.iloc[:m, :-1].to_numpy()
+                b = df.iloc[:m, :-1].to_numpy()
+                cambiadas = np.flatnonzero((a != b).any(axis=1)).tolist()
+                filas = df.iloc[cambiadas + list(range(m, len(df)))]
+                con.execute("DELETE FROM ledger WHERE _row > ?", (len(df) + 1,))
+            con.executemany(insert, (
+                tuple(r[:-1]) + (int(r[-1]),) for r in filas.itertuples(index=False, name=None)
+            ))
+            con.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                ("headers", json.dumps(headers, ensure_ascii=False)),
+                ("n_rows", str(nuevo["n_rows"])),
+                ("watermark", nuevo["watermark"]),
+            ])
+    except sqlite3.Error:
+        # Un snapshot desalineado es peor que ninguno: se descarta y el
+        # próximo guardado lo reescribe completo.
+        logger.exception("No se pudo guardar el snapshot %s", path)
+        path.unlink(missing_ok=True)
+
+@_medir("sync")
+def _sync_ledger(ws, state: dict, path: Path = SNAPSHOT_PATH, journal: dict | None = None):
+    """Sincroniza con la hoja y publica el resultado sin bloquear a los lectores.
+
+    Con `journal`, lo que aún no llega a la hoja se superpone a lo leído.
+    Se consulta antes de leer la hoja: un registro que se vacíe entremedio
+    aparece en la lectura o en la superposición, nunca en ninguna.
+    """
+    pendientes = _journal_pendientes(journal) if journal else []
+    with state["lock"]:
+        prev = state["df"]
+        guardado = state["guardado"]
+        nuevo = {k: state[k] for k in ("df", "n_rows", "watermark", "version", "sucias", "completa_at")}
+    base = nuevo["version"]
+    # Una edición hecha a mano en la hoja no toca Last_Modified_At y el delta
+    # no la ve: cada RECARGA_COMPLETA segundos (y en la primera sincronización
+    # tras arrancar desde el snapshot) se relee todo.
+    if prev is None or time.time() - nuevo["completa_at"] > RECARGA_COMPLETA:
+        _full_sync(ws, nuevo)
+    else:
+        try:
+            ok = _delta_sync(ws, nuevo)
+        except (_gspread().exceptions.APIError, ValueError):
+            ok = False
+        if not ok:
+            _full_sync(ws, nuevo)
+    if pendientes:
+        nuevo["df"], _ = _aplicar_parche(nuevo["df"], *_parche_journal(pendientes))
+        nuevo["version"] += 1
+    with state["lock"]:
+        if state["version"] != base:
+            # Una escritura parchó la copia local mientras se leía la hoja:
+            # lo leído puede no incluirla, así que se descarta y se relee.
+            state["synced_at"] = 0.0
+            return
+        nuevo["sucias"] = set()
+        state.update(nuevo)
+        state["synced_at"] = time.time()
+    # El snapshot se lleva desde lo que se guardó la última vez: `prev` puede
+    # traer altas y ediciones parchadas en memoria que el archivo no tiene.
+    if nuevo["df"] is not guardado:
+        _snapshot_save(guardado, nuevo, path)
+        state["guardado"] = nuevo["df"]
+
+def _refrescar(state: dict):
+    with state["sync_lock"]:
+        try:
+            _sync_ledger(_open_ws(HOJA), state, journal=_journal())
+        except Exception:
+            logger.exception("Falló el refresco del ledger en segundo plano")
+        finally:
+            state["refrescando"] = False
+
+def _refrescar_en_fondo(state: dict):
+    with state["lock"]:
+        if state["refrescando"]:
+            return
+        state["refrescando"] = True
+    threading.Thread(target=_refrescar, args=(state,), daemon=True).start()
+
+def _load_ledger(force: bool = False) -> tuple[pd.DataFrame, int]:
+    """Devuelve (df crudo, versión) sin esperar a la red salvo en el primer arranque.
+
+    Si la copia venció SYNC_TTL se sigue sirviendo mientras un hilo la
+    refresca (stale-while-revalidate); cada rerun toma la versión publicada
+    de una vez, así que nunca ve un refresco a medias. Sólo se bloquea con
+    `force` o cuando no hay ni copia en memoria ni snapshot local.
+    """
+    state = _ledger_state()
+    vencido = time.time() - state["synced_at"] > SYNC_TTL
+    _contar_cache("ledger", state["df"] is not None and not vencido)
+    if state["df"] is None:
+        with state["sync_lock"]:
+            if state["df"] is None:
+                if _snapshot_load(state):
+                    _refrescar_en_fondo(state)
+                else:
+                    _sync_ledger(_open_ws(HOJA), state, journal=_journal())
+    elif force:
+        with state["sync_lock"]:
+            _sync_ledger(_open_ws(HOJA), state, journal=_journal())
+    elif vencido:
+        _refrescar_en_fondo(state)
+    with state["lock"]:
+        return state["df"], state["version"]
+
+def _load_df() -> pd.DataFrame:
+    return _load_ledger()[0]
+
+def _invalidar_ledger():
+    """Pide un refresco (incremental, en segundo plano) en la próxima lectura."""
+    _ledger_state()["synced_at"] = 0.0
+
+def _parchear_ledger(altas: pd.DataFrame | None = None, cambios: dict[str, dict] | None = None):
+    """Aplica a la copia en memoria lo que se acaba de escribir en la hoja.
+
+    Así quien escribe ve su cambio en el rerun siguiente sin esperar el
+    refresco. Las filas editadas quedan en `sucias` y las agregadas fuera de
+    `n_rows`, de modo que la próxima sincronización las relee tal como las
+    guardó la hoja (con su formato).
+    """
+    state = _ledger_state()
+    with state["lock"]:
+        if state["df"] is None:
+            return
+        nuevo, tocadas = _aplicar_parche(state["df"], altas, cambios)
+        state.update(df=nuevo, sucias=state["sucias"] | tocadas, version=state["version"] + 1, synced_at=0.0)
+
+def _aplicar_parche(df: pd.DataFrame, altas: pd.DataFrame | None,
+                    cambios: dict[str, dict] | None) -> tuple[pd.DataFrame, set[int]]:
+    """Copia de `df` con `cambios` (por ID) aplicados y las `altas` cuyo ID falta, al final.
+
+    Devuelve también las posiciones editadas.
+    """
+    headers = list(df.columns[:-1])
+    nuevo = df.copy()
+    tocadas = set()
+    ids = nuevo["ID"].to_numpy()
+    for rec_id, valores in (cambios or {}).items():
+        pos = np.flatnonzero(ids == rec_id)
+        if not len(pos):
+            continue
+        for h, v in valores.items():
+            if h in headers:
+                nuevo.iat[pos[0], headers.index(h)] = "" if v is None else str(v)
+        tocadas.add(int(pos[0]))
+    if altas is not None and len(altas):
+        altas = altas[~altas["ID"].isin(set(ids))]
+        filas = [["" if v is None else str(v) for v in r]
+                 for r in altas.reindex(columns=headers, fill_value="").to_numpy().tolist()]
+        desde = int(df["_row"].max()) + 1 if len(df) else 2
+        nuevo = pd.concat([nuevo, _rows_to_df(filas, headers, desde)], ignore_index=True)
+    return nuevo, tocadas
+
+def _sheets_write(fn, hoja: str = HOJA):
+    """Ejecuta una escritura contra la hoja con reintentos.
+
+    Ante 429 (cuota) o 5xx espera con backoff exponencial y jitter; si la
+    conexión cacheada quedó inválida (401/403/404) reconecta una vez.
+    """
+    reconectado = False
+    for intento in range(SHEETS_REINTENTOS):
+        try:
+            return fn(_open_ws(hoja))
+        except _gspread().exceptions.APIError as e:
+            code = e.response.status_code
+            ultimo = e
+            if code in (401, 403, 404) and not reconectado:
+                _reset_conexion()
+                reconectado = True
+            elif code == 429 or code >= 500:
+                time.sleep(min(2 ** intento, 32) + random.random())
+            else:
+                raise
+    raise ultimo
+
+def _append_records(records: pd.DataFrame, progreso=None) -> int:
+    """Agrega muchos registros con `append_rows` en bloques de IMPORT_CHUNK filas.
+
+    Cada bloque omite los IDs que ya están en la hoja, como el vaciado del
+    diario: un reintento tras un 5xx que sí se aplicó, o repetir la
+    importación después de un fallo, no duplica filas. Devuelve cuántas
+    filas quedaron procesadas; si un bloque falla tras los reintentos, la
+    excepción se propaga y los bloques anteriores ya están en la hoja.
+    """
+    escritas = 0
+    for start in range(0, len(records), IMPORT_CHUNK):
+        chunk = records.iloc[start:start + IMPORT_CHUNK].to_dict("records")
+        _sheets_write(lambda ws: _escribir_altas(ws, chunk))
+        _parchear_ledger(altas=records.iloc[start:start + IMPORT_CHUNK])
+        escritas = min(start + IMPORT_CHUNK, len(records))
+        if progreso:
+            progreso(escritas / len(records))
+    return escritas
+
+class ConflictoEdicion(Exception):
+    """El registro cambió (o desapareció) en la hoja desde que se cargó."""
+
+def _actualizar_registro(rec_id: str, row: int, cambios: dict, last_modified: str) -> list[str]:
+    """Escribe sólo las celdas de `cambios` que difieren de la hoja, en un único batch_update.
+
+    Antes de escribir relee la fila: si `row` ya no contiene `rec_id` (la hoja
+    se reordenó desde la carga) lo busca por ID, y si su Last_Modified_At no es
+    `last_modified` alguien más lo editó: lanza ConflictoEdicion en vez de
+    pisar ese cambio. Devuelve las columnas escritas.
+    """
+    edicion = {"id": rec_id, "fila": row, "datos": cambios, "last_modified": last_modified}
+    diff, = _sheets_write(lambda ws: _aplicar_ediciones(ws, [edicion]))
+    if isinstance(diff, ConflictoEdicion):
+        raise diff
+    if diff:
+        _parchear_ledger(cambios={rec_id: diff})
+    return list(diff)
+
+def _leer_filas(ws, headers: list[str], filas: list[int]) -> list[dict]:
+    last_col = _col_letra(len(headers))
+    resp = ws.batch_get([f"A{f}:{last_col}{f}" for f in filas]) if filas else []
+    return [dict(zip(headers, (vr[0] if vr else []) + [""] * len(headers))) for vr in resp]
+
+def _aplicar_ediciones(ws, ediciones: list[dict]) -> list[dict | ConflictoEdicion]:
+    """Verifica y escribe varias ediciones con un batch_get y un único batch_update.
+
+    Cada edición (`id`, `fila`, `datos`, `last_modified`) se comprueba como en
+    `_actualizar_registro`; las que no pasan quedan como ConflictoEdicion en
+    el resultado, alineado con `ediciones`, sin impedir que se escriban las
+    demás. Las que pasan devuelven las celdas escritas.
+    """
+    headers = _ensure_headers(ws)
+    filas = sorted({e["fila"] for e in ediciones})
+    vistas = dict(zip(filas, _leer_filas(ws, headers, filas)))
+    ubicacion = {e["id"]: e["fila"] for e in ediciones if vistas[e["fila"]]["ID"] == e["id"]}
+    movidos = {e["id"] for e in ediciones} - set(ubicacion)
+    if movidos:
+        # La hoja se reordenó desde la carga: una lectura de la columna ID los ubica a todos.
+        col = _col_letra(headers.index("ID") + 1)
+        en_hoja = {r[0]: f for f, r in enumerate(ws.get(f"{col}2:{col}"), start=2) if r and r[0] in movidos}
+        ubicacion.update(en_hoja)
+        nuevas = sorted(set(en_hoja.values()) - set(vistas))
+        vistas.update(zip(nuevas, _leer_filas(ws, headers, nuevas)))
+
+    resultado, celdas = [], []
+    for e in ediciones:
+        fila = ubicacion.get(e["id"])
+        if fila is None:
+            resultado.append(ConflictoEdicion(f"El registro {e['id']} ya no existe en la hoja."))
+            continue
+        actual = vistas[fila]
+        if actual["Last_Modified_At"] != e["last_modified"]:
+            # Un reintento tras un 5xx que sí llegó a aplicarse encuentra
+            # nuestro propio sello y las celdas ya escritas: no es un conflicto.
+            if actual["Last_Modified_At"] == e["datos"].get("Last_Modified_At") and not _diff_edicion(actual, e["datos"]):
+                resultado.append({})
+                continue
+            resultado.append(ConflictoEdicion(
+                f"El registro {e['id']} fue modificado el {actual['Last_Modified_At']} "
+                f"por {actual['Last_Modified_By'] or 'otra persona'}."
+            ))
+            continue
+        diff = _diff_edicion(actual, e["datos"])
+        celdas += [{"range": f"{_col_letra(headers.index(h) + 1)}{fila}", "values": [[v]]} for h, v in diff.items()]
+        resultado.append(diff)
+    if celdas:
+        ws.batch_update(celdas, value_input_option="USER_ENTERED")
+    return resultado
+
+# ---------------------------------------------------------
+# Diario local (write-behind)
+# ---------------------------------------------------------
+# Los formularios escriben en un diario SQLite (modo WAL) y vuelven de
+# inmediato; un hilo lo vacía hacia la hoja en lotes. Las altas se
+# deduplican por ID contra la hoja, así que repetir un lote ya escrito no
+# duplica filas, y las ediciones conservan su precondición Last_Modified_At.
+def _journal_conectar(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(exist_ok=True)
+    con = sqlite3.connect(path, timeout=10)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("""CREATE TABLE IF NOT EXISTS pendientes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        id TEXT NOT NULL,
+        accion TEXT NOT NULL,       -- 'alta' | 'edicion'
+        datos TEXT NOT NULL,        -- JSON del registro o de las celdas a cambiar
+        fila INTEGER,               -- edición: fila vista al cargar
+        last_modified TEXT,         -- edición: precondición
+        creado_at REAL NOT NULL,
+        error TEXT                  -- conflicto: ya no se reintenta
+    )""")
+    return con
+
+@recurso
+def _journal() -> dict:
+    store = {"path": JOURNAL_PATH, "lock": threading.Lock(), "despertar": threading.Event()}
+    threading.Thread(target=_vaciador, args=(store,), daemon=True).start()
+    return store
+
+def _journal_agregar(store: dict, accion: str, rec_id: str, datos: dict,
+                     fila: int | None = None, last_modified: str | None = None):
+    _journal_agregar_lote(store, [(accion, rec_id, datos, fila, last_modified)])
+
+def _journal_agregar_lote(store: dict, entradas: list[tuple]):
+    """Varias entradas (accion, id, datos, fila, last_modified) en una sola transacción."""
+    ahora = time.time()
+    with closing(_journal_conectar(store["path"])) as con, con:
+        con.executemany(
+            "INSERT INTO pendientes (id, accion, datos, fila, last_modified, creado_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(rec_id, accion, json.dumps(datos, ensure_ascii=False, default=str), fila, last_modified, ahora)
+             for accion, rec_id, datos, fila, last_modified in entradas],
+        )
+    store["despertar"].set()
+
+def _journal_pendientes(store: dict, con_error: bool = False) -> list[dict]:
+    with closing(_journal_conectar(store["path"])) as con:
+        con.row_factory = sqlite3.Row
+        filas = con.execute(
+            f"SELECT * FROM pendientes WHERE error IS {'NOT NULL' if con_error else 'NULL'} ORDER BY seq"
+        ).fetchall()
+    return [{**dict(f), "datos": json.loads(f["datos"])} for f in filas]
+
+def _journal_quitar(store: dict, seqs: list[int]):
+    with closing(_journal_conectar(store["path"])) as con, con:
+        con.executemany("DELETE FROM pendientes WHERE seq = ?", [(s,) for s in seqs])
+
+def _journal_marcar_error(store: dict, seq: int, error: str):
+    with closing(_journal_conectar(store["path"])) as con, con:
+        con.execute("UPDATE pendientes SET error = ? WHERE seq = ?", (error, seq))
+
+def _parche_journal(pendientes: list[dict]) -> tuple[pd.DataFrame | None, dict[str, dict]]:
+    altas = [p["datos"] for p in pendientes if p["accion"] == "alta"]
+    cambios = defaultdict(dict)
+    for p in pendientes:
+        if p["accion"] == "edicion":
+            cambios[p["id"]].update(p["datos"])
+    return (pd.DataFrame(altas) if altas else None), cambios
+
+def _encolar_alta(record: dict):
+    """Registra un alta en el diario local; la hoja la recibe en el próximo vaciado."""
+    _journal_agregar(_journal(), "alta", record["ID"], record)
+    _parchear_ledger(altas=pd.DataFrame([record]))
+
+def _encolar_edicion(rec_id: str, actual: pd.Series, cambios: dict) -> list[str]:
+    """Registra en el diario las celdas de `cambios` que difieren de `actual` (fila cruda).
+
+    La precondición es el Last_Modified_At de `actual`: si al vaciar la hoja
+    ya tiene otro, la edición queda marcada como conflicto en vez de
+    aplicarse. Devuelve las columnas que se escribirán.
+    """
+    diff = _diff_edicion(actual, cambios)
+    if not diff:
+        return []
+    _journal_agregar(_journal(), "edicion", rec_id, diff, int(actual["_row"]), actual["Last_Modified_At"])
+    _parchear_ledger(cambios={rec_id: diff})
+    return list(diff)
+
+def _diff_edicion(actual: pd.Series, cambios: dict) -> dict:
+    """Celdas de `cambios` que difieren de `actual`, más los sellos de edición si hay alguna."""
+    sellos = ("Last_Modified_At", "Last_Modified_By")
+    diff = {h: v for h, v in cambios.items() if h not in sellos and not _mismo_valor(v, actual.get(h, ""))}
+    if diff:
+        diff.update({h: cambios[h] for h in sellos if h in cambios})
+    return diff
+
+def _escribir_altas(ws, registros: list[dict]):
+    headers = _ensure_headers(ws)
+    col = _col_letra(headers.index("ID") + 1)
+    en_hoja = {r[0] for r in ws.get(f"{col}2:{col}") if r}
+    filas = [[r.get(h, "") for h in headers] for r in registros if r["ID"] not in en_hoja]
+    if filas:
+        ws.append_rows(filas, value_input_option="USER_ENTERED")
+
+def _agrupar_ediciones(pendientes: list[dict]) -> list[dict]:
+    """Junta las ediciones pendientes de cada registro en una sola, en orden de llegada.
+
+    Cada una se encoló sobre la anterior (su precondición es el sello que
+    dejó la previa), así que equivalen a una edición con la precondición de
+    la primera y las celdas de todas. `seqs` guarda las entradas que cubre.
+    """
+    grupos = {}
+    for p in pendientes:
+        if p["accion"] != "edicion":
+            continue
+        g = grupos.setdefault(p["id"], {
+            "id": p["id"], "fila": p["fila"], "last_modified": p["last_modified"], "datos": {}, "seqs": [],
+        })
+        g["datos"].update(p["datos"])
+        g["seqs"].append(p["seq"])
+    return list(grupos.values())
+
+def _escribir_ediciones(lote: list[dict]) -> list[dict | Exception]:
+    """`_aplicar_ediciones` con reintentos; un error propio de una entrada no frena al resto.
+
+    Si la hoja rechaza el lote con un 4xx que no es de cuota ni de conexión
+    (p.ej. un 400 por un valor inválido), se reintenta entrada por entrada
+    y la que vuelva a fallar devuelve su error en vez de lanzarlo.
+    """
+    try:
+        return _sheets_write(lambda ws: _aplicar_ediciones(ws, lote))
+    except _gspread().exceptions.APIError as e:
+        code = e.response.status_code
+        if code in (401, 403, 404, 429) or code >= 500:
+            raise
+        if len(lote) == 1:
+            return [e]
+        return [r for edicion in lote for r in _escribir_ediciones([edicion])]
+
+def _vaciar_journal(store: dict) -> int:
+    """Sube a la hoja todo lo pendiente del diario. Devuelve cuántas entradas se procesaron.
+
+    Las altas van en bloques de `append_rows` y las ediciones en bloques de
+    un batch_get más un batch_update. Una edición en conflicto o rechazada
+    por la hoja queda marcada con su error y no se reintenta.
+    """
+    with store["lock"]:
+        pendientes = _journal_pendientes(store)
+        if not pendientes:
+            return 0
+        altas = [p for p in pendientes if p["accion"] == "alta"]
+        for ini in range(0, len(altas), IMPORT_CHUNK):
+            lote = altas[ini:ini + IMPORT_CHUNK]
+            _sheets_write(lambda ws: _escribir_altas(ws, [p["datos"] for p in lote]))
+            _journal_quitar(store, [p["seq"] for p in lote])
+        ediciones = _agrupar_ediciones(pendientes)
+        for ini in range(0, len(ediciones), IMPORT_CHUNK):
+            lote = ediciones[ini:ini + IMPORT_CHUNK]
+            hechas, parche = [], {}
+            for e, res in zip(lote, _escribir_ediciones(lote)):
+                if isinstance(res, Exception):
+                    for seq in e["seqs"]:
+                        _journal_marcar_error(store, seq, str(res))
+                    # La copia local muestra la edición rechazada: se relee esa fila.
+                    parche[e["id"]] = {}
+                else:
+                    hechas += e["seqs"]
+                    parche[e["id"]] = res
+            _journal_quitar(store, hechas)
+            _parchear_ledger(cambios=parche)
+        _invalidar_ledger()
+        return len(pendientes)
+
+def _vaciador(store: dict):
+    espera = FLUSH_INTERVALO
+    while True:
+        store["despertar"].wait(espera)
+        store["despertar"].clear()
+        try:
+            _vaciar_journal(store)
+            espera = FLUSH_INTERVALO
+        except Exception:
+            logger.exception("No se pudo vaciar el diario local; se reintentará")
+            espera = min(espera * 2, FLUSH_ESPERA_MAX)
+
+def _revalorizar_usd(df: pd.DataFrame, df_raw: pd.DataFrame, store: dict | None = None) -> int:
+    """Recalcula `Monto` (CLP) de todos los registros en USD con el dólar de su fecha.
+
+    Los cambios pasan por el diario como cualquier edición, en una sola
+    transacción: el vaciado los sube en lotes de un batch_get y un
+    batch_update, los ubica por ID y respeta la precondición Last_Modified_At
+    de la fila cruda. Los registros sin Monto_original (heredados) se dejan
+    como están. Devuelve cuántos registros se encolaron.
+    """
+    usd = df[(df["Moneda"] == "USD") & (df["Monto_original"] != 0)]
+    if usd.empty:
+        return 0
+    nuevos = _monto_clp(usd["Monto_original"], _usd_values(usd["Fecha_dt"], store))
+    cambios = usd[nuevos != usd["Monto_int"]]
+    if cambios.empty:
+        return 0
+    ahora = pd.Timestamp.now(tz=STGO).strftime("%Y-%m-%d %H:%M:%S")
+    entradas, parche = [], {}
+    for idx, rec_id, monto in zip(cambios.index, cambios["ID"], nuevos[cambios.index]):
+        actual = df_raw.loc[idx]
+        diff = _diff_edicion(actual, {
+            "Monto": int(monto), "Last_Modified_At": ahora, "Last_Modified_By": "Revalorización USD",
+        })
+        if diff:
+            entradas.append(("edicion", rec_id, diff, int(actual["_row"]), actual["Last_Modified_At"]))
+            parche[rec_id] = diff
+    if entradas:
+        _journal_agregar_lote(_journal(), entradas)
+        _parchear_ledger(cambios=parche)
+    return len(parche)
+
+def _leer_hoja(nombre: str = HOJA) -> pd.DataFrame:
+    """Lectura completa y directa de una hoja, sin la copia compartida ni el snapshot (procesos batch)."""
+    state = _nuevo_ledger_state()
+    _full_sync(_open_ws(nombre), state)
+    return state["df"]
@@ -0,0 +1,54 @@
+"""Fixtures compartidas: hojas en memoria y rutas temporales, sin red ni credenciales."""
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.fake_ws import FakeWorksheet
+from benchmarks.sintetico import generar_ledger
+from finanzas import sheets
+
+
+@pytest.fixture
+def valores():
+    return generar_ledger(300, seed=3)
+
+
+@pytest.fixture
+def ws(valores):
+    return FakeWorksheet(valores)
+
+
+@pytest.fixture
+def hoja(monkeypatch, ws):
+    """La hoja en memoria queda como la hoja abierta para las escrituras de `finanzas.sheets`."""
+    monkeypatch.setattr(sheets, "_open_ws", lambda nombre=sheets.HOJA: ws)
+    return ws
+
+
+@pytest.fixture
+def diario(tmp_path):
+    return {"path": tmp_path / "journal.sqlite", "lock": threading.Lock(), "despertar": threading.Event()}
+
+
+@pytest.fixture
+def estado(monkeypatch, diario):
+    """Copia compartida y diario propios de la prueba, en lugar de los del proceso."""
+    state = sheets._nuevo_ledger_state()
+    monkeypatch.setattr(sheets, "_ledger_state", lambda: state)
+    monkeypatch.setattr(sheets, "_journal", lambda: diario)
+    return state
+
+
+@pytest.fixture
+def error_api():
+    """Construye un APIError de gspread con el código HTTP dado, sin pasar por la red."""
+    gspread = pytest.importorskip("gspread")
+
+    def _error(codigo: int):
+        e = gspread.exceptions.APIError.__new__(gspread.exceptions.APIError)
+        e.response = SimpleNamespace(status_code=codigo)
+        e.code = codigo
+        e.error = {"code": codigo, "message": "rechazado", "status": "INVALID_ARGUMENT"}
+        return e
+    return _error
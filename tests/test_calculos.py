@@ -0,0 +1,102 @@
+"""Los cálculos para N miembros reproducen las fórmulas originales de dos personas y escalan a más."""
+import pandas as pd
+import pytest
+
+from benchmarks.sintetico import generar_ledger
+from finanzas import calculos, modelo
+from finanzas.calculos import calcular_saldos, calcular_totales_personales, liquidar
+from finanzas.config import EXPECTED_HEADERS, USER_A, USER_B, USUARIOS
+from finanzas.modelo import _normalize_df
+
+PROPORCION = {USER_A: "Proporcion_Javiera", USER_B: "Proporcion_Francis"}
+
+
+@pytest.fixture(scope="module")
+def df():
+    valores = generar_ledger(2000, seed=5)
+    return _normalize_df(pd.DataFrame(valores[1:], columns=valores[0]))
+
+
+def _gastos_personales_dos(df, persona):
+    act = df[~df["Anulado_bool"] & (df["Tipo"] == "Gasto")]
+    prop = act[PROPORCION[persona]].astype(float) / 100
+    propio = act["Persona"] == persona
+    indiv = act.loc[~act["Compartido_bool"] & propio, "Monto_int"].sum()
+    pagados = (act["Monto_int"] * prop)[act["Compartido_bool"] & propio].sum()
+    recibidos = (act["Monto_int"] * prop)[act["Compartido_bool"] & ~propio].sum()
+    return {"Gastos_individuales": indiv, "Aporte_compartidos_pagados": pagados,
+            "Beneficio_compartidos_recibidos": recibidos, "Total_considerado": indiv + pagados + recibidos}
+
+
+def _saldos_dos(df):
+    act = df[~df["Anulado_bool"] & df["Compartido_bool"]]
+    por_j = (act["Monto_int"] * act["Proporcion_Francis"].astype(float) / 100)[act["Persona"] == USER_A].sum()
+    por_f = (act["Monto_int"] * act["Proporcion_Javiera"].astype(float) / 100)[act["Persona"] == USER_B].sum()
+    return {USER_A: por_f - por_j, USER_B: por_j - por_f}
+
+
+def test_totales_personales_como_dos_personas(df):
+    totales = calcular_totales_personales(df).set_index("Persona")
+    for persona in USUARIOS:
+        for col, esperado in _gastos_personales_dos(df, persona).items():
+            assert totales.loc[persona, col] == pytest.approx(esperado, abs=1)
+
+
+def test_saldos_como_dos_personas(df):
+    saldos = calcular_saldos(df)
+    for persona, esperado in _saldos_dos(df).items():
+        assert saldos[persona] == pytest.approx(esperado, abs=1)
+
+
+def test_liquidar_deja_a_todos_a_mano(df):
+    saldos = calcular_saldos(df, netear_traspasos=True)
+    for t in liquidar(df):
+        saldos[t["Desde"]] -= t["Monto"]
+        saldos[t["Hacia"]] += t["Monto"]
+    assert all(abs(v) <= len(USUARIOS) for v in saldos.values())
+
+
+@pytest.fixture
+def tres(monkeypatch):
+    miembros = ["Ana", "Beto", "Caro"]
+    for modulo in (calculos, modelo):
+        monkeypatch.setattr(modulo, "USUARIOS", miembros)
+    return miembros
+
+
+def _ledger_tres(filas):
+    """Registros normalizados a partir de (Tipo, Persona u Origen>Destino, Monto, Reparto)."""
+    registros = []
+    for tipo, persona, monto, reparto in filas:
+        origen, _, destino = persona.partition(">") if tipo == "Traspaso" else ("", "", "")
+        registros.append({"ID": str(len(registros)), "Tipo": tipo, "Fecha": "2024-05-01", "Monto": str(monto),
+                          "Persona": "" if destino else persona, "Persona_Origen": origen, "Persona_Destino": destino,
+                          "Compartido": "TRUE" if reparto else "", "Reparto": reparto})
+    raw = pd.DataFrame(registros).reindex(columns=EXPECTED_HEADERS, fill_value="")
+    raw["_row"] = range(2, 2 + len(raw))
+    return _normalize_df(raw)
+
+
+def test_tres_miembros(tres):
+    df = _ledger_tres([
+        ("Gasto", "Ana", 900, "Ana=1;Beto=1;Caro=1"),
+        ("Gasto", "Beto", 300, "Ana=0.5;Caro=0.5"),
+        ("Gasto", "Caro", 5000, ""),
+    ])
+
+    totales = calcular_totales_personales(df).set_index("Persona")
+    assert totales["Total_considerado"].to_dict() == pytest.approx({"Ana": 450, "Beto": 300, "Caro": 5450})
+    assert calcular_saldos(df) == pytest.approx({"Ana": -450, "Beto": 0, "Caro": 450})
+    assert liquidar(df) == [{"Desde": "Caro", "Hacia": "Ana", "Monto": 450}]
+
+
+def test_tres_miembros_descuenta_traspasos(tres):
+    df = _ledger_tres([
+        ("Gasto", "Ana", 900, "Ana=1;Beto=1;Caro=1"),
+        ("Traspaso", "Caro>Ana", 200, ""),
+    ])
+
+    assert sorted(liquidar(df), key=lambda t: t["Desde"]) == [
+        {"Desde": "Beto", "Hacia": "Ana", "Monto": 300},
+        {"Desde": "Caro", "Hacia": "Ana", "Monto": 100},
+    ]
@@ -0,0 +1,110 @@
+"""Cerrar un año contra hojas en memoria: archivo, totales congelados y borrado seguro."""
+import pytest
+
+from benchmarks.fake_ws import FakeSpreadsheet, FakeWorksheet
+from benchmarks.sintetico import generar_ledger
+from finanzas import cierres, sheets
+from finanzas.config import EXPECTED_HEADERS, HOJA, HOJA_ARCHIVO, HOJA_CIERRES, USUARIOS
+
+ANIO = 2019
+LM = "2099-01-01 10:00:00"
+
+
+@pytest.fixture
+def libro(monkeypatch, estado, diario):
+    libro = FakeSpreadsheet([
+        FakeWorksheet(generar_ledger(300, seed=3, inicio="2019-12-20"), HOJA, id=0),
+        FakeWorksheet([EXPECTED_HEADERS], HOJA_ARCHIVO.format(anio=ANIO), id=1),
+        FakeWorksheet([cierres.CIERRE_HEADERS], HOJA_CIERRES, id=2),
+    ])
+    for modulo in (sheets, cierres):
+        monkeypatch.setattr(modulo, "_open_ws", lambda nombre=HOJA: libro.worksheet(nombre))
+    monkeypatch.setattr(cierres, "_get_spreadsheet", lambda: libro)
+    monkeypatch.setattr(cierres, "_journal", lambda: diario)
+    monkeypatch.setattr(cierres, "_load_ledger", lambda force=False: None)
+    return libro
+
+
+def _filas(ws):
+    return [dict(zip(ws._values[0], f)) for f in ws.get_all_values()[1:]]
+
+
+def _del_anio(filas):
+    return [f for f in filas if f["Fecha"].startswith(str(ANIO))]
+
+
+def test_cierre_archiva_congela_y_borra(libro):
+    abierta, archivo = libro.hojas[HOJA], libro.hojas[HOJA_ARCHIVO.format(anio=ANIO)]
+    antes = _filas(abierta)
+    del_anio = _del_anio(antes)
+
+    assert cierres._cerrar_periodo(ANIO) == len(del_anio)
+
+    assert _filas(archivo) == del_anio
+    assert _filas(abierta) == [f for f in antes if f not in del_anio]
+    totales = cierres._leer_cierres().set_index("Persona")
+    assert list(totales.index) == USUARIOS
+    for p in USUARIOS:
+        gastos = sum(int(f["Monto"]) for f in del_anio
+                     if f["Persona"] == p and f["Tipo"] == "Gasto" and f["Anulado"] != "TRUE")
+        assert totales.loc[p, "Gastos"] == gastos
+    # Repetir el cierre no mueve nada más.
+    assert cierres._cerrar_periodo(ANIO) == 0
+    assert _filas(archivo) == del_anio
+
+
+def test_cierre_vacia_antes_el_diario(libro, diario):
+    abierta, archivo = libro.hojas[HOJA], libro.hojas[HOJA_ARCHIVO.format(anio=ANIO)]
+    alta = dict(zip(EXPECTED_HEADERS, generar_ledger(1, seed=8, inicio="2019-12-31")[1]))
+    editada = _del_anio(_filas(abierta))[0]
+    sheets._journal_agregar(diario, "alta", alta["ID"], alta)
+    sheets._journal_agregar(diario, "edicion", editada["ID"], {"Detalle": "editado", "Last_Modified_At": LM},
+                            2, editada["Last_Modified_At"])
+
+    cierres._cerrar_periodo(ANIO)
+
+    archivadas = {f["ID"]: f for f in _filas(archivo)}
+    assert alta["ID"] in archivadas
+    assert archivadas[editada["ID"]]["Detalle"] == "editado"
+    assert sheets._journal_pendientes(diario) == []
+    assert sheets._journal_pendientes(diario, con_error=True) == []
+    assert _del_anio(_filas(abierta)) == []
+
+
+def test_edicion_durante_el_cierre_aborta_el_borrado(libro, monkeypatch):
+    pytest.importorskip("gspread")
+    abierta, archivo = libro.hojas[HOJA], libro.hojas[HOJA_ARCHIVO.format(anio=ANIO)]
+    col_lm, col_det = abierta._values[0].index("Last_Modified_At"), abierta._values[0].index("Detalle")
+    append_rows = archivo.append_rows
+
+    def _otro_edita(rows, **kwargs):
+        append_rows(rows, **kwargs)
+        abierta._values[3][col_det] = "editado entremedio"
+        abierta._values[3][col_lm] = LM
+    monkeypatch.setattr(archivo, "append_rows", _otro_edita)
+    n_antes = len(_filas(abierta))
+
+    with pytest.raises(cierres.ConflictoEdicion, match="movieron o editaron"):
+        cierres._cerrar_periodo(ANIO)
+    assert len(_filas(abierta)) == n_antes
+
+    monkeypatch.setattr(archivo, "append_rows", append_rows)
+    cierres._cerrar_periodo(ANIO)
+
+    archivadas = {f["ID"]: f for f in _filas(archivo)}
+    assert len(archivadas) == len(_filas(archivo))
+    assert "editado entremedio" in {f["Detalle"] for f in archivadas.values()}
+    assert _del_anio(_filas(abierta)) == []
+
+
+def test_cierres_conserva_otros_anios_y_limpia_lo_que_sobra(libro):
+    tabla = libro.hojas[HOJA_CIERRES]
+    ancho = len(cierres.CIERRE_HEADERS)
+    tabla._values += [["2018", p] + ["1"] * (ancho - 2) for p in USUARIOS]
+    tabla._values += [[str(ANIO), "viejo"] + ["9"] * (ancho - 2) for _ in range(len(USUARIOS) + 2)]
+
+    cierres._cerrar_periodo(ANIO)
+
+    leidos = cierres._leer_cierres()
+    assert leidos["Periodo"].tolist() == ["2018"] * len(USUARIOS) + [str(ANIO)] * len(USUARIOS)
+    assert "viejo" not in set(leidos["Persona"])
@@ -0,0 +1,97 @@
+"""Duplicados por bloque (persona, monto) y conciliación uno a uno con una cartola."""
+import pandas as pd
+
+from finanzas.conciliacion import _construir_indice_duplicados, conciliar, posibles_duplicados
+from finanzas.config import EXPECTED_HEADERS, USER_A, USER_B
+from finanzas.modelo import _normalize_df
+
+
+def _ledger(filas):
+    """Registros normalizados a partir de (ID, Fecha, Persona, Monto[, Anulado])."""
+    raw = pd.DataFrame([
+        {"ID": f[0], "Tipo": "Gasto", "Fecha": f[1], "Persona": f[2], "Monto": str(f[3]),
+         "Anulado": f[4] if len(f) > 4 else ""}
+        for f in filas
+    ]).reindex(columns=EXPECTED_HEADERS, fill_value="")
+    raw["_row"] = range(2, 2 + len(raw))
+    return _normalize_df(raw)
+
+
+def test_posibles_duplicados_por_bloque_y_ventana():
+    df = _ledger([
+        ("a", "2024-03-01", USER_A, 5000),
+        ("b", "2024-03-10", USER_A, 5000),
+        ("c", "2024-03-02", USER_B, 5000),
+        ("d", "2024-03-02", USER_A, 7000),
+        ("e", "2024-03-02", USER_A, 5000, "TRUE"),
+    ])
+    indice = _construir_indice_duplicados(df)
+
+    pos = posibles_duplicados(indice, USER_A, 5000, "2024-03-03")
+
+    assert df["ID"].iloc[pos].tolist() == ["a"]
+    assert len(posibles_duplicados(indice, USER_A, 5000, "2024-03-20")) == 0
+    assert len(posibles_duplicados(indice, USER_B, 7000, "2024-03-02")) == 0
+
+
+def test_conciliar_uno_a_uno_y_sobrantes():
+    libro = _ledger([
+        ("l1", "2024-03-01", USER_A, 1000),
+        ("l2", "2024-03-01", USER_A, 1000),
+        ("l3", "2024-03-03", USER_A, 2500),
+        ("l4", "2024-03-08", USER_A, 2500),
+        ("l5", "2024-03-20", USER_A, 9999),
+    ])
+    cartola = _ledger([
+        ("c1", "2024-03-01", USER_A, -1000),   # mismo día, dos iguales en el ledger
+        ("c2", "2024-03-01", USER_A, -1000),
+        ("c3", "2024-03-01", USER_A, -1000),   # sobra: ya no quedan registros de 1000
+        ("c4", "2024-03-09", USER_A, -2500),   # a 1 día de l4
+        ("c5", "2024-03-06", USER_A, -2500),   # también prefiere l4 (2 días), pierde y toma l3 (3 días)
+        ("c6", "2024-03-20", USER_A, -1234),   # monto sin par
+    ])
+
+    res = conciliar(libro, cartola, ventana_dias=4)
+
+    pares = {(cartola["ID"].iloc[c], libro["ID"].iloc[l])
+             for c, l in zip(res["calces"]["pos_cartola"], res["calces"]["pos_libro"])}
+    assert len(pares) == 4
+    assert {l for _, l in pares} == {"l1", "l2", "l3", "l4"}
+    assert ("c4", "l4") in pares and ("c5", "l3") in pares
+    assert ("c1", "l1") in pares and ("c2", "l2") in pares
+    assert set(res["solo_cartola"]["ID"]) == {"c3", "c6"}
+    assert set(res["solo_libro"]["ID"]) == {"l5"}
+
+
+def test_conciliar_respeta_la_ventana():
+    libro = _ledger([("l1", "2024-03-01", USER_A, 1000)])
+    cartola = _ledger([("c1", "2024-03-10", USER_A, 1000)])
+
+    res = conciliar(libro, cartola, ventana_dias=3)
+
+    assert res["calces"].empty
+    assert list(res["solo_cartola"]["ID"]) == ["c1"]
+    assert list(res["solo_libro"]["ID"]) == ["l1"]
+
+
+def test_traspasos_se_agrupan_por_quien_envia():
+    raw = pd.DataFrame([
+        {"ID": "t1", "Tipo": "Traspaso", "Fecha": "2024-03-01", "Persona_Origen": USER_A,
+         "Persona_Destino": USER_B, "Monto": "20000"},
+    ]).reindex(columns=EXPECTED_HEADERS, fill_value="")
+    raw["_row"] = [2]
+    indice = _construir_indice_duplicados(_normalize_df(raw))
+
+    assert len(posibles_duplicados(indice, USER_A, 20000, "2024-03-02")) == 1
+    assert len(posibles_duplicados(indice, USER_B, 20000, "2024-03-02")) == 0
+
+
+def test_conciliar_ignora_filas_sin_fecha():
+    libro = _ledger([("l1", "", USER_A, 1000), ("l2", "2024-03-01", USER_A, 1000)])
+    cartola = _ledger([("c1", "2024-03-01", USER_A, -1000), ("c2", "", USER_A, -1000)])
+
+    res = conciliar(libro, cartola)
+
+    assert len(res["calces"]) == 1
+    assert set(res["solo_cartola"]["ID"]) == {"c2"}
+    assert set(res["solo_libro"]["ID"]) == {"l1"}
@@ -0,0 +1,47 @@
+"""El cubo mensual responde meses e historia completa igual que el diario, con muchas menos filas."""
+import pandas as pd
+import pytest
+
+from benchmarks.sintetico import generar_ledger
+from finanzas.calculos import (
+    _construir_cubo, _construir_cubo_mensual, _construir_indice_fechas, _cortar_periodo,
+    calcular_saldos, calcular_totales_personales, liquidar,
+)
+from finanzas.modelo import _normalize_df
+
+
+@pytest.fixture(scope="module")
+def cubos():
+    valores = generar_ledger(5000, seed=2)
+    diario = _construir_cubo(_normalize_df(pd.DataFrame(valores[1:], columns=valores[0])))
+    return diario, _construir_cubo_mensual(diario)
+
+
+def _resumen(cubo):
+    return (calcular_totales_personales(cubo), calcular_saldos(cubo, netear_traspasos=True), liquidar(cubo),
+            cubo.groupby("Tipo", observed=True)["Monto_int"].sum())
+
+
+def _iguales(a, b):
+    pd.testing.assert_frame_equal(a[0], b[0])
+    assert a[1] == pytest.approx(b[1])
+    assert a[2] == b[2]
+    pd.testing.assert_series_equal(a[3], b[3])
+
+
+def test_mensual_mucho_mas_chico(cubos):
+    diario, mensual = cubos
+    assert len(mensual) < len(diario) / 2
+    assert list(mensual.columns) == list(diario.columns)
+
+
+def test_historia_completa_igual(cubos):
+    _iguales(_resumen(cubos[1]), _resumen(cubos[0]))
+
+
+def test_cada_mes_igual(cubos):
+    diario, mensual = cubos
+    idx_d, idx_m = _construir_indice_fechas(diario), _construir_indice_fechas(mensual)
+    assert idx_m["meses"] == idx_d["meses"]
+    for mes in idx_d["meses"]:
+        _iguales(_resumen(_cortar_periodo(mensual, idx_m, mes)), _resumen(_cortar_periodo(diario, idx_d, mes)))
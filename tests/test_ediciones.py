@@ -0,0 +1,71 @@
+"""Ediciones por celda con la precondición Last_Modified_At: conflictos, filas movidas y reintentos."""
+import pytest
+
+from finanzas import sheets
+from finanzas.sheets import ConflictoEdicion
+
+LM = "2099-01-01 10:00:00"
+
+
+def _registro(ws, fila):
+    return dict(zip(ws._values[0], ws._values[fila - 1]))
+
+
+def _editar(rec, **cambios):
+    return sheets._actualizar_registro(rec["ID"], rec["_fila"], {**cambios, "Last_Modified_At": LM},
+                                       rec["Last_Modified_At"])
+
+
+@pytest.fixture
+def rec(hoja, estado):
+    return {**_registro(hoja, 6), "_fila": 6}
+
+
+def test_escribe_solo_las_celdas_que_cambian(hoja, rec):
+    escritas = _editar(rec, Detalle="nuevo", Tipo=rec["Tipo"])
+
+    assert escritas == ["Detalle", "Last_Modified_At"]
+    assert _registro(hoja, 6)["Detalle"] == "nuevo"
+    assert hoja.llamadas["batch_update"] == 1
+
+
+def test_conflicto_si_otro_la_modifico(hoja, rec):
+    hoja._values[5][hoja._values[0].index("Last_Modified_At")] = "2099-12-31 00:00:00"
+
+    with pytest.raises(ConflictoEdicion, match="fue modificado"):
+        _editar(rec, Detalle="nuevo")
+
+    assert _registro(hoja, 6)["Detalle"] == rec["Detalle"]
+
+
+def test_ubica_por_id_si_la_fila_se_movio(hoja, rec):
+    del hoja._values[2]
+
+    _editar(rec, Detalle="nuevo")
+
+    assert _registro(hoja, 5)["ID"] == rec["ID"]
+    assert _registro(hoja, 5)["Detalle"] == "nuevo"
+    assert _registro(hoja, 6)["Detalle"] != "nuevo"
+
+
+def test_conflicto_si_ya_no_existe(hoja, rec):
+    del hoja._values[5]
+
+    with pytest.raises(ConflictoEdicion, match="ya no existe"):
+        _editar(rec, Detalle="nuevo")
+
+
+def test_reintento_tras_5xx_aplicado_no_es_conflicto(hoja, rec, monkeypatch, error_api):
+    monkeypatch.setattr(sheets.time, "sleep", lambda s: None)
+    batch_update = hoja.batch_update
+
+    def _aplica_y_falla(data, **kwargs):
+        batch_update(data, **kwargs)
+        monkeypatch.setattr(hoja, "batch_update", batch_update)
+        raise error_api(503)
+    monkeypatch.setattr(hoja, "batch_update", _aplica_y_falla)
+
+    _editar(rec, Detalle="nuevo")
+
+    assert _registro(hoja, 6)["Detalle"] == "nuevo"
+    assert _registro(hoja, 6)["Last_Modified_At"] == LM
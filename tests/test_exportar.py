@@ -0,0 +1,70 @@
+"""Exportación por trozos: cada formato devuelve todos los registros del período y sus tablas de resumen."""
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from benchmarks.sintetico import generar_ledger
+from finanzas import exportar
+from finanzas.calculos import _construir_cubo
+from finanzas.exportar import exportar_periodo
+from finanzas.modelo import _normalize_df
+
+
+@pytest.fixture(scope="module")
+def periodo():
+    valores = generar_ledger(250, seed=5)
+    df = _normalize_df(pd.DataFrame(valores[1:], columns=valores[0]))
+    return df, _construir_cubo(df)
+
+
+@pytest.fixture(autouse=True)
+def trozos_chicos(monkeypatch):
+    monkeypatch.setattr(exportar, "EXPORT_CHUNK", 40)
+
+
+def _exportar(periodo, formato):
+    destino = io.BytesIO()
+    exportar_periodo(*periodo, formato, destino)
+    destino.seek(0)
+    return destino
+
+
+def _revisar(registros, df):
+    assert len(registros) == len(df)
+    assert registros["ID"].tolist() == df["ID"].tolist()
+    assert registros["Monto_CLP"].tolist() == df["Monto_int"].tolist()
+
+
+def test_csv(periodo):
+    with zipfile.ZipFile(_exportar(periodo, "csv")) as zf:
+        assert set(zf.namelist()) == {"registros.csv", "totales_por_persona.csv", "liquidacion.csv"}
+        registros = pd.read_csv(zf.open("registros.csv"), encoding="utf-8-sig", dtype={"ID": str})
+        totales = pd.read_csv(zf.open("totales_por_persona.csv"), encoding="utf-8-sig")
+    _revisar(registros, periodo[0])
+    assert "Saldo_compartidos" in totales.columns
+
+
+def test_parquet(periodo):
+    pytest.importorskip("pyarrow")
+    with zipfile.ZipFile(_exportar(periodo, "parquet")) as zf:
+        assert set(zf.namelist()) == {"registros.parquet", "totales_por_persona.parquet", "liquidacion.parquet"}
+        registros = pd.read_parquet(io.BytesIO(zf.read("registros.parquet")))
+        liquidacion = pd.read_parquet(io.BytesIO(zf.read("liquidacion.parquet")))
+    _revisar(registros, periodo[0])
+    assert list(liquidacion.columns) == ["Desde", "Hacia", "Monto"]
+
+
+def test_xlsx(periodo):
+    pytest.importorskip("openpyxl")
+    hojas = pd.read_excel(_exportar(periodo, "xlsx"), sheet_name=None, dtype={"ID": str})
+    assert list(hojas) == ["Registros", "totales_por_persona", "liquidacion"]
+    _revisar(hojas["Registros"], periodo[0])
+
+
+def test_periodo_vacio(periodo):
+    df, cubo = periodo
+    with zipfile.ZipFile(_exportar((df.iloc[:0], cubo.iloc[:0]), "csv")) as zf:
+        registros = pd.read_csv(zf.open("registros.csv"), encoding="utf-8-sig")
+    assert registros.empty and "Monto_CLP" in registros.columns
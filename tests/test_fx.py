@@ -0,0 +1,87 @@
+"""Dólar por fecha con un proveedor local y revalorización de los registros en USD."""
+import datetime as dt
+
+import pandas as pd
+import pytest
+
+from finanzas import sheets
+from finanzas.fx import _get_usd_value, _monto_clp, _nuevo_fx_store, _usd_values, formatear_monto, formatear_montos
+from finanzas.modelo import _normalize_df
+
+SERIES = {
+    2023: {"2023-12-28": 870.0, "2023-12-29": 877.0},
+    2024: {"2024-01-02": 884.0, "2024-03-01": 975.0, "2024-03-04": 980.0},
+}
+
+
+@pytest.fixture
+def pedidos():
+    return []
+
+
+@pytest.fixture
+def fx(pedidos):
+    def _provider(anio):
+        pedidos.append(anio)
+        return SERIES.get(anio, {f"{anio}-01-02": 1000.0})
+    return _nuevo_fx_store(provider=_provider, path=None)
+
+
+def test_dia_sin_publicacion_usa_el_habil_anterior(fx, pedidos):
+    assert _get_usd_value(dt.date(2024, 3, 4), fx) == 980.0
+    assert _get_usd_value(dt.date(2024, 3, 3), fx) == 975.0  # domingo
+    assert pedidos == [2024]
+
+
+def test_inicio_de_anio_pide_el_anio_anterior(fx, pedidos):
+    assert _get_usd_value(dt.date(2024, 1, 1), fx) == 877.0
+    assert _get_usd_value(dt.date(2024, 1, 2), fx) == 884.0
+    assert sorted(pedidos) == [2023, 2024]
+
+
+def test_columna_igual_a_valores_sueltos_con_una_descarga_por_anio(fx, pedidos):
+    fechas = [dt.date(2024, 1, 1), dt.date(2024, 3, 3), dt.date(2023, 12, 29), dt.date(2024, 3, 4)]
+
+    valores = _usd_values(pd.Series(fechas), fx)
+
+    assert valores.tolist() == [877.0, 975.0, 877.0, 980.0]
+    assert sorted(pedidos) == [2023, 2024]
+
+
+def _usd(hoja):
+    h = hoja._values[0]
+    return [i for i, f in enumerate(hoja._values[1:], start=1) if f[h.index("Moneda")] == "USD"]
+
+
+def test_revalorizar_en_lote_y_sin_tocar_los_heredados(hoja, estado, diario, fx, tmp_path):
+    h = hoja._values[0]
+    filas = _usd(hoja)
+    heredada = filas[0]
+    hoja._values[heredada][h.index("Monto_original")] = ""
+    monto_heredado = hoja._values[heredada][h.index("Monto")]
+    sheets._sync_ledger(hoja, estado, tmp_path / "ledger.sqlite")
+
+    n = sheets._revalorizar_usd(_normalize_df(estado["df"]), estado["df"], fx)
+    hoja.llamadas.clear()
+    sheets._vaciar_journal(diario)
+
+    assert n == len(filas) - 1
+    assert hoja.llamadas == {"batch_get": 1, "batch_update": 1}
+    assert hoja._values[heredada][h.index("Monto")] == monto_heredado
+    for i in filas[1:]:
+        fila = hoja._values[i]
+        fecha = dt.date.fromisoformat(fila[h.index("Fecha")])
+        assert fila[h.index("Monto")] == str(_monto_clp(float(fila[h.index("Monto_original")]), _get_usd_value(fecha, fx)))
+
+    sheets._sync_ledger(hoja, estado, tmp_path / "ledger.sqlite")
+    assert sheets._revalorizar_usd(_normalize_df(estado["df"]), estado["df"], fx) == 0
+
+
+def test_formatear_montos_igual_a_formatear_monto_por_fila():
+    valores = pd.Series([1234567.0, 12.5, 0.0, -980.4, 7.0])
+    monedas = pd.Series(["CLP", "USD", "CLP", "USD", "EUR"], dtype="category")
+
+    esperado = [formatear_monto(v, m) for v, m in zip(valores, monedas)]
+
+    assert formatear_montos(valores, monedas).tolist() == [str(e) for e in esperado]
+    assert formatear_montos(valores.iloc[:1]).tolist() == ["$1,234,567"]
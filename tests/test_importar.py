@@ -0,0 +1,67 @@
+"""Importación de cartolas: montos en formato local, filas descartadas e IDs estables por archivo."""
+import io
+
+import pandas as pd
+import pytest
+
+from finanzas import importar, sheets
+from finanzas.importar import _huella, _parse_montos, _preparar_importacion, _sugerir_mapeo, leer_cartola
+
+CARTOLA = (
+    "Fecha;Descripción;Cargo;Divisa\n"
+    "03/02/2024;Supermercado;$-12.345;CLP\n"
+    "04/02/2024;Sueldo;1.500.000;CLP\n"
+    "05/02/2024;Netflix;(15,50);USD\n"
+    "xx/02/2024;Fecha inválida;1.000;CLP\n"
+    "06/02/2024;Sin monto;;CLP\n"
+).encode()
+DEFAULTS = {"Tipo": "Gasto", "Moneda": "CLP", "Persona": "🐳Javiera", "Categoría": "Otros", "Medio": "Débito"}
+
+
+@pytest.fixture(autouse=True)
+def dolar(monkeypatch):
+    monkeypatch.setattr(importar, "_usd_values", lambda fechas, store=None: pd.Series(950.0, index=fechas.index))
+
+
+def _importar(datos=CARTOLA):
+    raw = leer_cartola(io.BytesIO(datos))
+    return _preparar_importacion(raw, _sugerir_mapeo(raw.columns), DEFAULTS, origen=_huella(datos))
+
+
+def test_parse_montos_formatos_locales():
+    col = pd.Series(["$-1.234,50", "(1.234,50)", "1.000", "abc", " 42 "])
+    assert _parse_montos(col, ",").tolist()[:3] == [-1234.5, -1234.5, 1000.0]
+    assert _parse_montos(col, ",").isna().tolist() == [False, False, False, True, False]
+    assert _parse_montos(pd.Series(["(1,234.50)"]), ".").tolist() == [-1234.5]
+
+
+def test_mapeo_tipo_y_conversion():
+    registros, descartadas = _importar()
+
+    assert descartadas == 2
+    assert registros["Detalle"].tolist() == ["Supermercado", "Sueldo", "Netflix"]
+    assert registros["Tipo"].tolist() == ["Gasto", "Ingreso", "Gasto"]
+    assert registros["Fecha"].tolist() == ["2024-02-03", "2024-02-04", "2024-02-05"]
+    assert registros["Moneda"].tolist() == ["CLP", "CLP", "USD"]
+    assert registros["Monto"].tolist() == [12345, 1500000, 14725]
+    assert list(registros.columns) == sheets.EXPECTED_HEADERS
+
+
+def test_ids_estables_por_archivo():
+    primero, _ = _importar()
+    otra_vez, _ = _importar()
+    otro_archivo, _ = _importar(CARTOLA.replace(b"Sueldo", b"Bono"))
+
+    assert primero["ID"].tolist() == otra_vez["ID"].tolist()
+    assert primero["ID"].is_unique
+    assert set(primero["ID"]).isdisjoint(otro_archivo["ID"])
+
+
+def test_reimportar_no_duplica(hoja):
+    registros, _ = _importar()
+    n_antes = len(hoja._values)
+
+    sheets._append_records(registros)
+    sheets._append_records(_importar()[0])
+
+    assert len(hoja._values) == n_antes + len(registros)
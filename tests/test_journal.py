@@ -0,0 +1,107 @@
+"""El diario local se vacía en lotes: repetir uno no duplica filas y una edición fallida no frena al resto."""
+import pandas as pd
+
+from benchmarks.sintetico import generar_ledger
+from finanzas import sheets
+
+
+def _registros(n, seed=7):
+    valores = generar_ledger(n, seed=seed)
+    return [dict(zip(valores[0], fila)) for fila in valores[1:]]
+
+
+def _ids(ws):
+    col = ws._values[0].index("ID")
+    return [fila[col] for fila in ws._values[1:]]
+
+
+def test_escribir_altas_omite_ids_ya_escritos(hoja):
+    registros = _registros(5)
+    sheets._escribir_altas(hoja, registros)
+    sheets._escribir_altas(hoja, registros)
+
+    ids = _ids(hoja)
+    assert len(ids) == len(set(ids))
+    assert {r["ID"] for r in registros} <= set(ids)
+
+
+def test_vaciado_tras_corte_no_duplica(hoja, diario):
+    registros = _registros(4)
+    for r in registros:
+        sheets._journal_agregar(diario, "alta", r["ID"], r)
+    n_antes = len(hoja._values)
+    # El lote llegó a la hoja pero el proceso murió antes de quitarlo del diario.
+    sheets._escribir_altas(hoja, registros[:2])
+
+    assert sheets._vaciar_journal(diario) == 4
+    assert sheets._journal_pendientes(diario) == []
+    assert len(hoja._values) == n_antes + 4
+    assert len(_ids(hoja)) == len(set(_ids(hoja)))
+
+
+def test_sync_superpone_el_diario_sin_duplicar(ws, diario, tmp_path):
+    ya_en_hoja = dict(zip(ws._values[0], ws._values[1]))
+    pendiente = _registros(1, seed=11)[0]
+    sheets._journal_agregar(diario, "alta", ya_en_hoja["ID"], ya_en_hoja)
+    sheets._journal_agregar(diario, "alta", pendiente["ID"], pendiente)
+
+    state = sheets._nuevo_ledger_state()
+    sheets._sync_ledger(ws, state, tmp_path / "ledger.sqlite", journal=diario)
+
+    ids = state["df"]["ID"]
+    assert ids.is_unique
+    assert len(ids) == len(ws._values)  # las filas de la hoja más la pendiente
+    assert pendiente["ID"] in set(ids)
+
+
+def test_append_records_repetido_no_duplica(hoja):
+    registros = pd.DataFrame(_registros(12, seed=5))
+    n_antes = len(hoja._values)
+
+    sheets._append_records(registros)
+    sheets._append_records(registros)
+
+    assert len(hoja._values) == n_antes + 12
+
+
+def _editar(estado, i, detalle):
+    fila = estado["df"].iloc[i]
+    sheets._encolar_edicion(fila["ID"], fila, {"Detalle": detalle, "Last_Modified_At": f"2099-01-01 10:00:{i:02d}"})
+
+
+def test_ediciones_se_vacian_en_un_lote(hoja, estado, diario, tmp_path):
+    sheets._sync_ledger(hoja, estado, tmp_path / "ledger.sqlite")
+    for i in range(10):
+        _editar(estado, i, f"editado {i}")
+    _editar(estado, 3, "editado dos veces")  # su precondición es el sello de la edición anterior
+    hoja.llamadas.clear()
+
+    assert sheets._vaciar_journal(diario) == 11
+
+    assert sheets._journal_pendientes(diario) == []
+    assert hoja.llamadas == {"batch_get": 1, "batch_update": 1}
+    col = hoja._values[0].index("Detalle")
+    assert [hoja._values[i + 1][col] for i in range(4)] == ["editado 0", "editado 1", "editado 2", "editado dos veces"]
+
+
+def test_edicion_rechazada_no_frena_el_resto(hoja, estado, diario, tmp_path, monkeypatch, error_api):
+    sheets._sync_ledger(hoja, estado, tmp_path / "ledger.sqlite")
+    for i in range(4):
+        _editar(estado, i, f"editado {i}")
+    hoja._values[3][hoja._values[0].index("Last_Modified_At")] = "2099-12-31 00:00:00"  # otro la tocó
+    batch_update = hoja.batch_update
+
+    def _rechazar_fila_2(data, **kwargs):
+        if any(d["range"].lstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZ") == "2" for d in data):
+            raise error_api(400)
+        batch_update(data, **kwargs)
+    monkeypatch.setattr(hoja, "batch_update", _rechazar_fila_2)
+
+    assert sheets._vaciar_journal(diario) == 4
+
+    assert sheets._journal_pendientes(diario) == []
+    errores = {p["id"]: p["error"] for p in sheets._journal_pendientes(diario, con_error=True)}
+    ids = estado["df"]["ID"]
+    assert set(errores) == {ids.iloc[0], ids.iloc[2]}
+    col = hoja._values[0].index("Detalle")
+    assert [hoja._values[i + 1][col] == f"editado {i}" for i in range(4)] == [False, True, False, True]
@@ -0,0 +1,107 @@
+"""La copia local sincronizada por delta y su snapshot coinciden con una recarga completa."""
+import pandas as pd
+
+from benchmarks.sintetico import generar_ledger
+from finanzas import sheets
+from finanzas.local import cargar_ledger
+
+LM = "2099-01-01 10:00:00"
+
+
+def _sincronizado(ws, path):
+    state = sheets._nuevo_ledger_state()
+    sheets._sync_ledger(ws, state, path)
+    return state
+
+
+def _recarga_completa(ws):
+    state = sheets._nuevo_ledger_state()
+    sheets._full_sync(ws, state)
+    return state["df"]
+
+
+def _celda(ws, fila, col, valor):
+    ws._values[fila][ws._values[0].index(col)] = valor
+
+
+def test_delta_igual_a_recarga_completa(ws, tmp_path):
+    state = _sincronizado(ws, tmp_path / "ledger.sqlite")
+    ws._values.extend(generar_ledger(7, seed=99)[1:])
+    _celda(ws, 5, "Detalle", "editado")
+    _celda(ws, 5, "Last_Modified_At", LM)
+    _celda(ws, 9, "Anulado", "TRUE")
+    _celda(ws, 9, "Last_Modified_At", LM)
+    ws.llamadas.clear()
+
+    sheets._sync_ledger(ws, state, tmp_path / "ledger.sqlite")
+
+    assert "get_all_values" not in ws.llamadas
+    pd.testing.assert_frame_equal(state["df"], _recarga_completa(ws))
+
+
+def test_delta_recoge_edicion_con_sello_anterior_al_watermark(ws, tmp_path):
+    # Otro proceso vacía su diario después de que ya sincronizamos un sello más nuevo.
+    state = _sincronizado(ws, tmp_path / "ledger.sqlite")
+    _celda(ws, 3, "Last_Modified_At", "2099-01-01 10:00:05")
+    sheets._sync_ledger(ws, state, tmp_path / "ledger.sqlite")
+    _celda(ws, 6, "Detalle", "vaciado tarde")
+    _celda(ws, 6, "Last_Modified_At", "2099-01-01 10:00:00")
+
+    sheets._sync_ledger(ws, state, tmp_path / "ledger.sqlite")
+
+    assert state["df"]["Detalle"].iloc[5] == "vaciado tarde"
+
+
+def test_edicion_a_mano_llega_con_la_recarga_periodica(ws, tmp_path):
+    state = _sincronizado(ws, tmp_path / "ledger.sqlite")
+    _celda(ws, 4, "Detalle", "a mano")
+    sheets._sync_ledger(ws, state, tmp_path / "ledger.sqlite")
+    assert state["df"]["Detalle"].iloc[3] != "a mano"
+
+    state["completa_at"] -= sheets.RECARGA_COMPLETA + 1
+    sheets._sync_ledger(ws, state, tmp_path / "ledger.sqlite")
+
+    assert state["df"]["Detalle"].iloc[3] == "a mano"
+
+
+def test_snapshot_ida_y_vuelta(ws, tmp_path):
+    path = tmp_path / "ledger.sqlite"
+    state = _sincronizado(ws, path)
+
+    cargado = sheets._nuevo_ledger_state()
+    assert sheets._snapshot_load(cargado, path)
+
+    pd.testing.assert_frame_equal(cargado["df"], state["df"])
+    assert cargado["n_rows"] == state["n_rows"]
+    assert cargado["watermark"] == state["watermark"]
+    # Arrancar desde el snapshot obliga a una recarga completa en la primera sincronización.
+    assert cargado["completa_at"] == 0.0
+
+
+def test_snapshot_incremental(ws, tmp_path):
+    path = tmp_path / "ledger.sqlite"
+    state = _sincronizado(ws, path)
+    prev = state["df"]
+    nuevo = prev.copy()
+    nuevo.iat[2, nuevo.columns.get_loc("Detalle")] = "cambiado"
+    nuevo = nuevo.iloc[:-3]  # filas quitadas al final
+    sheets._snapshot_save(prev, {"df": nuevo, "n_rows": len(nuevo), "watermark": state["watermark"]}, path)
+
+    cargado = sheets._nuevo_ledger_state()
+    assert sheets._snapshot_load(cargado, path)
+
+    pd.testing.assert_frame_equal(cargado["df"], nuevo)
+
+
+def test_snapshot_recoge_lo_escrito_desde_la_app(hoja, estado, diario, tmp_path):
+    path = tmp_path / "ledger.sqlite"
+    sheets._sync_ledger(hoja, estado, path, journal=diario)
+    sheets._encolar_alta(dict(zip(hoja._values[0], generar_ledger(1, seed=42)[1])))
+    fila = estado["df"].iloc[4]
+    sheets._encolar_edicion(fila["ID"], fila, {"Detalle": "desde la app", "Last_Modified_At": LM})
+
+    sheets._vaciar_journal(diario)
+    sheets._sync_ledger(hoja, estado, path, journal=diario)
+
+    pd.testing.assert_frame_equal(estado["df"], _recarga_completa(hoja))
+    pd.testing.assert_frame_equal(cargar_ledger(path), estado["df"])